@@ -28,7 +28,7 @@ target_metadata = Base.metadata
 def alembic_include_object(object, name, type_, reflected, compare_to):
     # type_ can be 'table', 'index', 'column', 'constraint'
     # ignore particular table_name
-    if type_ == "table" and name in ["users", "sessions", "oidc_states"]:
+    if type_ == "table" and name in ["users", "sessions", "oidc_states", "schema_fingerprints"]:
         return False
     return True
 
@@ -43,13 +43,20 @@ async def run_migrations_online():
                 compare_type=True,
                 compare_server_default=True,
                 include_object=alembic_include_object,
+                # One transaction per revision so revisions can use autocommit blocks
+                # (e.g. CREATE INDEX CONCURRENTLY on Postgres)
+                transaction_per_migration=True,
             )
         )
-        async with connection.begin():
-            await connection.run_sync(lambda sync_conn: context.run_migrations())
+        await connection.run_sync(lambda sync_conn: _run_migrations_in_transaction())
     await connectable.dispose()
 
 
+def _run_migrations_in_transaction():
+    with context.begin_transaction():
+        context.run_migrations()
+
+
 def run_migrations():
     try:
         # If there is no event loop currently, use asyncio.run directly
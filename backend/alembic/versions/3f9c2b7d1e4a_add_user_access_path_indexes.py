@@ -0,0 +1,53 @@
+"""add user access path indexes
+
+Revision ID: 3f9c2b7d1e4a
+Revises: a6d8917b313a
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '3f9c2b7d1e4a'
+down_revision: Union[str, Sequence[str], None] = 'a6d8917b313a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) for the per-user access paths of the entity routers
+INDEXES = [
+    ('ix_chat_history_user_id_id', 'chat_history', ['user_id', 'id']),
+    ('ix_chat_history_user_id_session_id_id', 'chat_history', ['user_id', 'session_id', 'id']),
+    ('ix_chat_history_user_id_created_at', 'chat_history', ['user_id', 'created_at']),
+    ('ix_user_profiles_user_id_id', 'user_profiles', ['user_id', 'id']),
+    ('ix_user_profiles_user_id_created_at', 'user_profiles', ['user_id', 'created_at']),
+    ('ix_protocol_recommendations_user_id_id', 'protocol_recommendations', ['user_id', 'id']),
+    ('ix_protocol_recommendations_user_id_created_at', 'protocol_recommendations', ['user_id', 'created_at']),
+    ('ix_subscriptions_user_id_id', 'subscriptions', ['user_id', 'id']),
+    ('ix_subscriptions_user_id_created_at', 'subscriptions', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block on Postgres,
+    # so the indexes are built in autocommit mode without blocking writes.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
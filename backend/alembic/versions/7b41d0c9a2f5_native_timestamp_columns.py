@@ -0,0 +1,285 @@
+"""native timestamp columns
+
+Revision ID: 7b41d0c9a2f5
+Revises: 3f9c2b7d1e4a
+Create Date: 2026-10-17 11:03:27.540918
+
+"""
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '7b41d0c9a2f5'
+down_revision: Union[str, Sequence[str], None] = '3f9c2b7d1e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger(f"alembic.runtime.migration.{revision}")
+
+# table -> [(column, nullable)] of the ISO string columns converted to timestamptz
+TIMESTAMP_COLUMNS = {
+    'chat_history': [('created_at', False)],
+    'protocol_recommendations': [('created_at', False)],
+    'subscriptions': [
+        ('start_date', False),
+        ('next_delivery_date', True),
+        ('created_at', False),
+        ('updated_at', True),
+    ],
+    'user_profiles': [('created_at', False), ('updated_at', True)],
+}
+
+# Rows per backfill statement; each chunk commits on its own so no long-held locks
+CHUNK_SIZE = 5000
+
+# A value converts only if it starts with an ISO date and parses as a timestamp: Postgres
+# checks both in this session-local function, SQLite in _parse_timestamp. The upgrade aborts
+# before changing anything while a stored value does not convert.
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+PG_IS_TIMESTAMP_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION pg_temp.is_iso_timestamptz(value text) RETURNS boolean AS $$
+BEGIN
+    IF value !~ '^\d{4}-\d{2}-\d{2}' THEN
+        RETURN false;
+    END IF;
+    PERFORM value::timestamptz;
+    RETURN true;
+EXCEPTION WHEN others THEN
+    RETURN false;
+END
+$$ LANGUAGE plpgsql
+"""
+# Rows written during the backfill are checked again before the string columns are dropped
+PG_CAST = "CASE WHEN pg_temp.is_iso_timestamptz({column}) THEN {column}::timestamptz END"
+
+# Ids listed per column when the upgrade aborts on values that do not convert
+REPORTED_IDS = 20
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(PG_IS_TIMESTAMP_FUNCTION)
+        _check_convertible(_unconvertible_postgresql)
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            _upgrade_postgresql_table(table, columns)
+    elif dialect == 'sqlite':
+        _check_convertible(_unconvertible_sqlite)
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            _upgrade_sqlite_table(table, columns)
+    else:
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            for column, nullable in columns:
+                op.alter_column(
+                    table,
+                    column,
+                    type_=sa.DateTime(timezone=True),
+                    existing_type=sa.String(),
+                    existing_nullable=nullable,
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            for column, _nullable in columns:
+                op.execute(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE VARCHAR "
+                    f"USING to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.MS\"Z\"')"
+                )
+    elif dialect == 'sqlite':
+        # Values stay ISO-8601 strings on SQLite; nothing to convert back
+        pass
+    else:
+        for table, columns in TIMESTAMP_COLUMNS.items():
+            for column, nullable in columns:
+                op.alter_column(
+                    table,
+                    column,
+                    type_=sa.String(),
+                    existing_type=sa.DateTime(timezone=True),
+                    existing_nullable=nullable,
+                )
+
+
+def _unconvertible_error(problems) -> RuntimeError:
+    details = "; ".join(
+        f"{table}.{column}: {count} (ids {', '.join(map(str, ids))}{', ...' if count > len(ids) else ''})"
+        for table, column, count, ids in problems
+    )
+    return RuntimeError(
+        f"Values that are not ISO-8601 timestamps would be lost converting to timestamptz: {details}. "
+        "Fix or delete those rows and re-run the migration."
+    )
+
+
+def _check_convertible(find_unconvertible) -> None:
+    """Abort before any table changes while a stored value would not convert.
+
+    ``find_unconvertible(table, column)`` returns how many non-NULL values of the column
+    do not convert and the first ``REPORTED_IDS`` of their row ids.
+    """
+    problems = []
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        for column, _nullable in columns:
+            count, ids = find_unconvertible(table, column)
+            if count:
+                problems.append((table, column, count, ids))
+    if problems:
+        raise _unconvertible_error(problems)
+
+
+def _unconvertible_postgresql(table: str, column: str):
+    bind = op.get_bind()
+    where = f"{column} IS NOT NULL AND NOT pg_temp.is_iso_timestamptz({column})"
+    count = bind.execute(sa.text(f"SELECT count(*) FROM {table} WHERE {where}")).scalar()
+    if not count:
+        return 0, []
+    ids = bind.execute(sa.text(f"SELECT id FROM {table} WHERE {where} ORDER BY id LIMIT {REPORTED_IDS}")).scalars()
+    return count, list(ids)
+
+
+def _unconvertible_sqlite(table: str, column: str):
+    rows = op.get_bind().execute(sa.text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY id"))
+    ids = [row[0] for row in rows if _parse_timestamp(row[1]) is None]
+    return len(ids), ids[:REPORTED_IDS]
+
+
+def _backfill_in_chunks(table: str, set_clause: str, pending_clause: str) -> None:
+    """Run ``UPDATE table SET ...`` over consecutive id ranges, one transaction each."""
+    bind = op.get_bind()
+    bounds = bind.execute(sa.text(f"SELECT min(id), max(id) FROM {table}")).first()
+    if bounds is None or bounds[0] is None:
+        return
+    low, high = bounds
+    for start in range(low, high + 1, CHUNK_SIZE):
+        bind.execute(
+            sa.text(f"UPDATE {table} SET {set_clause} WHERE id >= :start AND id < :stop AND ({pending_clause})"),
+            {"start": start, "stop": start + CHUNK_SIZE},
+        )
+    logger.info(f"Backfilled {table} ids {low}..{high}")
+
+
+def _upgrade_postgresql_table(table: str, columns) -> None:
+    """Convert ``columns`` of ``table`` via shadow columns so writers are only blocked for the swap.
+
+    1. add nullable ``<column>_ts`` shadow columns (catalog-only change)
+    2. backfill them in committed id-range chunks and build the replacement
+       ``(user_id, created_at)`` index concurrently
+    3. in one short transaction: catch up rows written meanwhile, check that every
+       value made it into its shadow (aborting with the string columns intact if a row
+       written during the backfill does not convert), drop the string columns and rename
+       the shadows into place
+    4. restore NOT NULL through a NOT VALID check constraint that is validated
+       without blocking writes; after the check in 3 it cannot fail
+    """
+    shadows = [(column, f"{column}_ts", nullable) for column, nullable in columns]
+    set_clause = ", ".join(f"{shadow} = {PG_CAST.format(column=column)}" for column, shadow, _ in shadows)
+    pending_clause = " OR ".join(f"({shadow} IS NULL AND {column} IS NOT NULL)" for column, shadow, _ in shadows)
+
+    with op.get_context().autocommit_block():
+        op.execute("SET TIME ZONE 'UTC'")
+        for _column, shadow, _nullable in shadows:
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {shadow} TIMESTAMP WITH TIME ZONE")
+        _backfill_in_chunks(table, set_clause, pending_clause)
+        op.create_index(
+            f'ix_{table}_user_id_created_at_ts',
+            table,
+            ['user_id', 'created_at_ts'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+    # Writes are blocked (reads are not) only while the few remaining rows are caught up
+    op.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(f"UPDATE {table} SET {set_clause} WHERE {pending_clause}")
+    problems = []
+    for column, shadow, _nullable in shadows:
+        lost = f"{shadow} IS NULL AND {column} IS NOT NULL"
+        count = op.get_bind().execute(sa.text(f"SELECT count(*) FROM {table} WHERE {lost}")).scalar()
+        if count:
+            ids = op.get_bind().execute(
+                sa.text(f"SELECT id FROM {table} WHERE {lost} ORDER BY id LIMIT {REPORTED_IDS}")
+            ).scalars()
+            problems.append((table, column, count, list(ids)))
+    if problems:
+        raise _unconvertible_error(problems)
+    for column, shadow, _nullable in shadows:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+        op.execute(f"ALTER TABLE {table} RENAME COLUMN {shadow} TO {column}")
+    op.execute(f"ALTER INDEX ix_{table}_user_id_created_at_ts RENAME TO ix_{table}_user_id_created_at")
+
+    with op.get_context().autocommit_block():
+        for column, _shadow, nullable in shadows:
+            if nullable:
+                continue
+            constraint = f"ck_{table}_{column}_not_null"
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID")
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+            # Postgres 12+ proves NOT NULL from the validated constraint without a table scan
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}")
+
+
+def _parse_timestamp(value):
+    """The datetime of an ISO-8601 string, or None if it does not convert (see PG_IS_TIMESTAMP_FUNCTION)"""
+    text = str(value).strip()
+    if not ISO_DATE.match(text):
+        return None
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _to_sqlite_timestamp(value):
+    """Normalize an ISO string to SQLAlchemy's SQLite DATETIME storage format in UTC."""
+    if value is None:
+        return None
+    parsed = _parse_timestamp(value)
+    if parsed is None:
+        # Only a row written after _check_convertible can get here; abort like Postgres does
+        raise ValueError(f"{value!r} is not an ISO-8601 timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _upgrade_sqlite_table(table: str, columns) -> None:
+    """Rewrite the stored strings of ``columns`` in chunks.
+
+    SQLite has no native timestamp type: SQLAlchemy's DateTime stores text in a fixed
+    UTC format, which also makes string comparison order match time order. The
+    declared column type is left as is since changing it would copy the whole table.
+    """
+    names = [column for column, _nullable in columns]
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        bounds = bind.execute(sa.text(f"SELECT min(id), max(id) FROM {table}")).first()
+        if bounds is None or bounds[0] is None:
+            return
+        low, high = bounds
+        select_sql = sa.text(f"SELECT id, {', '.join(names)} FROM {table} WHERE id >= :start AND id < :stop")
+        update_sql = sa.text(
+            f"UPDATE {table} SET {', '.join(f'{name} = :{name}' for name in names)} WHERE id = :id"
+        )
+        for start in range(low, high + 1, CHUNK_SIZE):
+            rows = bind.execute(select_sql, {"start": start, "stop": start + CHUNK_SIZE}).mappings().all()
+            if not rows:
+                continue
+            params = [
+                {"id": row["id"], **{name: _to_sqlite_timestamp(row[name]) for name in names}} for row in rows
+            ]
+            bind.execute(update_sql, params)
+        logger.info(f"Normalized timestamps of {table} ids {low}..{high}")
@@ -0,0 +1,93 @@
+"""add chat history archive
+
+Revision ID: a81d5f3c7e20
+Revises: f3c71b8e09d4
+Create Date: 2026-10-17 21:02:17.594310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a81d5f3c7e20'
+down_revision: Union[str, Sequence[str], None] = 'f3c71b8e09d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = {
+    'ix_chat_history_archive_user_id_created_at_id': ['user_id', 'created_at', 'id'],
+    'ix_chat_history_archive_user_id_session_id_created_at': ['user_id', 'session_id', 'created_at'],
+}
+
+
+def _check_existing_table(bind) -> None:
+    """Fail unless the chat_history_archive already there (from create_all) is the one this creates"""
+    inspector = sa.inspect(bind)
+    problems = []
+    columns = {column['name'] for column in inspector.get_columns('chat_history_archive')}
+    expected = {'id', 'user_id', 'session_id', 'role', 'content', 'intake_step', 'created_at'}
+    if columns != expected:
+        problems.append(f"columns are {sorted(columns)}, expected {sorted(expected)}")
+    primary_key = inspector.get_pk_constraint('chat_history_archive')['constrained_columns']
+    if sorted(primary_key) != ['created_at', 'id']:
+        problems.append(f"primary key is {primary_key}, expected (id, created_at)")
+    if bind.dialect.name == 'postgresql':
+        partitioned = bind.execute(
+            sa.text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = CAST('chat_history_archive' AS regclass))"
+            )
+        ).scalar()
+        if not partitioned:
+            problems.append("it is not partitioned by created_at")
+    if problems:
+        raise RuntimeError(
+            "chat_history_archive exists but does not have the expected shape: " + "; ".join(problems)
+            + ". Drop it (it only holds archived messages once services/chat_archive.py has run) and upgrade again"
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Empty until services/chat_archive.py moves messages in; on Postgres it creates the
+    # monthly partitions as it goes
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table('chat_history_archive'):
+        # Created by create_all on startup: keep it only if it matches, indexes included
+        _check_existing_table(bind)
+        existing = {index['name'] for index in sa.inspect(bind).get_indexes('chat_history_archive')}
+        for name, columns in INDEXES.items():
+            if name not in existing:
+                op.create_index(name, 'chat_history_archive', columns, unique=False)
+        return
+    op.create_table(
+        'chat_history_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('content', sa.LargeBinary(), nullable=False),
+        sa.Column('intake_step', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'chat_history_archive', columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    archived = op.get_bind().execute(sa.text('SELECT COUNT(*) FROM chat_history_archive')).scalar()
+    if archived:
+        raise RuntimeError(
+            f"chat_history_archive holds {archived} messages; "
+            "move them back with `python -m services.chat_archive --restore` first"
+        )
+    op.drop_index('ix_chat_history_archive_user_id_session_id_created_at', table_name='chat_history_archive')
+    op.drop_index('ix_chat_history_archive_user_id_created_at_id', table_name='chat_history_archive')
+    # Drops the monthly partitions with it on Postgres
+    op.drop_table('chat_history_archive')
@@ -0,0 +1,34 @@
+"""add row version columns
+
+Revision ID: c52e8a1f6b93
+Revises: 7b41d0c9a2f5
+Create Date: 2026-10-17 18:42:09.113672
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c52e8a1f6b93'
+down_revision: Union[str, Sequence[str], None] = '7b41d0c9a2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose list and record reads are served with ETags
+TABLES = ['user_profiles', 'protocol_recommendations']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default makes this a catalog-only change on Postgres 11+ (no table rewrite)
+    for table in TABLES:
+        op.add_column(table, sa.Column('row_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('row_version')
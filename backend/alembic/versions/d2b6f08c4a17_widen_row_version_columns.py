@@ -0,0 +1,42 @@
+"""widen row version columns
+
+Revision ID: d2b6f08c4a17
+Revises: a81d5f3c7e20
+Create Date: 2026-10-18 09:12:44.208135
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd2b6f08c4a17'
+down_revision: Union[str, Sequence[str], None] = 'a81d5f3c7e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose list and record reads are served with ETags
+TABLES = ['user_profiles', 'protocol_recommendations']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # row_version now holds increasing millisecond stamps instead of random 31-bit values;
+    # existing stamps stay valid. This rewrites the tables on Postgres (both are small).
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                'row_version', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=False
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        # Stamps beyond the 32-bit range start over from 0, which a later write replaces
+        op.execute(f"UPDATE {table} SET row_version = 0 WHERE row_version > 2147483647")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                'row_version', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=False
+            )
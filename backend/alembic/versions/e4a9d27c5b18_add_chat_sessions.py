@@ -0,0 +1,119 @@
+"""add chat sessions
+
+Revision ID: e4a9d27c5b18
+Revises: c52e8a1f6b93
+Create Date: 2026-10-17 19:26:51.402817
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e4a9d27c5b18'
+down_revision: Union[str, Sequence[str], None] = 'c52e8a1f6b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Recomputes every (user, session) of chat_history and, once it exists, the archive, and
+# overwrites its chat_sessions row: rows the application already maintained (e.g. in a table
+# create_all made at startup) only cover the messages written since. {messages} is the union
+# of the message tables; the snippet of a session whose latest message is archived (zlib
+# content) is filled in by _fill_archived_snippets.
+BACKFILL = """
+INSERT INTO chat_sessions
+    (user_id, session_id, message_count, first_message_at, last_message_at, last_message_id, last_snippet)
+SELECT m.user_id, m.session_id, m.message_count, m.first_message_at, m.created_at, m.id, substr(h.content, 1, 160)
+FROM (
+    SELECT user_id, session_id, created_at, id,
+        COUNT(*) OVER w AS message_count,
+        MIN(created_at) OVER w AS first_message_at,
+        ROW_NUMBER() OVER (w ORDER BY created_at DESC, id DESC) AS position
+    FROM ({messages}) messages
+    WINDOW w AS (PARTITION BY user_id, session_id)
+) m
+LEFT JOIN chat_history h ON h.id = m.id
+WHERE m.position = 1
+ON CONFLICT (user_id, session_id) DO UPDATE SET
+    message_count = excluded.message_count,
+    first_message_at = excluded.first_message_at,
+    last_message_at = excluded.last_message_at,
+    last_message_id = excluded.last_message_id,
+    last_snippet = excluded.last_snippet
+"""
+
+MESSAGE_TABLES = ('chat_history', 'chat_history_archive')
+
+# Rows of sessions left without messages
+PRUNE = """
+DELETE FROM chat_sessions
+WHERE {absent}
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('chat_sessions'):
+        op.create_table(
+            'chat_sessions',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('user_id', sa.String(), nullable=False),
+            sa.Column('session_id', sa.String(), nullable=False),
+            sa.Column('message_count', sa.Integer(), nullable=False),
+            sa.Column('first_message_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('last_message_id', sa.Integer(), nullable=False),
+            sa.Column('last_snippet', sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_chat_sessions_id', 'chat_sessions', ['id'], unique=False)
+        op.create_index(
+            'ux_chat_sessions_user_id_session_id', 'chat_sessions', ['user_id', 'session_id'], unique=True
+        )
+        op.create_index(
+            'ix_chat_sessions_user_id_last_message_at_id',
+            'chat_sessions',
+            ['user_id', 'last_message_at', 'id'],
+            unique=False,
+        )
+    inspector = sa.inspect(op.get_bind())
+    tables = [table for table in MESSAGE_TABLES if inspector.has_table(table)]
+    messages = " UNION ALL ".join(f"SELECT user_id, session_id, created_at, id FROM {table}" for table in tables)
+    op.execute(BACKFILL.format(messages=messages))
+    op.execute(
+        PRUNE.format(
+            absent=" AND ".join(
+                f"NOT EXISTS (SELECT 1 FROM {table} t "
+                f"WHERE t.user_id = chat_sessions.user_id AND t.session_id = chat_sessions.session_id)"
+                for table in tables
+            )
+        )
+    )
+    if 'chat_history_archive' in tables:
+        _fill_archived_snippets()
+
+
+def _fill_archived_snippets() -> None:
+    """Set the snippets of sessions whose latest message is in the (compressed) archive"""
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT c.id, a.content FROM chat_sessions c "
+            "JOIN chat_history_archive a ON a.id = c.last_message_id AND a.created_at = c.last_message_at"
+        )
+    ).all()
+    if rows:
+        bind.execute(
+            sa.text("UPDATE chat_sessions SET last_snippet = :snippet WHERE id = :id"),
+            [{"id": row.id, "snippet": zlib.decompress(row.content).decode("utf-8")[:160]} for row in rows],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_sessions_user_id_last_message_at_id', table_name='chat_sessions')
+    op.drop_index('ux_chat_sessions_user_id_session_id', table_name='chat_sessions')
+    op.drop_index('ix_chat_sessions_id', table_name='chat_sessions')
+    op.drop_table('chat_sessions')
@@ -0,0 +1,48 @@
+"""add chat history search index
+
+Revision ID: f3c71b8e09d4
+Revises: e4a9d27c5b18
+Create Date: 2026-10-17 20:14:38.227061
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'f3c71b8e09d4'
+down_revision: Union[str, Sequence[str], None] = 'e4a9d27c5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The tables start empty, so this is instant; existing messages are indexed afterwards by
+# the resumable backfill job in services/chat_search.py
+UPGRADE = {
+    'postgresql': [
+        "CREATE TABLE IF NOT EXISTS chat_history_search "
+        "(id INTEGER PRIMARY KEY, user_id VARCHAR NOT NULL, document TSVECTOR NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_chat_history_search_document ON chat_history_search USING gin (document)",
+        "CREATE INDEX IF NOT EXISTS ix_chat_history_search_user_id ON chat_history_search (user_id)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts "
+        "USING fts5(content, user_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+}
+
+DOWNGRADE = {
+    'postgresql': ["DROP TABLE IF EXISTS chat_history_search"],
+    'sqlite': ["DROP TABLE IF EXISTS chat_history_fts"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for statement in UPGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in DOWNGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
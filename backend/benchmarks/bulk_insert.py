@@ -0,0 +1,69 @@
+"""
+Creating a batch of chat_history messages: one ``create`` (and transaction) per item, as the
+/batch routes used to, vs ``create_many``'s single transaction. On this SQLite database
+``create_many`` still runs one INSERT per row (SQLite cannot return a multi-row INSERT's rows
+in order), so the gain shown is the shared commit and the batched projection statements;
+on Postgres the rows also go in one multi-row INSERT per page.
+
+    python -m benchmarks.bulk_insert [--sizes 10 100 1000]
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from benchmarks.common import USER_ID, create_engine, print_table, scratch_path, timed
+from services.chat_history import Chat_historyService
+
+
+def item(i: int) -> dict:
+    return {"session_id": f"s{i % 5}", "role": "user", "content": f"message {i}", "created_at": "2026-01-01T00:00:00Z"}
+
+
+async def main(sizes) -> None:
+    engine = await create_engine(scratch_path("bench_bulk_insert.db"))
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    counts = {"statements": 0, "commits": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def statement(*args):
+        counts["statements"] += 1
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def commit(*args):
+        counts["commits"] += 1
+
+    async def per_item(n):
+        async with session_maker() as db:
+            service = Chat_historyService(db)
+            for i in range(n):
+                await service.create(item(i), user_id=USER_ID)
+
+    async def bulk(n):
+        async with session_maker() as db:
+            await Chat_historyService(db).create_many([item(i) for i in range(n)], user_id=USER_ID)
+
+    results = []
+    for n in sizes:
+        row = [n]
+        for path in (per_item, bulk):
+            counts.update(statements=0, commits=0)
+            await path(n)
+            row += [counts["statements"], counts["commits"], f"{await timed(lambda: path(n), repeat=3):.1f}"]
+        results.append(row)
+    await engine.dispose()
+
+    print("chat_history batch create (statements include the chat_sessions and search projections)")
+    print_table(
+        ("items", "per-item stmts", "commits", "ms", "bulk stmts", "commits", "ms"),
+        results,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
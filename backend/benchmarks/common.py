@@ -0,0 +1,102 @@
+"""
+Shared setup of the benchmarks: a scratch SQLite database filled with chat_history rows,
+the entity routers on a bare app pointed at it, and timing helpers.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Sequence
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.database import Base
+from dependencies.auth import get_current_user
+from dependencies.database import get_all_read_db, get_db, get_read_db
+from routers import chat_history, protocol_recommendations, subscriptions, user_profiles
+from schemas.auth import UserResponse
+from utils.serialization import FastJSONResponse
+
+USER_ID = "u1"
+
+ENTITY_ROUTERS = (chat_history, protocol_recommendations, subscriptions, user_profiles)
+
+
+def scratch_path(name: str) -> str:
+    """A fresh database file ``name`` in the temporary directory"""
+    path = os.path.join(tempfile.gettempdir(), name)
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+async def create_engine(path: str):
+    """Async engine on the SQLite file at ``path``, with every table created"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+def fill_chat_history(path: str, rows: int, content_size: int = 200, sessions: int = 50) -> None:
+    """Insert ``rows`` messages of USER_ID directly (one per second, oldest first)"""
+    start = datetime(2026, 1, 1)
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("DELETE FROM chat_history")
+        connection.executemany(
+            "INSERT INTO chat_history (user_id, session_id, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    USER_ID,
+                    f"s{i % sessions}",
+                    "user",
+                    "x" * content_size,
+                    (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+                )
+                for i in range(rows)
+            ),
+        )
+    connection.close()
+
+
+def make_app(engine, routers: Sequence[Any] = ENTITY_ROUTERS) -> FastAPI:
+    """The entity routers on an app configured like main.app, with auth and sessions stubbed"""
+    app = FastAPI(default_response_class=FastJSONResponse)
+    for module in routers:
+        app.include_router(module.router)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def session():
+        async with session_maker() as db:
+            yield db
+
+    for dependency in (get_db, get_read_db, get_all_read_db):
+        app.dependency_overrides[dependency] = session
+    app.dependency_overrides[get_current_user] = lambda: UserResponse(id=USER_ID, email="user@example.com")
+    return app
+
+
+def client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def timed(fn: Callable[[], Awaitable[Any]], repeat: int = 5) -> float:
+    """Best of ``repeat`` runs of ``fn``, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence[Any]]) -> None:
+    cells = [[str(cell) for cell in row] for row in [headers, *rows]]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for row in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
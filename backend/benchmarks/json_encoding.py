@@ -0,0 +1,124 @@
+"""
+Encode time per route and payload, FastAPI's default pipeline vs the orjson pipeline.
+
+The default one validates into the response model, then renders with ``JSONResponse``'s
+json.dumps; the orjson one renders JSON-ready records with ``FastJSONResponse``, and
+``utils.serialization.dumps`` for SSE and NDJSON.
+
+    python -m benchmarks.json_encoding [--rows 2000] [--repeat 5]
+
+No database: the payloads are built in memory, so only encoding is timed.
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+from typing import Any, Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from benchmarks.common import USER_ID, print_table
+from models.chat_history import Chat_history
+from routers.chat_history import Chat_historyListResponse, Chat_historyResponse
+from services.chat_history import Chat_historyService
+from utils.serialization import FastJSONResponse, dumps
+
+REPO = Chat_historyService.repository
+CREATED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def messages(n: int) -> List[Chat_history]:
+    return [
+        Chat_history(id=i, user_id=USER_ID, session_id=f"s{i % 50}", role="user", content="x" * 200, created_at=CREATED_AT)
+        for i in range(n)
+    ]
+
+
+def default_render(content: Any) -> bytes:
+    return JSONResponse(None).render(content)
+
+
+def fast_render(content: Any) -> bytes:
+    return FastJSONResponse(None).render(content)
+
+
+def through_model(adapter: TypeAdapter, content: Any) -> bytes:
+    """FastAPI's response_model path: validate, dump in JSON mode, render with json.dumps"""
+    return default_render(adapter.dump_python(adapter.validate_python(content, from_attributes=True), mode="json"))
+
+
+def microseconds(fn: Callable[[], Any], number: int, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(rows: int, repeat: int) -> None:
+    one = messages(1)[0]
+    batch = messages(100)
+    page_objs = messages(rows)
+    page = {"items": page_objs, "total": rows, "skip": 0, "limit": rows, "next_cursor": None}
+    # What the list query returns on the fast path: plain row tuples
+    page_rows = [REPO.row_of(obj) for obj in page_objs]
+    chunk = {"content": "Hello, this is a streamed token chunk ✓"}
+    ndjson_batch = REPO.object_records(batch * 5)
+    deleted = {"message": "Successfully deleted 3 chat_historys", "deleted_count": 3}
+
+    one_model = TypeAdapter(Chat_historyResponse)
+    many_model = TypeAdapter(List[Chat_historyResponse])
+    list_model = TypeAdapter(Chat_historyListResponse)
+
+    cases = [
+        (
+            f"GET /chat_history, {rows} records",
+            lambda: through_model(list_model, page),
+            lambda: fast_render({**page, "items": REPO.to_records(page_rows, REPO.column_names)}),
+            20,
+        ),
+        (
+            "GET/POST/PUT one record",
+            lambda: through_model(one_model, one),
+            lambda: fast_render(REPO.object_record(one)),
+            5000,
+        ),
+        (
+            "POST/PUT /batch, 100 records",
+            lambda: through_model(many_model, batch),
+            lambda: fast_render(REPO.object_records(batch)),
+            200,
+        ),
+        (
+            "DELETE (plain dict)",
+            lambda: default_render(jsonable_encoder(deleted)),
+            lambda: fast_render(deleted),
+            20000,
+        ),
+        (
+            "aihub SSE chunk",
+            lambda: json.dumps(chunk),
+            lambda: dumps(chunk).decode(),
+            100000,
+        ),
+        (
+            "NDJSON batch of 500 records",
+            lambda: "".join(json.dumps(record) + "\n" for record in ndjson_batch).encode(),
+            lambda: b"".join(dumps(record) + b"\n" for record in ndjson_batch),
+            50,
+        ),
+    ]
+    results = []
+    for name, before, after, number in cases:
+        before_us, after_us = microseconds(before, number, repeat), microseconds(after, number, repeat)
+        results.append((name, f"{before_us:.1f}", f"{after_us:.1f}", f"{before_us / after_us:.1f}x"))
+
+    print("Encode time per response (microseconds)")
+    print_table(("route / payload", "default", "orjson", "speed-up"), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
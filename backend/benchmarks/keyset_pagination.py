@@ -0,0 +1,63 @@
+"""
+Latency of a chat_history page by depth: OFFSET (``skip``) pages get slower the deeper they
+are, keyset (``cursor``) pages stay flat.
+
+    python -m benchmarks.keyset_pagination [--rows 200000] [--limit 20]
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.common import client, create_engine, fill_chat_history, make_app, print_table, scratch_path, timed
+
+# Page positions, as fractions of the user's rows
+DEPTHS = (0, 0.005, 0.05, 0.25, 0.5, 0.95)
+
+
+async def main(rows: int, limit: int) -> None:
+    path = scratch_path("bench_keyset.db")
+    engine = await create_engine(path)
+    fill_chat_history(path, rows)
+    results = []
+    async with client(make_app(engine)) as http:
+        for sort in ("-id", "-created_at"):
+            for depth in sorted({int(rows * fraction) // limit * limit for fraction in DEPTHS}):
+                offset_params = {"sort": sort, "skip": depth, "limit": limit, "include_total": "false"}
+
+                async def offset_page():
+                    response = await http.get("/api/v1/entities/chat_history", params=offset_params)
+                    assert response.status_code == 200, response.text
+                    return response.json()
+
+                cursor = None
+                if depth:
+                    # The cursor a client holds after scrolling to ``depth``
+                    previous = {**offset_params, "skip": depth - limit}
+                    cursor = (await http.get("/api/v1/entities/chat_history", params=previous)).json()["next_cursor"]
+                keyset_params = {"sort": sort, "limit": limit, "include_total": "false"}
+                if cursor:
+                    keyset_params["cursor"] = cursor
+
+                async def keyset_page():
+                    response = await http.get("/api/v1/entities/chat_history", params=keyset_params)
+                    assert response.status_code == 200, response.text
+                    return response.json()
+
+                assert [item["id"] for item in (await offset_page())["items"]] == [
+                    item["id"] for item in (await keyset_page())["items"]
+                ]
+                results.append(
+                    (sort, depth, f"{await timed(offset_page):.2f}", f"{await timed(keyset_page):.2f}")
+                )
+    await engine.dispose()
+
+    print(f"chat_history, {rows} rows of one user, pages of {limit}")
+    print_table(("sort", "depth", "offset ms", "keyset ms"), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit))
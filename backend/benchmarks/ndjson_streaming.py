@@ -0,0 +1,106 @@
+"""
+Peak memory and time to first byte of ``GET /api/v1/entities/chat_history/all``: the NDJSON
+stream (``Accept: application/x-ndjson``) stays flat as the export grows, unlike a JSON page.
+
+    python -m benchmarks.ndjson_streaming [--rows 10000 50000 200000]
+
+The response is consumed at the ASGI level, chunk by chunk, so no client buffering is counted.
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks.common import create_engine, fill_chat_history, make_app, print_table, scratch_path
+
+PATH = "/api/v1/entities/chat_history/all"
+JSON_PAGE = 2000  # The largest /all page without streaming
+
+
+async def export(app, accept: str, params: dict) -> dict:
+    """Request ``PATH`` and drain the response; memory is traced from the request on"""
+    stats = {"bytes": 0, "chunks": 0, "ttfb_ms": None, "status": None}
+    start = time.perf_counter()
+
+    requested = asyncio.Event()
+
+    async def receive():
+        if requested.is_set():
+            # The client stays connected until the response is complete
+            await asyncio.Future()
+        requested.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            if stats["ttfb_ms"] is None:
+                stats["ttfb_ms"] = (time.perf_counter() - start) * 1000
+            stats["bytes"] += len(message.get("body", b""))
+            stats["chunks"] += 1
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": PATH,
+        "raw_path": PATH.encode(),
+        "query_string": urlencode(params).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"accept", accept.encode())],
+        "client": ("bench", 1),
+        "server": ("bench", 80),
+    }
+    gc.collect()
+    tracemalloc.start()
+    try:
+        await app(scope, receive, send)
+        stats["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+    stats["total_ms"] = (time.perf_counter() - start) * 1000
+    assert stats["status"] == 200, stats
+    return stats
+
+
+async def main(sizes) -> None:
+    path = scratch_path("bench_ndjson.db")
+    engine = await create_engine(path)
+    app = make_app(engine)
+    fill_chat_history(path, 100)
+    await export(app, "application/x-ndjson", {})  # Warm-up: imports, statement compilation
+    results = []
+    for rows in sizes:
+        fill_chat_history(path, rows)
+        runs = [("ndjson", rows, await export(app, "application/x-ndjson", {"include_total": "false"}))]
+        if rows >= JSON_PAGE and not any(result[0] == "json" for result in results):
+            runs.append(("json", JSON_PAGE, await export(app, "application/json", {"limit": JSON_PAGE})))
+        for mode, exported, stats in runs:
+            results.append(
+                (
+                    mode,
+                    exported,
+                    f"{stats['bytes'] / 1e6:.1f}",
+                    stats["chunks"],
+                    f"{stats['peak_mb']:.1f}",
+                    f"{stats['ttfb_ms']:.0f}",
+                    f"{stats['total_ms']:.0f}",
+                )
+            )
+    await engine.dispose()
+
+    print("chat_history export (timings are slowed down by tracemalloc)")
+    print_table(("mode", "rows", "MB sent", "chunks", "peak MB", "TTFB ms", "total ms"), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
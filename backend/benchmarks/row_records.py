@@ -0,0 +1,80 @@
+"""
+A 2000-row chat_history page read as ORM instances and validated into the response model
+(what list routes used to do) vs the read-only fast path: plain Row tuples turned into
+JSON-ready records (``Chat_historyService.get_list``).
+
+    python -m benchmarks.row_records [--rows 2000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from benchmarks.common import USER_ID, create_engine, fill_chat_history, print_table, scratch_path
+from models.chat_history import Chat_history
+from routers.chat_history import Chat_historyResponse
+from services.chat_history import Chat_historyService
+from utils.serialization import dumps
+
+RESPONSES = TypeAdapter(List[Chat_historyResponse])
+
+
+async def orm_page(db: AsyncSession, rows: int) -> bytes:
+    query = select(Chat_history).where(Chat_history.user_id == USER_ID).order_by(Chat_history.id.desc()).limit(rows)
+    objs = (await db.scalars(query)).all()
+    return RESPONSES.dump_json(RESPONSES.validate_python(objs, from_attributes=True))
+
+
+async def record_page(db: AsyncSession, rows: int) -> bytes:
+    page = await Chat_historyService(db).get_list(limit=rows, user_id=USER_ID, total_mode="none")
+    return dumps(page["items"])
+
+
+async def measure(session_maker, page, rows: int, repeat: int) -> dict:
+    async with session_maker() as db:
+        body = await page(db, rows)  # Warm-up
+    gc.collect()
+    tracemalloc.start()
+    async with session_maker() as db:
+        await page(db, rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        async with session_maker() as db:
+            await page(db, rows)
+    seconds = (time.perf_counter() - start) / repeat
+    return {"body": body, "peak_mb": peak / 1e6, "ms": seconds * 1000, "rows_per_s": rows / seconds}
+
+
+async def main(rows: int, repeat: int) -> None:
+    path = scratch_path("bench_row_records.db")
+    engine = await create_engine(path)
+    fill_chat_history(path, rows)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    results = []
+    for name, page in (("ORM + response model", orm_page), ("row records", record_page)):
+        stats = await measure(session_maker, page, rows, repeat)
+        results.append(
+            (name, f"{stats['peak_mb']:.1f}", f"{stats['ms']:.1f}", f"{stats['rows_per_s']:.0f}", len(stats["body"]))
+        )
+    await engine.dispose()
+
+    print(f"chat_history page of {rows} rows, read and serialized to JSON")
+    print_table(("path", "peak MB", "ms/page", "rows/s", "bytes"), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
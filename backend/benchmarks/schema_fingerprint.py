@@ -0,0 +1,93 @@
+"""
+Database initialization time of a cold start, with the schema fingerprint check (create_all
+skipped while the models are unchanged) and without it (create_all on every start).
+
+    python -m benchmarks.schema_fingerprint [--starts 5] [--rtt-ms 0]
+
+Every start is a fresh process, as a cold start is. SQLite answers catalog queries without
+a network round trip; ``--rtt-ms`` adds that much latency per statement to approximate a
+remote database.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import pkgutil
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import print_table, scratch_path
+
+
+async def start(rtt_ms: float) -> dict:
+    """One cold start's database initialization (run in a child process)"""
+    import routers  # Every router, and through them every model, as main.py registers them
+
+    for module in pkgutil.iter_modules(routers.__path__):
+        importlib.import_module(f"routers.{module.name}")
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from core.database import db_manager
+
+    statements = []
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def statement(*args):
+        statements.append(1)
+        if rtt_ms:
+            time.sleep(rtt_ms / 1000)
+
+    begin = time.perf_counter()
+    await db_manager.ensure_initialized()
+    elapsed = time.perf_counter() - begin
+    await db_manager.close_db()
+    return {"ms": elapsed * 1000, "statements": len(statements)}
+
+
+def run_start(path: str, fingerprint_check: bool, rtt_ms: float) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{path}",
+        "SCHEMA_FINGERPRINT_CHECK": str(fingerprint_check).lower(),
+        "CHAT_SEARCH_BACKFILL_ON_STARTUP": "false",
+    }
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.schema_fingerprint", "--child", "--rtt-ms", str(rtt_ms)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(starts: int, rtt_ms: float) -> None:
+    path = scratch_path("bench_schema_fingerprint.db")
+    first = run_start(path, True, rtt_ms)  # Creates the schema and stores its fingerprint
+    results = [("first start (empty database)", first["statements"], f"{first['ms']:.1f}")]
+    for label, fingerprint_check in (("create_all every start", False), ("fingerprint check", True)):
+        runs = [run_start(path, fingerprint_check, rtt_ms) for _ in range(starts)]
+        results.append(
+            (label, runs[-1]["statements"], f"{statistics.median(run['ms'] for run in runs):.1f}")
+        )
+
+    print(f"Database initialization per cold start (median of {starts}, {rtt_ms} ms per statement)")
+    print_table(("start", "statements", "ms"), results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--starts", type=int, default=5)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(start(args.rtt_ms))))
+    else:
+        main(args.starts, args.rtt_ms)
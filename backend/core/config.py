@@ -25,6 +25,71 @@ class Settings(BaseSettings):
     # Environment
     environment: str = "development"  # development, staging, production
 
+    # Connection pools of the primary and each replica (QueuePool; Lambda uses lambda_pool_mode)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20  # Extra connections opened beyond db_pool_size under load
+    db_pool_timeout: float = 30.0  # Seconds a checkout waits for a free connection
+    db_pool_recycle: int = 3600  # Connections older than this are replaced at checkout; -1 never
+    # A round trip on every checkout; without it stale connections are replaced by age
+    # (db_pool_recycle) and the pool is invalidated by the first disconnect error
+    db_pool_pre_ping: bool = True
+    db_pool_warmup: int = 0  # Connections opened per pool at startup (up to db_pool_size)
+
+    # Lambda connections: "null" opens one per request; "persistent" keeps a tiny pool across warm
+    # invocations and pings connections that sat idle (e.g. while the environment was frozen)
+    lambda_pool_mode: str = "null"  # null | persistent
+    lambda_pool_size: int = 1
+    lambda_pool_max_overflow: int = 1
+    lambda_pool_idle_ping_seconds: float = 10.0
+
+    # DATABASE_URL (and the replica URLs) point at a transaction-mode pooler such as PgBouncer,
+    # which cannot keep asyncpg's prepared statements across transactions
+    database_transaction_pooler: bool = False
+
+    # Read replicas (see core/database.py); GET list routes read from them when set
+    database_replica_urls: str = ""  # Comma-separated database URLs
+    replica_max_lag_seconds: float = 5.0  # Replicas further behind are skipped for the primary
+    replica_lag_check_interval: float = 2.0  # Seconds a replica's measured lag is reused
+    read_your_writes_seconds: float = 5.0  # A user's reads stay on the primary this long after their write
+
+    # Skip create_all at startup while the models match the schema it last created (see core/database.py);
+    # disable (or delete the schema_fingerprints row) to re-run it, e.g. after an alembic downgrade
+    schema_fingerprint_check: bool = True
+
+    # Entity list totals
+    list_count_cache_ttl: float = 5.0  # Seconds an exact (user, filter) total is reused; 0 disables
+
+    # Per-user read caches of rarely changing entities (user_profiles, protocol_recommendations)
+    read_cache_ttl: float = 60.0  # Seconds a cached read is served; 0 disables
+    read_cache_max_entries: int = 10000
+
+    # Response compression (gzip, or brotli when installed)
+    compression_minimum_size: int = 1024  # Bytes below which responses are sent uncompressed
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4  # Higher qualities are too slow for per-request compression
+
+    # Write-behind ingestion of chat_history messages (see services/write_buffer.py)
+    write_behind_mode: str = "off"  # off | group (ack once the shared batch commits) | async (ack on enqueue)
+    write_behind_flush_interval_ms: float = 20.0  # Longest a queued row waits for its batch
+    write_behind_max_rows: int = 200  # Queued rows that trigger a flush right away
+
+    # Full-text search over chat_history (see services/chat_search.py)
+    chat_search_config: str = "simple"  # Postgres text search configuration; changing it needs a reindex
+    chat_search_backfill_on_startup: bool = True  # Index pre-existing messages in the background
+    chat_search_backfill_batch_size: int = 500
+
+    # Archival of cold chat_history messages (see services/chat_archive.py)
+    chat_archive_enabled: bool = False  # Archive periodically in the background; otherwise run the module
+    chat_archive_hot_months: int = 3  # Whole months kept in chat_history besides the current one
+    chat_archive_interval_hours: float = 24.0
+    chat_archive_batch_size: int = 500
+    chat_archive_compression_level: int = 6  # zlib level of archived message content
+
+    @property
+    def running_on_lambda(self) -> bool:
+        """Whether this process runs in AWS Lambda (IS_LAMBDA, or set by the Lambda runtime)"""
+        return self.is_lambda or bool(os.environ.get("AWS_LAMBDA_FUNCTION_NAME"))
+
     @property
     def backend_url(self) -> str:
         """Generate backend URL from host and port."""
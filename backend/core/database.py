@@ -1,20 +1,27 @@
 import asyncio
+import bisect
+import hashlib
+import itertools
 import logging
-import os
 import re
 import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from asyncpg.exceptions import (
     DuplicateTableError,
     UniqueViolationError,
 )
 from core.config import settings
-from sqlalchemy import DDL, text
+from sqlalchemy import DDL, Column, DateTime, MetaData, String, Table, delete, event, exc, insert, select, text
 from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 logger = logging.getLogger(__name__)
 
@@ -23,13 +30,252 @@ class Base(DeclarativeBase):
     pass
 
 
+# Fingerprint of the schema create_all last completed for; kept out of Base.metadata so it
+# is not part of what it fingerprints
+schema_fingerprints = Table(
+    "schema_fingerprints",
+    MetaData(),
+    Column("name", String, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+)
+SCHEMA_FINGERPRINT_NAME = "metadata"
+
+
+def schema_fingerprint(dialect) -> str:
+    """SHA-256 of the DDL ``create_all`` emits for ``Base.metadata`` on ``dialect``
+
+    DDL run by ``after_create`` listeners counts through ``Base.metadata.info["extra_ddl"]``.
+    """
+    ddl = []
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            ddl.append(str(CreateIndex(index).compile(dialect=dialect)))
+    ddl.extend(Base.metadata.info.get("extra_ddl", ()))
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()
+
+
+# Seconds a Postgres standby is behind the primary (0 once it has replayed everything it received)
+REPLICA_LAG_QUERY = {
+    "postgresql": text(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+# Bound on a lag check and on connecting for a read (connect included), so an unreachable
+# replica costs a request at most this long
+REPLICA_CHECK_TIMEOUT = 1.0
+
+
+# Upper bounds (milliseconds) of the checkout time histogram of PoolStats
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+
+class PoolStats:
+    """Checkout counters of one connection pool, for sizing it from real saturation data"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+        self.checkout_histogram = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)
+        self.peak_checked_out = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.disconnects = 0
+
+    def record_checkout(self, seconds: float, checked_out: int) -> None:
+        self.checkouts += 1
+        self.checkout_seconds += seconds
+        self.max_checkout_seconds = max(self.max_checkout_seconds, seconds)
+        self.checkout_histogram[bisect.bisect_left(CHECKOUT_BUCKETS_MS, seconds * 1000)] += 1
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        labels = [f"<={bound}ms" for bound in CHECKOUT_BUCKETS_MS] + [f">{CHECKOUT_BUCKETS_MS[-1]}ms"]
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # Connections beyond size currently open (negative while the pool is not yet filled)
+            "overflow": pool.overflow(),
+            "max_overflow": pool.max_overflow,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_checkout_ms": round(self.checkout_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_checkout_ms": round(self.max_checkout_seconds * 1000, 3),
+            "checkout_histogram": dict(zip(labels, self.checkout_histogram)),
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "disconnects": self.disconnects,
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` that times every checkout into its ``PoolStats``
+
+    A checkout's time covers waiting for a free connection, opening a new one and the
+    pre-ping, i.e. everything a request waits for before its first statement.
+    """
+
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kwargs):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kwargs)
+        # As configured (QueuePool keeps it privately); recreate() passes it on
+        self.max_overflow = max_overflow
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+    def recreate(self):
+        # Engine.dispose() replaces the pool; its counters carry over
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def instrument_engine(engine) -> None:
+    """Count new, invalidated and lost connections of ``engine``'s pool into its ``PoolStats``
+
+    Dropped connections are left to SQLAlchemy's own handling: a statement failing with an
+    error the dialect classifies as a disconnect invalidates its connection and (its
+    default ``invalidate_pool_on_disconnect``) every connection opened before it, so the
+    next checkouts reconnect instead of failing one by one. The error itself still reaches
+    the request. The ``handle_error`` listener here only counts those errors.
+    """
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return
+    stats = pool.stats
+
+    def connected(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    def invalidated(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    def failed(context):
+        if context.is_disconnect:
+            stats.disconnects += 1
+
+    event.listen(engine.sync_engine, "connect", connected)
+    event.listen(engine.sync_engine, "invalidate", invalidated)
+    event.listen(engine.sync_engine, "soft_invalidate", invalidated)
+    event.listen(engine.sync_engine, "handle_error", failed)
+
+
+async def warm_up_engine(engine, connections: int) -> int:
+    """Open up to ``connections`` pooled connections of ``engine`` now; returns how many opened"""
+    pool = engine.sync_engine.pool
+    if connections <= 0 or not isinstance(pool, InstrumentedQueuePool):
+        return 0
+    opened = [engine.connect() for _ in range(min(connections, pool.size()))]
+    results = await asyncio.gather(*(connection.start() for connection in opened), return_exceptions=True)
+    for connection in opened:
+        await connection.close()
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        logger.warning(f"Pool warm-up opened {len(opened) - len(failures)} of {len(opened)} connections: {failures[0]}")
+    return len(opened) - len(failures)
+
+
+def ping_after_idle(engine, idle_seconds: float) -> None:
+    """Ping ``engine``'s pooled connections at checkout when they sat idle over ``idle_seconds``
+
+    Unlike pre-ping, connections checked out back to back are not pinged. Idle time is
+    wall-clock time, which keeps running while a Lambda environment is frozen between
+    invocations (when the server or a proxy may drop its connections); a connection that
+    fails the ping is replaced by a new one within the same checkout.
+    """
+
+    def checked_in(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.time()
+
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        idle = time.time() - connection_record.info.pop("checked_in_at", time.time())
+        if idle <= idle_seconds:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            raise exc.DisconnectionError(f"Connection idle for {idle:.0f}s failed its ping: {e}") from e
+
+    event.listen(engine.sync_engine, "checkin", checked_in)
+    event.listen(engine.sync_engine, "checkout", checkout)
+
+
+class Replica:
+    """A read replica's engine and its last measured health"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.name = engine.url.host or engine.url.database
+        self.session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        self.usable = False
+        self.checked_at = float("-inf")
+        self.checking = False
+
+    async def check(self) -> bool:
+        """Whether the replica answers and is at most ``replica_max_lag_seconds`` behind
+
+        Re-measured at most every ``replica_lag_check_interval`` seconds; requests arriving
+        during a measurement use the previous result.
+        """
+        if self.checking or time.monotonic() - self.checked_at < settings.replica_lag_check_interval:
+            return self.usable
+        self.checking = True
+        try:
+            lag = 0.0
+            query = REPLICA_LAG_QUERY.get(self.engine.dialect.name)
+            if query is not None:
+                lag = float(await asyncio.wait_for(self._measure_lag(query), REPLICA_CHECK_TIMEOUT) or 0)
+            self.usable = lag <= settings.replica_max_lag_seconds
+            if not self.usable:
+                logger.warning(f"Read replica {self.name} is {lag:.1f}s behind; reading from the primary")
+        except Exception as e:
+            self.usable = False
+            logger.warning(f"Read replica {self.name} unavailable: {e!r}")
+        finally:
+            self.checking = False
+            self.checked_at = time.monotonic()
+        return self.usable
+
+    async def _measure_lag(self, query) -> Any:
+        async with self.engine.connect() as conn:
+            return await conn.scalar(query)
+
+    def failed(self) -> None:
+        """Take the replica out of rotation until its next check"""
+        self.usable = False
+        self.checked_at = time.monotonic()
+
+
 class DatabaseManager:
     def __init__(self):
         self.engine = None
         self._initialized = False
         self.async_session_maker = None
-        self._init_lock = asyncio.Lock()  # Protect initialization process
+        # The one initialization attempt in flight, awaited by every caller (see ensure_initialized)
+        self._init_task: Optional[asyncio.Task] = None
+        # Event loop the pooled connections belong to (see adopt_running_loop)
+        self._engine_loop: Optional[asyncio.AbstractEventLoop] = None
         self._table_creation_lock = asyncio.Lock()  # Protect table creation process
+        # Optional read replicas (DATABASE_REPLICA_URLS), taken in turn by read_session
+        self.replicas: List[Replica] = []
+        self._replica_turn = itertools.count()
+        # Users whose reads stay on the primary until the given monotonic time (read-your-writes)
+        self._pinned: Dict[Optional[str], float] = {}
 
     def _normalize_async_database_url(self, raw_url: str) -> str:
         """Ensure the database URL uses an async driver compatible with SQLAlchemy asyncio.
@@ -84,58 +330,116 @@ class DatabaseManager:
             logger.error(f"Database not found:{filename}")
         return found
 
+    @staticmethod
+    def _lambda_pool_mode() -> Optional[str]:
+        """``lambda_pool_mode`` ("null" or "persistent") in a Lambda environment, None elsewhere"""
+        if not settings.running_on_lambda:
+            return None
+        mode = settings.lambda_pool_mode.lower()
+        if mode not in ("null", "persistent"):
+            logger.warning(f"Unknown lambda_pool_mode {settings.lambda_pool_mode!r}; using null")
+            return "null"
+        return mode
+
+    def _engine_kwargs(self, database_url: str) -> dict:
+        """Engine options for the primary or a replica at ``database_url``"""
+        # Configure engine based on environment (Lambda vs non-Lambda)
+        engine_kwargs = {
+            "echo": settings.debug,
+        }
+
+        lambda_pool_mode = self._lambda_pool_mode()
+        if lambda_pool_mode == "null":
+            # Lambda: Use NullPool to avoid connection state conflicts
+            # NullPool creates a fresh connection for each request, avoiding "cannot switch to state" errors
+            engine_kwargs["poolclass"] = NullPool
+            # NullPool doesn't support pool_timeout, pool_size, max_overflow, pool_recycle, or pool_pre_ping
+            # These parameters are only valid for QueuePool
+            logger.info("Using NullPool for Lambda environment to avoid connection state conflicts")
+        elif lambda_pool_mode == "persistent":
+            # Lambda: a tiny pool whose connections survive between warm invocations of this
+            # environment; after a freeze they are pinged at checkout (see ping_after_idle)
+            engine_kwargs["poolclass"] = InstrumentedQueuePool
+            engine_kwargs["pool_size"] = settings.lambda_pool_size
+            engine_kwargs["max_overflow"] = settings.lambda_pool_max_overflow
+            engine_kwargs["pool_timeout"] = settings.db_pool_timeout
+            engine_kwargs["pool_recycle"] = settings.db_pool_recycle
+            logger.info(
+                f"Using persistent QueuePool (size {settings.lambda_pool_size}, "
+                f"overflow {settings.lambda_pool_max_overflow}) for Lambda environment"
+            )
+        else:
+            # Non-Lambda: Use QueuePool with connection pooling, timed for /database/pool-stats
+            engine_kwargs["poolclass"] = InstrumentedQueuePool
+            engine_kwargs["pool_size"] = settings.db_pool_size
+            engine_kwargs["max_overflow"] = settings.db_max_overflow
+            engine_kwargs["pool_timeout"] = settings.db_pool_timeout
+            engine_kwargs["pool_recycle"] = settings.db_pool_recycle
+            # Without pre-ping, stale connections are replaced by age (pool_recycle) and the whole
+            # pool is invalidated by the first disconnect error, instead of a round trip per checkout
+            engine_kwargs["pool_pre_ping"] = settings.db_pool_pre_ping
+            logger.info(
+                f"Using QueuePool (size {settings.db_pool_size}, overflow {settings.db_max_overflow}, "
+                f"pre-ping {settings.db_pool_pre_ping}) for non-Lambda environment"
+            )
+
+        if settings.database_transaction_pooler and make_url(database_url).drivername.endswith("+asyncpg"):
+            # A transaction pooler runs each transaction on whichever server connection is free,
+            # where statements asyncpg prepared on another one do not exist: no statement caches,
+            # and unique names for the unnamed statements asyncpg still prepares
+            engine_kwargs["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+            logger.info("Prepared statement caching disabled for a transaction pooler")
+        return engine_kwargs
+
+    def _create_engine(self, raw_url: str):
+        """Async engine for the primary or a replica at ``raw_url``, with its pool instrumented"""
+        database_url = self._normalize_async_database_url(raw_url)
+        engine = create_async_engine(database_url, **self._engine_kwargs(database_url))
+        instrument_engine(engine)
+        if self._lambda_pool_mode() == "persistent":
+            ping_after_idle(engine, settings.lambda_pool_idle_ping_seconds)
+        return engine
+
+    @property
+    def ready(self) -> bool:
+        """Whether the engine exists and the tables have been created"""
+        return self.async_session_maker is not None and self._initialized
+
     async def init_db(self):
-        """Initialize database connection with thread safety"""
+        """Create the engine (and replica engines) unless they exist
+
+        Nothing is awaited between the check and the assignment, so one event loop never
+        builds two engines; use ``ensure_initialized`` to include table creation.
+        """
         logger.info("Starting database initialization...")
 
-        async with self._init_lock:
-            if self.engine is not None:
-                logger.info("Database already initialized")
-                return
+        if self.engine is not None:
+            logger.info("Database already initialized")
+            return
 
         if not settings.database_url:
             logger.error("No database URL provided. DATABASE_URL environment variable must be set.")
             raise ValueError("DATABASE_URL environment variable is required")
 
         try:
-            logger.info("Normalizing database URL for async compatibility...")
-            database_url = self._normalize_async_database_url(settings.database_url)
-
             logger.info("Creating async database engine...")
-            # Configure engine based on environment (Lambda vs non-Lambda)
-            engine_kwargs = {
-                "echo": settings.debug,
-            }
-
-            # Check if we're in a Lambda environment
-            is_lambda = bool(
-                os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
-                or os.environ.get("IS_LAMBDA", "").lower() in ("true", "1", "yes")
-            )
-
-            if is_lambda:
-                # Lambda: Use NullPool to avoid connection state conflicts
-                # NullPool creates a fresh connection for each request, avoiding "cannot switch to state" errors
-                engine_kwargs["poolclass"] = NullPool
-                # NullPool doesn't support pool_timeout, pool_size, max_overflow, pool_recycle, or pool_pre_ping
-                # These parameters are only valid for QueuePool
-                logger.info("Using NullPool for Lambda environment to avoid connection state conflicts")
-            else:
-                # Non-Lambda: Use QueuePool with connection pooling
-                engine_kwargs["pool_pre_ping"] = True  # Verify connections before using them
-                engine_kwargs["pool_size"] = 10  # Connection pool size
-                engine_kwargs["max_overflow"] = 20  # Maximum overflow connections
-                engine_kwargs["pool_recycle"] = 3600  # Connection recycle time (1 hour)
-                engine_kwargs["pool_timeout"] = 30  # Connection acquisition timeout (30 seconds)
-                logger.info("Using QueuePool with connection pooling for non-Lambda environment")
-
-            self.engine = create_async_engine(database_url, **engine_kwargs)
+            self.engine = self._create_engine(settings.database_url)
+            self._engine_loop = asyncio.get_running_loop()
             logger.info("Database engine created successfully")
 
             logger.info("Creating async session maker...")
             self.async_session_maker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
             logger.info("Async session maker created successfully")
 
+            replica_urls = [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
+            self.replicas = [Replica(self._create_engine(url)) for url in replica_urls]
+            if self.replicas:
+                logger.info(f"Created engines for {len(self.replicas)} read replicas")
+
             logger.info("Database connection initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}", exc_info=True)
@@ -151,6 +455,8 @@ class DatabaseManager:
             return  # Already closed
 
         try:
+            for replica in self.replicas:
+                await replica.engine.dispose()
             await self.engine.dispose()
             logger.info("Database connection closed and engine disposed")
         except Exception as e:
@@ -159,7 +465,81 @@ class DatabaseManager:
             # Always reset references even if dispose fails
             self.engine = None
             self.async_session_maker = None
+            self.replicas = []
             self._initialized = False  # Reset initialization flag
+            self._init_task = None
+            self._engine_loop = None
+
+    def adopt_running_loop(self) -> None:
+        """Replace the connection pools if they were filled on another event loop than this one
+
+        asyncpg connections only work on the loop that opened them, and a persistent Lambda
+        pool outlives the loop if the handler ever initializes on one and serves on another.
+        The old connections are dropped without closing them, as their loop may be gone.
+        """
+        loop = asyncio.get_running_loop()
+        if self._engine_loop is loop or self.engine is None:
+            return
+        for engine in [self.engine, *(replica.engine for replica in self.replicas)]:
+            engine.sync_engine.dispose(close=False)
+        self._engine_loop = loop
+        logger.info("Event loop changed; replaced the database connection pools")
+
+    def note_write(self, user_id: Optional[str]) -> None:
+        """Keep ``user_id``'s reads on the primary for ``read_your_writes_seconds`` (everyone's if None)
+
+        Tracked per process, like the read caches.
+        """
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        if len(self._pinned) > 10000:
+            self._pinned = {key: until for key, until in self._pinned.items() if until > now}
+        self._pinned[user_id] = now + settings.read_your_writes_seconds
+
+    def _pinned_to_primary(self, user_id: Optional[str]) -> bool:
+        now = time.monotonic()
+        if self._pinned.get(None, 0) > now:
+            return True
+        if user_id is None:
+            # Reads across every user's rows see anyone's recent write
+            return any(until > now for until in self._pinned.values())
+        return self._pinned.get(user_id, 0) > now
+
+    @asynccontextmanager
+    async def read_session(self, user_id: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        """Session for read-only queries of ``user_id`` (of every user if None)
+
+        Replicas are taken in turn, skipping those that are unreachable or too far behind;
+        the primary serves the read when none is usable, when the replica fails to connect,
+        or while ``user_id`` (or anyone, for reads across users) wrote within
+        ``read_your_writes_seconds``.
+        """
+        session_maker = self.async_session_maker
+        replica = None
+        if self.replicas and not self._pinned_to_primary(user_id):
+            for _ in range(len(self.replicas)):
+                candidate = self.replicas[next(self._replica_turn) % len(self.replicas)]
+                if await candidate.check():
+                    replica = candidate
+                    break
+
+        if replica is not None:
+            session = replica.session_maker()
+            try:
+                # Connect up front, so a failing or hanging replica still falls back to the primary
+                await asyncio.wait_for(session.connection(), REPLICA_CHECK_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Read replica {replica.name} failed to connect: {e!r}")
+                replica.failed()
+                await session.close()
+            else:
+                async with session:
+                    yield session
+                return
+
+        async with session_maker() as session:
+            yield session
 
     async def create_tables(self):
         """Create all tables with thread safety"""
@@ -175,6 +555,15 @@ class DatabaseManager:
                 logger.error("Database engine not initialized")
                 raise RuntimeError("Database engine not initialized")
 
+            # Unchanged models since the last completed create_all: one query instead of the
+            # catalog round trips of create_all (and of the table repair)
+            fingerprint = schema_fingerprint(self.engine.dialect)
+            if settings.schema_fingerprint_check and await self._stored_schema_fingerprint() == fingerprint:
+                self._initialized = True
+                logger.info("Schema unchanged since the last table creation, skipping create_all")
+                logger.debug(f"[DB_OP] Create tables skipped in {time.time() - start_time:.4f}s")
+                return
+
             # logger.info("🔧 Starting table structure repair...")
             # await self.check_and_repair_existing_tables()
             # logger.info("🔧 Table structure repair completed")
@@ -186,6 +575,7 @@ class DatabaseManager:
                     self._initialized = True
                     logger.info("Tables initialized successfully")
                     logger.debug(f"[DB_OP] Create tables completed in {time.time() - start_time:.4f}s")
+                await self._store_schema_fingerprint(fingerprint)
             except (UniqueViolationError, DuplicateTableError) as e:
                 self._initialized = True
                 logger.info(f"Duplicate table creation: {e}, ignored.")
@@ -195,6 +585,35 @@ class DatabaseManager:
         finally:
             self._table_creation_lock.release()
 
+    async def _stored_schema_fingerprint(self) -> Optional[str]:
+        try:
+            async with self.engine.connect() as conn:
+                return await conn.scalar(
+                    select(schema_fingerprints.c.fingerprint).where(
+                        schema_fingerprints.c.name == SCHEMA_FINGERPRINT_NAME
+                    )
+                )
+        except Exception as e:
+            # First start on this database: the table does not exist yet
+            logger.debug(f"No stored schema fingerprint: {e}")
+            return None
+
+    async def _store_schema_fingerprint(self, fingerprint: str) -> None:
+        try:
+            async with self.engine.begin() as conn:
+                await conn.run_sync(schema_fingerprints.create, checkfirst=True)
+                await conn.execute(
+                    delete(schema_fingerprints).where(schema_fingerprints.c.name == SCHEMA_FINGERPRINT_NAME)
+                )
+                await conn.execute(
+                    insert(schema_fingerprints).values(
+                        name=SCHEMA_FINGERPRINT_NAME, fingerprint=fingerprint, updated_at=datetime.now(timezone.utc)
+                    )
+                )
+        except Exception as e:
+            # Only costs the next start a create_all
+            logger.warning(f"Failed to store the schema fingerprint: {e}")
+
     async def check_and_repair_existing_tables(self):
         """Check and fix the structure of existing tables, adding only the missing fields."""
         repair_start = time.time()
@@ -478,31 +897,58 @@ class DatabaseManager:
         return sql
 
     async def ensure_initialized(self):
-        """Ensure database is initialized - used for lazy loading in Lambda environments"""
-        # Quick check without lock (double-checked locking pattern)
-        if self.async_session_maker is not None:
-            return
+        """Create the engine and the tables once, however many callers arrive at the same time
 
-        # Use lock to prevent concurrent initialization attempts in the same Lambda execution environment
-        async with self._init_lock:
-            # Double-check after acquiring lock (another request might have initialized it while we waited)
-            if self.async_session_maker is not None:
-                return
-
-            logger.warning("Database not initialized, attempting lazy initialization...")
+        The first caller starts the initialization as a task and every caller (including
+        those arriving while it runs) awaits that same task, so there is exactly one engine
+        and pool and nobody gets a session before the tables exist. A caller being cancelled
+        does not cancel the initialization; a failed attempt is dropped so the next caller
+        retries.
+        """
+        if self.ready:
+            return
+        if self._init_task is None:
+            self._init_task = asyncio.get_running_loop().create_task(self._initialize())
+        task = self._init_task
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            if self._init_task is task and task.done():
+                self._init_task = None
+            raise
 
-        # Release lock before calling init_db() because:
-        # 1. init_db() will try to acquire the same _init_lock internally (line 93), which would cause deadlock
-        # 2. Note: init_db() has a bug - its lock is released after the check (line 96),
-        #    so the actual initialization code (lines 98-146) is not protected by lock.
-        #    This is a pre-existing issue, not introduced by this change.
-        # 3. The double-checked locking pattern above ensures only one request proceeds to initialization
+    async def warm_up_pools(self) -> None:
+        """Open ``db_pool_warmup`` connections per engine, so the first requests do not connect"""
+        if settings.db_pool_warmup <= 0:
+            return
+        engines = [self.engine, *(replica.engine for replica in self.replicas)]
+        opened = await asyncio.gather(*(warm_up_engine(engine, settings.db_pool_warmup) for engine in engines))
+        logger.info(f"Warmed up connection pools: {sum(opened)} connections opened")
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Saturation and checkout timings of the primary and replica pools"""
+
+        def engine_stats(engine) -> Dict[str, Any]:
+            pool = engine.sync_engine.pool
+            if isinstance(pool, InstrumentedQueuePool):
+                return pool.stats.snapshot(pool)
+            return {"pool": type(pool).__name__}
+
+        if self.engine is None:
+            return {"primary": None, "replicas": {}}
+        return {
+            "primary": engine_stats(self.engine),
+            "replicas": {replica.name: engine_stats(replica.engine) for replica in self.replicas},
+        }
+
+    async def _initialize(self) -> None:
         try:
             await self.init_db()
             await self.create_tables()
-            logger.info("Lazy database initialization completed successfully")
+            await self.warm_up_pools()
+            logger.info("Database initialization completed successfully")
         except Exception as e:
-            logger.error(f"Failed to lazy initialize database: {e}", exc_info=True)
+            logger.error(f"Failed to initialize database: {e}", exc_info=True)
             raise
 
 
@@ -515,17 +961,14 @@ async def get_db() -> AsyncSession:
     logger.debug("[DB_OP] Starting get_db session creation")
 
     # Lazy initialization for Lambda environments where lifespan may not trigger
-    if not db_manager.async_session_maker:
-        logger.warning("Database session maker not available, attempting lazy initialization...")
+    if not db_manager.ready:
+        logger.warning("Database not initialized, attempting lazy initialization...")
         try:
             await db_manager.ensure_initialized()
         except Exception as e:
             logger.error(f"Failed to ensure database initialization: {e}", exc_info=True)
             raise RuntimeError("Database initialization failed") from e
-
-    if not db_manager.async_session_maker:
-        logger.error("No async database session maker available after initialization attempt")
-        raise RuntimeError("Database not initialized")
+    db_manager.adopt_running_loop()
 
     try:
         async with db_manager.async_session_maker() as session:
@@ -543,3 +986,22 @@ async def get_db() -> AsyncSession:
     except Exception as e:
         logger.error(f"Failed to create database session: {e}", exc_info=True)
         raise
+
+
+async def read_db(user_id: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+    """Session for read-only queries of ``user_id``, on a replica when one is usable
+
+    See ``DatabaseManager.read_session``; the FastAPI dependencies are in
+    ``dependencies.database``.
+    """
+    if not db_manager.ready:
+        logger.warning("Database not initialized, attempting lazy initialization...")
+        try:
+            await db_manager.ensure_initialized()
+        except Exception as e:
+            logger.error(f"Failed to ensure database initialization: {e}", exc_info=True)
+            raise RuntimeError("Database initialization failed") from e
+    db_manager.adopt_running_loop()
+
+    async with db_manager.read_session(user_id) as session:
+        yield session
@@ -1,8 +1,26 @@
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
-from core.database import get_db
+from core.database import get_db, read_db
+from dependencies.auth import get_current_user
 from fastapi import Depends
+from schemas.auth import UserResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+
+async def get_read_db(current_user: UserResponse = Depends(get_current_user)) -> AsyncIterator[AsyncSession]:
+    """Session for the current user's read-only queries: a read replica, unless they just wrote"""
+    async for session in read_db(str(current_user.id)):
+        yield session
+
+
+async def get_all_read_db() -> AsyncIterator[AsyncSession]:
+    """Session for read-only queries across every user's rows: a read replica, unless anyone just wrote"""
+    async for session in read_db(None):
+        yield session
+
+
 # Database session dependency
 DbSession = Annotated[AsyncSession, Depends(get_db)]
+# Read-only session dependencies (read replicas when DATABASE_REPLICA_URLS is set)
+ReadDbSession = Annotated[AsyncSession, Depends(get_read_db)]
+AllReadDbSession = Annotated[AsyncSession, Depends(get_all_read_db)]
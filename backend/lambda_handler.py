@@ -35,6 +35,12 @@ seo_paths = set()
 # SEO domain placeholder - will be replaced with actual request domain at runtime
 SEO_DOMAIN_PLACEHOLDER = "https://atoms.template.com"
 
+# The built frontend, as packaged into the Lambda bundle
+FRONTEND_DIST = "/var/task/frontend/dist"
+
+# Build-time compressed siblings of static files (app.js.br, app.js.gz), in order of preference
+PRECOMPRESSED_SUFFIXES = ((".br", "br"), (".gz", "gzip"))
+
 
 def format_traceback() -> str:
     """Format traceback with newlines replaced by '\\n' string literal"""
@@ -48,7 +54,7 @@ def initialize_dynamic_routes():
     if dynamic_routes_initialized:
         return
     
-    dist_path = "/var/task/frontend/dist"
+    dist_path = FRONTEND_DIST
     
     try:
         if os.path.exists(dist_path):
@@ -245,7 +251,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             (".js", ".css", ".png", ".jpg", ".jpeg", ".gif", ".ico", ".svg", ".woff", ".woff2", ".ttf", ".eot")
         ):
             # Serve static files
-            return serve_static_file(path)
+            return serve_static_file(path, headers)
         
         elif path == "/sitemap.xml":
             return serve_sitemap(request_domain)
@@ -291,13 +297,11 @@ def handle_backend_request_sync(event: Dict[str, Any], context: Any) -> Dict[str
                 # If loop is not running, run directly
                 loop.run_until_complete(initialize_services_once())
         except RuntimeError:
-            # No event loop exists, create a new one
+            # No event loop exists, create a new one; it stays open as the thread's loop, which
+            # Mangum runs every invocation on, so pooled connections opened here stay usable
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(initialize_services_once())
-            finally:
-                loop.close()
+            loop.run_until_complete(initialize_services_once())
 
     # Get or create Mangum handler
     mangum_handler = get_mangum_handler_sync()
@@ -310,7 +314,7 @@ def handle_backend_request_sync(event: Dict[str, Any], context: Any) -> Dict[str
 def serve_frontend() -> Dict[str, Any]:
     """Serve the frontend HTML"""
     # Try to read the built frontend HTML
-    html_path = "/var/task/frontend/dist/index.html"
+    html_path = f"{FRONTEND_DIST}/index.html"
     if os.path.exists(html_path):
         with open(html_path, "r", encoding="utf-8") as f:
             html_content = f.read()
@@ -363,8 +367,27 @@ def serve_frontend() -> Dict[str, Any]:
         }
 
 
-def serve_static_file(path: str) -> Dict[str, Any]:
-    """Serve static files"""
+def accepted_encodings(headers: dict) -> set:
+    """Content codings the client accepts (q > 0) according to its Accept-Encoding header"""
+    accept_encoding = headers.get("accept-encoding", headers.get("Accept-Encoding", "")) or ""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def serve_static_file(path: str, headers: dict = None) -> Dict[str, Any]:
+    """Serve static files, preferring a precompressed sibling the client accepts"""
     # Map file extensions to content types
     content_types = {
         ".js": "application/javascript",
@@ -382,13 +405,38 @@ def serve_static_file(path: str) -> Dict[str, Any]:
     content_type = content_types.get(ext, "application/octet-stream")
 
     # Try to read the file
-    file_path = f"/var/task/frontend/dist{path}"
+    file_path = f"{FRONTEND_DIST}{path}"
     if os.path.exists(file_path):
+        accepted = accepted_encodings(headers or {})
+        has_sibling = False
+        for suffix, encoding in PRECOMPRESSED_SUFFIXES:
+            if not os.path.exists(file_path + suffix):
+                continue
+            has_sibling = True
+            if encoding in accepted or "*" in accepted:
+                with open(file_path + suffix, "rb") as f:
+                    content = f.read()
+                return {
+                    "statusCode": 200,
+                    "headers": {
+                        "Content-Type": content_type,
+                        "Content-Encoding": encoding,
+                        "Vary": "Accept-Encoding",
+                        "Access-Control-Allow-Origin": "*",
+                    },
+                    "body": base64.b64encode(content).decode("utf-8"),
+                    "isBase64Encoded": True,
+                }
+
         with open(file_path, "rb") as f:
             content = f.read()
+        response_headers = {"Content-Type": content_type, "Access-Control-Allow-Origin": "*"}
+        if has_sibling:
+            # The same URL is served encoded to other clients
+            response_headers["Vary"] = "Accept-Encoding"
         return {
             "statusCode": 200,
-            "headers": {"Content-Type": content_type, "Access-Control-Allow-Origin": "*"},
+            "headers": response_headers,
             "body": content.decode("utf-8")
             if content_type.startswith("text/")
             else base64.b64encode(content).decode("utf-8"),
@@ -517,7 +565,7 @@ def replace_seo_domain(content: str, request_domain: str) -> str:
 
 def serve_sitemap(request_domain: str = "") -> Dict[str, Any]:
     """Serve sitemap.xml file"""
-    sitemap_path = "/var/task/frontend/dist/sitemap.xml"
+    sitemap_path = f"{FRONTEND_DIST}/sitemap.xml"
     if not os.path.exists(sitemap_path):
         return {"statusCode": 404, "headers": {"Content-Type": "text/plain", "Access-Control-Allow-Origin": "*"}, "body": "sitemap.xml not found"}
     
@@ -537,7 +585,7 @@ def serve_sitemap(request_domain: str = "") -> Dict[str, Any]:
 
 def serve_robots() -> Dict[str, Any]:
     """Serve robots.txt file"""
-    robots_path = "/var/task/frontend/dist/robots.txt"
+    robots_path = f"{FRONTEND_DIST}/robots.txt"
     if not os.path.exists(robots_path):
         return {"statusCode": 404, "headers": {"Content-Type": "text/plain", "Access-Control-Allow-Origin": "*"}, "body": "robots.txt not found"}
     
@@ -557,7 +605,7 @@ def serve_robots() -> Dict[str, Any]:
 
 def serve_seo_html(path: str, request_domain: str = "") -> Dict[str, Any]:
     """Serve SEO HTML files from index.html"""
-    html_path = f"/var/task/frontend/dist{path.rstrip('/')}/index.html"
+    html_path = f"{FRONTEND_DIST}{path.rstrip('/')}/index.html"
     
     if not os.path.exists(html_path):
         return {"statusCode": 404, "headers": {"Content-Type": "text/html", "Access-Control-Allow-Origin": "*"}, "body": "<html><body><h1>404 Not Found</h1></body></html>"}
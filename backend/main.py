@@ -1,3 +1,4 @@
+import asyncio
 import importlib
 import logging
 import os
@@ -9,6 +10,10 @@ from core.config import settings
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRouter
+from middlewares.compression import CompressionMiddleware
+from services.chat_archive import start_chat_archival
+from services.chat_search import start_search_backfill
+from utils.serialization import FastJSONResponse
 
 # MODULE_IMPORTS_START
 from services.database import initialize_database, close_database
@@ -69,8 +74,18 @@ async def lifespan(app: FastAPI):
     await initialize_admin_user()
     # MODULE_STARTUP_END
 
+    # Messages stored before full-text search existed are indexed without delaying startup
+    search_backfill = start_search_backfill() if settings.chat_search_backfill_on_startup else None
+    # Cold chat_history messages are moved to the archive now and then every interval
+    chat_archival = start_chat_archival() if settings.chat_archive_enabled else None
+
     logger.info("=== Application startup completed successfully ===")
     yield
+    # Background jobs are stopped before the engine is disposed; both resume on the next start
+    background_jobs = [job for job in (search_backfill, chat_archival) if job is not None]
+    for job in background_jobs:
+        job.cancel()
+    await asyncio.gather(*background_jobs, return_exceptions=True)
     # MODULE_SHUTDOWN_START
     await close_database()
     # MODULE_SHUTDOWN_END
@@ -81,6 +96,7 @@ app = FastAPI(
     description="A best-practice FastAPI template with modular architecture",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 
@@ -93,6 +109,12 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
 # MODULE_MIDDLEWARE_END
 
 
@@ -1,10 +1,15 @@
 from core.database import Base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String
 
 
 class Chat_history(Base):
     __tablename__ = "chat_history"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_chat_history_user_id_id", "user_id", "id"),
+        Index("ix_chat_history_user_id_session_id_id", "user_id", "session_id", "id"),
+        Index("ix_chat_history_user_id_created_at", "user_id", "created_at"),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True, nullable=False)
     user_id = Column(String, nullable=False)
@@ -12,4 +17,4 @@ class Chat_history(Base):
     role = Column(String, nullable=False)
     content = Column(String, nullable=False)
     intake_step = Column(String, nullable=True)
-    created_at = Column(String, nullable=False)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), nullable=False)
\ No newline at end of file
@@ -0,0 +1,21 @@
+from core.database import Base
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String
+
+
+# Cold chat_history messages moved out by services/chat_archive.py; content is zlib-compressed.
+# On Postgres the table is range partitioned by month, so the primary key includes created_at.
+class Chat_history_archive(Base):
+    __tablename__ = "chat_history_archive"
+    __table_args__ = (
+        Index("ix_chat_history_archive_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_chat_history_archive_user_id_session_id_created_at", "user_id", "session_id", "created_at"),
+        {"extend_existing": True, "postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False, nullable=False)
+    user_id = Column(String, nullable=False)
+    session_id = Column(String, nullable=False)
+    role = Column(String, nullable=False)
+    content = Column(LargeBinary, nullable=False)
+    intake_step = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False)
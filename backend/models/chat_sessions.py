@@ -0,0 +1,23 @@
+from core.database import Base
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+
+# One row per (user, chat session), kept in step with chat_history by services/chat_sessions.py
+class Chat_sessions(Base):
+    __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ux_chat_sessions_user_id_session_id", "user_id", "session_id", unique=True),
+        # Serves the session sidebar: most recently active first, seeked by (last_message_at, id)
+        Index("ix_chat_sessions_user_id_last_message_at_id", "user_id", "last_message_at", "id"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True, nullable=False)
+    user_id = Column(String, nullable=False)
+    session_id = Column(String, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    first_message_at = Column(DateTime(timezone=True), nullable=False)
+    last_message_at = Column(DateTime(timezone=True), nullable=False)
+    # The message the snippet was taken from; breaks ties between messages with the same timestamp
+    last_message_id = Column(Integer, nullable=False)
+    last_snippet = Column(String, nullable=True)
\ No newline at end of file
@@ -1,10 +1,14 @@
 from core.database import Base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String
 
 
 class Protocol_recommendations(Base):
     __tablename__ = "protocol_recommendations"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_protocol_recommendations_user_id_id", "user_id", "id"),
+        Index("ix_protocol_recommendations_user_id_created_at", "user_id", "created_at"),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True, nullable=False)
     user_id = Column(String, nullable=False)
@@ -18,4 +22,6 @@ class Protocol_recommendations(Base):
     warnings = Column(String, nullable=True)
     eligibility = Column(String, nullable=False)
     mechanistic_basis = Column(String, nullable=True)
-    created_at = Column(String, nullable=False)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    # Increasing stamp replaced on every write, so ETags come from one aggregate instead of the rows
+    row_version = Column(BigInteger, nullable=False, server_default="0")
\ No newline at end of file
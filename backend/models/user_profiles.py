@@ -1,10 +1,14 @@
 from core.database import Base
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, Integer, String
 
 
 class User_profiles(Base):
     __tablename__ = "user_profiles"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_user_profiles_user_id_id", "user_id", "id"),
+        Index("ix_user_profiles_user_id_created_at", "user_id", "created_at"),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True, nullable=False)
     user_id = Column(String, nullable=False)
@@ -14,5 +18,7 @@ class User_profiles(Base):
     allergies = Column(String, nullable=True)
     age_verified = Column(Boolean, nullable=False)
     language_preference = Column(String, nullable=True)
-    created_at = Column(String, nullable=False)
-    updated_at = Column(String, nullable=True)
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    # Increasing stamp replaced on every write, so ETags come from one aggregate instead of the rows
+    row_version = Column(BigInteger, nullable=False, server_default="0")
\ No newline at end of file
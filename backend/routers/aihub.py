@@ -12,6 +12,7 @@ from fastapi import APIRouter, HTTPException, status
 from schemas.aihub import GenImgRequest, GenImgResponse, GenTxtRequest
 from services.aihub import AIHubService, InvalidImageInputError
 from sse_starlette.sse import EventSourceResponse
+from utils.serialization import dumps
 
 logger = logging.getLogger(__name__)
 
@@ -123,10 +124,10 @@ async def generate_text(
             async def event_generator():
                 try:
                     async for content in service.gentxt_stream(request):
-                        yield json.dumps({"content": content})
+                        yield dumps({"content": content}).decode()
                 except Exception as e:
                     logger.error(f"Stream error: {e}")
-                    yield json.dumps({"content": f"[ERROR] {extract_error_message(e)}"})
+                    yield dumps({"content": f"[ERROR] {extract_error_message(e)}"}).decode()
                 finally:
                     yield "[DONE]"
 
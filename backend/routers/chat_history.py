@@ -1,16 +1,22 @@
 import json
 import logging
-from typing import List, Optional
+from typing import List, Optional, Union
 
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.database import get_db
 from services.chat_history import Chat_historyService
+from services.chat_search import SearchUnavailable
 from dependencies.auth import get_current_user
+from dependencies.database import get_all_read_db, get_read_db
 from schemas.auth import UserResponse
+from utils.etag import etag_matches, not_modified
+from utils.serialization import FastJSONResponse
+from utils.streaming import accepts_ndjson, ndjson_response
+from utils.timestamps import IsoTimestamp
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -29,7 +35,7 @@ class Chat_historyData(BaseModel):
 
 
 class Chat_historyUpdateData(BaseModel):
-    """Update entity data (partial updates allowed)"""
+    """Update entity data (partial updates allowed); archived messages are read-only and rejected with 400"""
     session_id: Optional[str] = None
     role: Optional[str] = None
     content: Optional[str] = None
@@ -39,13 +45,13 @@ class Chat_historyUpdateData(BaseModel):
 
 class Chat_historyResponse(BaseModel):
     """Entity response schema"""
-    id: int
+    id: Optional[int] = None  # None while queued by the write buffer (202, async write-behind mode)
     user_id: str
     session_id: str
     role: str
     content: str
     intake_step: Optional[str] = None
-    created_at: str
+    created_at: IsoTimestamp
 
     class Config:
         from_attributes = True
@@ -54,9 +60,32 @@ class Chat_historyResponse(BaseModel):
 class Chat_historyListResponse(BaseModel):
     """List response schema"""
     items: List[Chat_historyResponse]
-    total: int
+    total: Optional[int] = None
+    total_estimated: bool = False
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+class Chat_historyPartialResponse(BaseModel):
+    """Entity response schema for a `fields` projection (only the requested fields are returned)"""
+    id: int
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+    role: Optional[str] = None
+    content: Optional[str] = None
+    intake_step: Optional[str] = None
+    created_at: Optional[IsoTimestamp] = None
+
+
+class Chat_historyPartialListResponse(BaseModel):
+    """List response schema for a `fields` projection"""
+    items: List[Chat_historyPartialResponse]
+    total: Optional[int] = None
+    total_estimated: bool = False
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 class Chat_historyBatchCreateRequest(BaseModel):
@@ -71,31 +100,85 @@ class Chat_historyBatchUpdateItem(BaseModel):
 
 
 class Chat_historyBatchUpdateRequest(BaseModel):
-    """Batch update request"""
+    """Batch update request; rejected as a whole with 400 if any message is archived"""
     items: List[Chat_historyBatchUpdateItem]
 
 
 class Chat_historyBatchDeleteRequest(BaseModel):
-    """Batch delete request"""
+    """Batch delete request; deletes archived messages too"""
     ids: List[int]
 
 
+class Chat_historySearchItem(Chat_historyResponse):
+    """A matching message with its relevance and highlighted excerpt"""
+    rank: float
+    snippet: Optional[str] = None
+
+
+class Chat_historySearchResponse(BaseModel):
+    """Page of search results, best match first"""
+    items: List[Chat_historySearchItem]
+    skip: int
+    limit: int
+
+
+# ---------- Search ----------
+# Declared before the generic routes so that "/search" is not taken for an "/{id}"
+@router.get("/search", response_model=Chat_historySearchResponse)
+async def search_chat_historys(
+    q: str = Query(..., min_length=1, max_length=256, description="Words to search message content for"),
+    skip: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Max number of results to return"),
+    user_id: Optional[str] = Query(None, description="Search this user's messages instead of your own (admin only)"),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Full-text search of the current user's messages, ranked, with <mark>-highlighted snippets"""
+    if user_id is not None and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required to search other users' messages")
+
+    service = Chat_historyService(db)
+    try:
+        result = await service.search(q, user_id=user_id or str(current_user.id), skip=skip, limit=limit)
+        logger.debug(f"Search matched {len(result['items'])} chat_historys")
+        # Items are already JSON-ready records; skip per-row response model validation
+        return FastJSONResponse(result)
+    except SearchUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching chat_historys: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 # ---------- Routes ----------
-@router.get("", response_model=Chat_historyListResponse)
+@router.get(
+    "",
+    response_model=Union[Chat_historyListResponse, Chat_historyPartialListResponse],
+    response_model_exclude_unset=True,
+)
 async def query_chat_historys(
-    query: str = Query(None, description="Query conditions (JSON string)"),
+    request: Request,
+    query: str = Query(
+        None, description="Query conditions (JSON string); values match exactly or use $ne/$gt/$gte/$lt/$lte/$in/$prefix"
+    ),
     sort: str = Query(None, description="Sort field (prefix with '-' for descending)"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(20, ge=1, le=2000, description="Max number of records to return"),
+    cursor: str = Query(None, description="Opaque next_cursor from a previous page (keyset pagination)"),
+    include_total: bool = Query(True, description="Whether to compute the total number of matching records"),
+    estimate_total: bool = Query(False, description="Estimate the total from table statistics instead of counting"),
     fields: str = Query(None, description="Comma-separated list of fields to return"),
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Query chat_historys with filtering, sorting, and pagination (user can only see their own records)"""
-    logger.debug(f"Querying chat_historys: query={query}, sort={sort}, skip={skip}, limit={limit}, fields={fields}")
+    logger.debug(f"Querying chat_historys: query={query}, sort={sort}, skip={skip}, limit={limit}, cursor={cursor}, fields={fields}")
     
     service = Chat_historyService(db)
     try:
+        total_mode = "none" if not include_total else "estimated" if estimate_total else "exact"
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
         # Parse query JSON if provided
         query_dict = None
         if query:
@@ -104,36 +187,64 @@ async def query_chat_historys(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid query JSON format")
         
-        result = await service.get_list(
-            skip=skip, 
+        list_args = dict(
+            skip=skip,
             limit=limit,
             query_dict=query_dict,
             sort=sort,
+            cursor=cursor,
+            total_mode=total_mode,
+            fields=field_list,
             user_id=str(current_user.id),
         )
+        # Unchanged polls are answered from one aggregate query, without fetching the rows
+        etag = await service.list_etag(**list_args)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
+        result = await service.get_list(**list_args)
         logger.debug(f"Found {result['total']} chat_historys")
-        return result
+        # Items are already JSON-ready records; skip per-row response model validation
+        return FastJSONResponse(result, headers={"ETag": etag} if etag else None)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error querying chat_historys: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.get("/all", response_model=Chat_historyListResponse)
+@router.get(
+    "/all",
+    response_model=Union[Chat_historyListResponse, Chat_historyPartialListResponse],
+    response_model_exclude_unset=True,
+)
 async def query_chat_historys_all(
-    query: str = Query(None, description="Query conditions (JSON string)"),
+    request: Request,
+    query: str = Query(
+        None, description="Query conditions (JSON string); values match exactly or use $ne/$gt/$gte/$lt/$lte/$in/$prefix"
+    ),
     sort: str = Query(None, description="Sort field (prefix with '-' for descending)"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(20, ge=1, le=2000, description="Max number of records to return"),
+    limit: Optional[int] = Query(
+        None, ge=1, description="Max number of records to return (default 20, at most 2000; unlimited when streaming)"
+    ),
+    cursor: str = Query(None, description="Opaque next_cursor from a previous page (keyset pagination)"),
+    include_total: bool = Query(True, description="Whether to compute the total number of matching records"),
+    estimate_total: bool = Query(False, description="Estimate the total from table statistics instead of counting"),
     fields: str = Query(None, description="Comma-separated list of fields to return"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_all_read_db),
 ):
-    # Query chat_historys with filtering, sorting, and pagination without user limitation
-    logger.debug(f"Querying chat_historys: query={query}, sort={sort}, skip={skip}, limit={limit}, fields={fields}")
+    # Query chat_historys with filtering, sorting, and pagination without user limitation.
+    # With "Accept: application/x-ndjson" the rows are streamed one JSON object per line.
+    logger.debug(f"Querying chat_historys: query={query}, sort={sort}, skip={skip}, limit={limit}, cursor={cursor}, fields={fields}")
 
     service = Chat_historyService(db)
     try:
+        total_mode = "none" if not include_total else "estimated" if estimate_total else "exact"
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
         # Parse query JSON if provided
         query_dict = None
         if query:
@@ -142,23 +253,55 @@ async def query_chat_historys_all(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid query JSON format")
 
-        result = await service.get_list(
+        if accepts_ndjson(request):
+            batches = await service.stream_list(
+                skip=skip,
+                limit=limit,
+                query_dict=query_dict,
+                sort=sort,
+                cursor=cursor,
+                fields=field_list,
+            )
+            return ndjson_response(batches)
+
+        if limit is None:
+            limit = 20
+        elif limit > 2000:
+            raise HTTPException(status_code=400, detail="limit must be at most 2000 unless streaming NDJSON")
+
+        list_args = dict(
             skip=skip,
             limit=limit,
             query_dict=query_dict,
-            sort=sort
+            sort=sort,
+            cursor=cursor,
+            total_mode=total_mode,
+            fields=field_list,
         )
+        etag = await service.list_etag(**list_args)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
+        result = await service.get_list(**list_args)
         logger.debug(f"Found {result['total']} chat_historys")
-        return result
+        # Items are already JSON-ready records; skip per-row response model validation
+        return FastJSONResponse(result, headers={"ETag": etag} if etag else None)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error querying chat_historys: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.get("/{id}", response_model=Chat_historyResponse)
+@router.get(
+    "/{id}",
+    response_model=Union[Chat_historyResponse, Chat_historyPartialResponse],
+    response_model_exclude_unset=True,
+)
 async def get_chat_history(
+    request: Request,
     id: int,
     fields: str = Query(None, description="Comma-separated list of fields to return"),
     current_user: UserResponse = Depends(get_current_user),
@@ -169,20 +312,38 @@ async def get_chat_history(
     
     service = Chat_historyService(db)
     try:
-        result = await service.get_by_id(id, user_id=str(current_user.id))
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        etag = await service.record_etag(id, user_id=str(current_user.id), fields=field_list)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
+        result = await service.get_record(id, user_id=str(current_user.id), fields=field_list)
         if not result:
             logger.warning(f"Chat_history with id {id} not found")
             raise HTTPException(status_code=404, detail="Chat_history not found")
         
-        return result
+        # The record is already JSON-ready; skip response model validation
+        return FastJSONResponse(result, headers={"ETag": etag} if etag else None)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching chat_history {id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.post("", response_model=Chat_historyResponse, status_code=201)
+@router.post(
+    "",
+    response_model=Chat_historyResponse,
+    status_code=201,
+    responses={
+        202: {
+            "model": Chat_historyResponse,
+            "description": "Queued by the write buffer (write_behind_mode async); id is null until it is flushed",
+        }
+    },
+)
 async def create_chat_history(
     data: Chat_historyData,
     current_user: UserResponse = Depends(get_current_user),
@@ -198,7 +359,9 @@ async def create_chat_history(
             raise HTTPException(status_code=400, detail="Failed to create chat_history")
         
         logger.info(f"Chat_history created successfully with id: {result.id}")
-        return result
+        # Without an id the row was only queued by the write buffer (async write-behind mode)
+        status_code = 201 if result.id is not None else 202
+        return FastJSONResponse(service.repository.object_record(result), status_code=status_code)
     except ValueError as e:
         logger.error(f"Validation error creating chat_history: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -217,16 +380,17 @@ async def create_chat_historys_batch(
     logger.debug(f"Batch creating {len(request.items)} chat_historys")
     
     service = Chat_historyService(db)
-    results = []
     
     try:
-        for item_data in request.items:
-            result = await service.create(item_data.model_dump(), user_id=str(current_user.id))
-            if result:
-                results.append(result)
+        results = await service.create_many(
+            [item_data.model_dump() for item_data in request.items], user_id=str(current_user.id)
+        )
         
         logger.info(f"Batch created {len(results)} chat_historys successfully")
-        return results
+        return FastJSONResponse(service.repository.object_records(results), status_code=201)
+    except ValueError as e:
+        logger.error(f"Validation error in batch create: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         await db.rollback()
         logger.error(f"Error in batch create: {str(e)}", exc_info=True)
@@ -243,18 +407,20 @@ async def update_chat_historys_batch(
     logger.debug(f"Batch updating {len(request.items)} chat_historys")
     
     service = Chat_historyService(db)
-    results = []
     
     try:
-        for item in request.items:
-            # Only include non-None values for partial updates
-            update_dict = {k: v for k, v in item.updates.model_dump().items() if v is not None}
-            result = await service.update(item.id, update_dict, user_id=str(current_user.id))
-            if result:
-                results.append(result)
+        # Only include non-None values for partial updates
+        updates = [
+            (item.id, {k: v for k, v in item.updates.model_dump().items() if v is not None})
+            for item in request.items
+        ]
+        results = await service.update_many(updates, user_id=str(current_user.id))
         
         logger.info(f"Batch updated {len(results)} chat_historys successfully")
-        return results
+        return FastJSONResponse(service.repository.object_records(results))
+    except ValueError as e:
+        logger.error(f"Validation error in batch update: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         await db.rollback()
         logger.error(f"Error in batch update: {str(e)}", exc_info=True)
@@ -281,7 +447,7 @@ async def update_chat_history(
             raise HTTPException(status_code=404, detail="Chat_history not found")
         
         logger.info(f"Chat_history {id} updated successfully")
-        return result
+        return FastJSONResponse(service.repository.object_record(result))
     except HTTPException:
         raise
     except ValueError as e:
@@ -302,13 +468,9 @@ async def delete_chat_historys_batch(
     logger.debug(f"Batch deleting {len(request.ids)} chat_historys")
     
     service = Chat_historyService(db)
-    deleted_count = 0
     
     try:
-        for item_id in request.ids:
-            success = await service.delete(item_id, user_id=str(current_user.id))
-            if success:
-                deleted_count += 1
+        deleted_count = await service.delete_many(request.ids, user_id=str(current_user.id))
         
         logger.info(f"Batch deleted {deleted_count} chat_historys successfully")
         return {"message": f"Successfully deleted {deleted_count} chat_historys", "deleted_count": deleted_count}
@@ -0,0 +1,65 @@
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.chat_sessions import Chat_sessionsService
+from dependencies.auth import get_current_user
+from dependencies.database import get_read_db
+from schemas.auth import UserResponse
+from utils.serialization import FastJSONResponse
+from utils.timestamps import IsoTimestamp
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/chat", tags=["chat_sessions"])
+
+
+# ---------- Pydantic Schemas ----------
+class Chat_sessionResponse(BaseModel):
+    """One chat session of the current user"""
+    id: int
+    user_id: str
+    session_id: str
+    message_count: int
+    first_message_at: IsoTimestamp
+    last_message_at: IsoTimestamp
+    last_message_id: int
+    last_snippet: Optional[str] = None
+
+
+class Chat_sessionListResponse(BaseModel):
+    """Page of chat sessions, most recently active first"""
+    items: List[Chat_sessionResponse]
+    next_cursor: Optional[str] = None
+
+
+# ---------- Routes ----------
+@router.get("/sessions", response_model=Chat_sessionListResponse)
+async def list_chat_sessions(
+    limit: int = Query(20, ge=1, le=100, description="Max number of sessions to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List the current user's chat sessions, most recently active first (keyset paginated)"""
+    service = Chat_sessionsService(db)
+    try:
+        result = await service.get_list(
+            limit=limit,
+            user_id=str(current_user.id),
+            sort="-last_message_at",
+            cursor=cursor,
+            total_mode="none",
+        )
+        logger.debug(f"Found {len(result['items'])} chat sessions")
+        # Items are already JSON-ready records; skip per-row response model validation
+        return FastJSONResponse({"items": result["items"], "next_cursor": result["next_cursor"]})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing chat sessions: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,5 +1,10 @@
-from fastapi import APIRouter
+from core.database import db_manager
+from fastapi import APIRouter, Depends
+from dependencies.auth import get_admin_user
+from schemas.auth import UserResponse
 from services.database import check_database_health
+from services.write_buffer import write_buffer_stats
+from utils.read_cache import read_cache_stats
 
 router = APIRouter(prefix="/database", tags=["database"])
 
@@ -9,3 +14,15 @@ async def database_health_check():
     """Check database connection health"""
     is_healthy = await check_database_health()
     return {"status": "healthy" if is_healthy else "unhealthy", "service": "database"}
+
+
+@router.get("/cache-stats")
+async def database_cache_stats(_current_user: UserResponse = Depends(get_admin_user)):
+    """Hit/miss metrics of the entity read caches and write buffer counters (admin only)"""
+    return {"read_caches": read_cache_stats(), "write_buffers": write_buffer_stats()}
+
+
+@router.get("/pool-stats")
+async def database_pool_stats(_current_user: UserResponse = Depends(get_admin_user)):
+    """Checked-out/overflow counts and checkout wait times of the connection pools (admin only)"""
+    return db_manager.pool_stats()
@@ -1,16 +1,21 @@
 import json
 import logging
-from typing import List, Optional
+from typing import List, Optional, Union
 
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.database import get_db
 from services.user_profiles import User_profilesService
 from dependencies.auth import get_current_user
+from dependencies.database import get_all_read_db, get_read_db
 from schemas.auth import UserResponse
+from utils.etag import etag_matches, not_modified
+from utils.serialization import FastJSONResponse
+from utils.streaming import accepts_ndjson, ndjson_response
+from utils.timestamps import IsoTimestamp
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -53,8 +58,8 @@ class User_profilesResponse(BaseModel):
     allergies: Optional[str] = None
     age_verified: bool
     language_preference: Optional[str] = None
-    created_at: str
-    updated_at: Optional[str] = None
+    created_at: IsoTimestamp
+    updated_at: Optional[IsoTimestamp] = None
 
     class Config:
         from_attributes = True
@@ -63,9 +68,35 @@ class User_profilesResponse(BaseModel):
 class User_profilesListResponse(BaseModel):
     """List response schema"""
     items: List[User_profilesResponse]
-    total: int
+    total: Optional[int] = None
+    total_estimated: bool = False
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
+
+
+class User_profilesPartialResponse(BaseModel):
+    """Entity response schema for a `fields` projection (only the requested fields are returned)"""
+    id: int
+    user_id: Optional[str] = None
+    primary_goal: Optional[str] = None
+    medications: Optional[str] = None
+    medical_conditions: Optional[str] = None
+    allergies: Optional[str] = None
+    age_verified: Optional[bool] = None
+    language_preference: Optional[str] = None
+    created_at: Optional[IsoTimestamp] = None
+    updated_at: Optional[IsoTimestamp] = None
+
+
+class User_profilesPartialListResponse(BaseModel):
+    """List response schema for a `fields` projection"""
+    items: List[User_profilesPartialResponse]
+    total: Optional[int] = None
+    total_estimated: bool = False
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
 
 
 class User_profilesBatchCreateRequest(BaseModel):
@@ -90,21 +121,34 @@ class User_profilesBatchDeleteRequest(BaseModel):
 
 
 # ---------- Routes ----------
-@router.get("", response_model=User_profilesListResponse)
+@router.get(
+    "",
+    response_model=Union[User_profilesListResponse, User_profilesPartialListResponse],
+    response_model_exclude_unset=True,
+)
 async def query_user_profiless(
-    query: str = Query(None, description="Query conditions (JSON string)"),
+    request: Request,
+    query: str = Query(
+        None, description="Query conditions (JSON string); values match exactly or use $ne/$gt/$gte/$lt/$lte/$in/$prefix"
+    ),
     sort: str = Query(None, description="Sort field (prefix with '-' for descending)"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(20, ge=1, le=2000, description="Max number of records to return"),
+    cursor: str = Query(None, description="Opaque next_cursor from a previous page (keyset pagination)"),
+    include_total: bool = Query(True, description="Whether to compute the total number of matching records"),
+    estimate_total: bool = Query(False, description="Estimate the total from table statistics instead of counting"),
     fields: str = Query(None, description="Comma-separated list of fields to return"),
     current_user: UserResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Query user_profiless with filtering, sorting, and pagination (user can only see their own records)"""
-    logger.debug(f"Querying user_profiless: query={query}, sort={sort}, skip={skip}, limit={limit}, fields={fields}")
+    logger.debug(f"Querying user_profiless: query={query}, sort={sort}, skip={skip}, limit={limit}, cursor={cursor}, fields={fields}")
     
     service = User_profilesService(db)
     try:
+        total_mode = "none" if not include_total else "estimated" if estimate_total else "exact"
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
         # Parse query JSON if provided
         query_dict = None
         if query:
@@ -113,36 +157,64 @@ async def query_user_profiless(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid query JSON format")
         
-        result = await service.get_list(
-            skip=skip, 
+        list_args = dict(
+            skip=skip,
             limit=limit,
             query_dict=query_dict,
             sort=sort,
+            cursor=cursor,
+            total_mode=total_mode,
+            fields=field_list,
             user_id=str(current_user.id),
         )
+        # Unchanged polls are answered from one aggregate query, without fetching the rows
+        etag = await service.list_etag(**list_args)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
+        result = await service.get_list(**list_args)
         logger.debug(f"Found {result['total']} user_profiless")
-        return result
+        # Items are already JSON-ready records; skip per-row response model validation
+        return FastJSONResponse(result, headers={"ETag": etag} if etag else None)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error querying user_profiless: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.get("/all", response_model=User_profilesListResponse)
+@router.get(
+    "/all",
+    response_model=Union[User_profilesListResponse, User_profilesPartialListResponse],
+    response_model_exclude_unset=True,
+)
 async def query_user_profiless_all(
-    query: str = Query(None, description="Query conditions (JSON string)"),
+    request: Request,
+    query: str = Query(
+        None, description="Query conditions (JSON string); values match exactly or use $ne/$gt/$gte/$lt/$lte/$in/$prefix"
+    ),
     sort: str = Query(None, description="Sort field (prefix with '-' for descending)"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(20, ge=1, le=2000, description="Max number of records to return"),
+    limit: Optional[int] = Query(
+        None, ge=1, description="Max number of records to return (default 20, at most 2000; unlimited when streaming)"
+    ),
+    cursor: str = Query(None, description="Opaque next_cursor from a previous page (keyset pagination)"),
+    include_total: bool = Query(True, description="Whether to compute the total number of matching records"),
+    estimate_total: bool = Query(False, description="Estimate the total from table statistics instead of counting"),
     fields: str = Query(None, description="Comma-separated list of fields to return"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_all_read_db),
 ):
-    # Query user_profiless with filtering, sorting, and pagination without user limitation
-    logger.debug(f"Querying user_profiless: query={query}, sort={sort}, skip={skip}, limit={limit}, fields={fields}")
+    # Query user_profiless with filtering, sorting, and pagination without user limitation.
+    # With "Accept: application/x-ndjson" the rows are streamed one JSON object per line.
+    logger.debug(f"Querying user_profiless: query={query}, sort={sort}, skip={skip}, limit={limit}, cursor={cursor}, fields={fields}")
 
     service = User_profilesService(db)
     try:
+        total_mode = "none" if not include_total else "estimated" if estimate_total else "exact"
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
         # Parse query JSON if provided
         query_dict = None
         if query:
@@ -151,23 +223,55 @@ async def query_user_profiless_all(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid query JSON format")
 
-        result = await service.get_list(
+        if accepts_ndjson(request):
+            batches = await service.stream_list(
+                skip=skip,
+                limit=limit,
+                query_dict=query_dict,
+                sort=sort,
+                cursor=cursor,
+                fields=field_list,
+            )
+            return ndjson_response(batches)
+
+        if limit is None:
+            limit = 20
+        elif limit > 2000:
+            raise HTTPException(status_code=400, detail="limit must be at most 2000 unless streaming NDJSON")
+
+        list_args = dict(
             skip=skip,
             limit=limit,
             query_dict=query_dict,
-            sort=sort
+            sort=sort,
+            cursor=cursor,
+            total_mode=total_mode,
+            fields=field_list,
         )
+        etag = await service.list_etag(**list_args)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
+        result = await service.get_list(**list_args)
         logger.debug(f"Found {result['total']} user_profiless")
-        return result
+        # Items are already JSON-ready records; skip per-row response model validation
+        return FastJSONResponse(result, headers={"ETag": etag} if etag else None)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error querying user_profiless: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.get("/{id}", response_model=User_profilesResponse)
+@router.get(
+    "/{id}",
+    response_model=Union[User_profilesResponse, User_profilesPartialResponse],
+    response_model_exclude_unset=True,
+)
 async def get_user_profiles(
+    request: Request,
     id: int,
     fields: str = Query(None, description="Comma-separated list of fields to return"),
     current_user: UserResponse = Depends(get_current_user),
@@ -178,20 +282,38 @@ async def get_user_profiles(
     
     service = User_profilesService(db)
     try:
-        result = await service.get_by_id(id, user_id=str(current_user.id))
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        etag = await service.record_etag(id, user_id=str(current_user.id), fields=field_list)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+
+        result = await service.get_record(id, user_id=str(current_user.id), fields=field_list)
         if not result:
             logger.warning(f"User_profiles with id {id} not found")
             raise HTTPException(status_code=404, detail="User_profiles not found")
         
-        return result
+        # The record is already JSON-ready; skip response model validation
+        return FastJSONResponse(result, headers={"ETag": etag} if etag else None)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching user_profiles {id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.post("", response_model=User_profilesResponse, status_code=201)
+@router.post(
+    "",
+    response_model=User_profilesResponse,
+    status_code=201,
+    responses={
+        202: {
+            "model": User_profilesResponse,
+            "description": "Queued by the write buffer (write_behind_mode async); id is null until it is flushed",
+        }
+    },
+)
 async def create_user_profiles(
     data: User_profilesData,
     current_user: UserResponse = Depends(get_current_user),
@@ -207,7 +329,9 @@ async def create_user_profiles(
             raise HTTPException(status_code=400, detail="Failed to create user_profiles")
         
         logger.info(f"User_profiles created successfully with id: {result.id}")
-        return result
+        # Without an id the row was only queued by the write buffer (async write-behind mode)
+        status_code = 201 if result.id is not None else 202
+        return FastJSONResponse(service.repository.object_record(result), status_code=status_code)
     except ValueError as e:
         logger.error(f"Validation error creating user_profiles: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -226,16 +350,17 @@ async def create_user_profiless_batch(
     logger.debug(f"Batch creating {len(request.items)} user_profiless")
     
     service = User_profilesService(db)
-    results = []
     
     try:
-        for item_data in request.items:
-            result = await service.create(item_data.model_dump(), user_id=str(current_user.id))
-            if result:
-                results.append(result)
+        results = await service.create_many(
+            [item_data.model_dump() for item_data in request.items], user_id=str(current_user.id)
+        )
         
         logger.info(f"Batch created {len(results)} user_profiless successfully")
-        return results
+        return FastJSONResponse(service.repository.object_records(results), status_code=201)
+    except ValueError as e:
+        logger.error(f"Validation error in batch create: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         await db.rollback()
         logger.error(f"Error in batch create: {str(e)}", exc_info=True)
@@ -252,18 +377,20 @@ async def update_user_profiless_batch(
     logger.debug(f"Batch updating {len(request.items)} user_profiless")
     
     service = User_profilesService(db)
-    results = []
     
     try:
-        for item in request.items:
-            # Only include non-None values for partial updates
-            update_dict = {k: v for k, v in item.updates.model_dump().items() if v is not None}
-            result = await service.update(item.id, update_dict, user_id=str(current_user.id))
-            if result:
-                results.append(result)
+        # Only include non-None values for partial updates
+        updates = [
+            (item.id, {k: v for k, v in item.updates.model_dump().items() if v is not None})
+            for item in request.items
+        ]
+        results = await service.update_many(updates, user_id=str(current_user.id))
         
         logger.info(f"Batch updated {len(results)} user_profiless successfully")
-        return results
+        return FastJSONResponse(service.repository.object_records(results))
+    except ValueError as e:
+        logger.error(f"Validation error in batch update: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         await db.rollback()
         logger.error(f"Error in batch update: {str(e)}", exc_info=True)
@@ -290,7 +417,7 @@ async def update_user_profiles(
             raise HTTPException(status_code=404, detail="User_profiles not found")
         
         logger.info(f"User_profiles {id} updated successfully")
-        return result
+        return FastJSONResponse(service.repository.object_record(result))
     except HTTPException:
         raise
     except ValueError as e:
@@ -311,13 +438,9 @@ async def delete_user_profiless_batch(
     logger.debug(f"Batch deleting {len(request.ids)} user_profiless")
     
     service = User_profilesService(db)
-    deleted_count = 0
     
     try:
-        for item_id in request.ids:
-            success = await service.delete(item_id, user_id=str(current_user.id))
-            if success:
-                deleted_count += 1
+        deleted_count = await service.delete_many(request.ids, user_id=str(current_user.id))
         
         logger.info(f"Batch deleted {deleted_count} user_profiless successfully")
         return {"message": f"Successfully deleted {deleted_count} user_profiless", "deleted_count": deleted_count}
@@ -0,0 +1,248 @@
+"""
+Archival of cold chat_history messages.
+
+Reads mostly target the last few weeks, so messages from before the *archive horizon* (the
+start of the month ``settings.chat_archive_hot_months`` months back) are moved to
+``chat_history_archive`` with their content zlib-compressed, and chat_history and its
+indexes only cover recent history:
+
+- Postgres: the archive is range partitioned by month; the partition of every month the
+  job moves is created on the way, and old-range reads are pruned to the months they ask for.
+- SQLite has no partitioning; the single archive table is indexed like chat_history.
+
+``archive_chat_history`` moves messages in small batches that each insert into the archive
+and delete from chat_history in one transaction, so it can be stopped at any point. It runs
+periodically in the application when ``chat_archive_enabled`` is set, or as
+``python -m services.chat_archive`` from a scheduler where there is no long-lived process
+(Lambda); ``--restore`` moves every archived message back.
+
+chat_history lists include the archive only when their ``created_at`` filter reaches before
+the horizon (see ``reaches_archive``); other reads only see live messages. Archived messages
+are read-only: updating one raises ``ArchivedMessageError``, while deletes reach them and
+recount their sessions. They still count in chat_sessions but leave the full-text search
+index.
+"""
+
+import asyncio
+import logging
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import db_manager
+from models.chat_history import Chat_history
+from models.chat_history_archive import Chat_history_archive
+from services.chat_search import chat_search_projection
+from utils.timestamps import parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+def compress_content(content: str) -> bytes:
+    return zlib.compress(content.encode("utf-8"), settings.chat_archive_compression_level)
+
+
+def decompress_content(content: bytes) -> str:
+    return zlib.decompress(content).decode("utf-8")
+
+
+def restore_row(row: Sequence[Any], content_index: Optional[int]) -> Sequence[Any]:
+    """An archive result row with its compressed content (at ``content_index``, if selected) as text"""
+    if content_index is None:
+        return row
+    values = list(row)
+    values[content_index] = decompress_content(values[content_index])
+    return values
+
+
+class ArchivedMessageError(ValueError):
+    """Raised when updating archived messages, which are read-only."""
+
+    def __init__(self, ids: Sequence[int]):
+        self.ids = list(ids)
+        super().__init__(f"Archived messages are read-only: {', '.join(map(str, self.ids))}")
+
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+def _month_start(index: int) -> datetime:
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def archive_horizon(now: Optional[datetime] = None) -> datetime:
+    """Start (UTC) of the oldest month kept in chat_history; older messages get archived"""
+    now = now or datetime.now(timezone.utc)
+    return _month_start(_month_index(now.year, now.month) - settings.chat_archive_hot_months)
+
+
+def reaches_archive(query_dict: Optional[Dict[str, Any]]) -> bool:
+    """Whether a chat_history list filter asks for messages from before the archive horizon
+
+    Only a ``created_at`` condition does: an equality or ``$in`` value before the horizon,
+    or any other condition whose lower bound (``$gt``/``$gte``), if it has one, is before it
+    -- so ``$ne``, ``$prefix`` and upper bounds alone reach the archive. Malformed conditions
+    are left to the filter compiler to reject.
+    """
+    condition = query_dict.get("created_at") if isinstance(query_dict, dict) else None
+    if condition is None:
+        return False
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    if not condition:
+        return False
+    horizon = archive_horizon()
+    try:
+        if "$eq" in condition:
+            return condition["$eq"] is not None and parse_timestamp(condition["$eq"]) < horizon
+        if isinstance(condition.get("$in"), list):
+            return any(value is not None and parse_timestamp(value) < horizon for value in condition["$in"])
+        lower = [parse_timestamp(condition[op]) for op in ("$gt", "$gte") if condition.get(op) is not None]
+    except (TypeError, ValueError):
+        return False
+    return all(bound < horizon for bound in lower)
+
+
+async def merge_ordered(
+    first: AsyncIterator[Any], second: AsyncIterator[Any], key: Callable[[Any], Any], reverse: bool = False
+) -> AsyncIterator[Any]:
+    """Merge two async iterators that are each ordered by ``key`` (descending if ``reverse``)"""
+    a, b = await anext(first, None), await anext(second, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and (key(a) >= key(b) if reverse else key(a) <= key(b))):
+            yield a
+            a = await anext(first, None)
+        else:
+            yield b
+            b = await anext(second, None)
+
+
+async def _create_partitions(session: AsyncSession, created_at: Sequence[datetime]) -> None:
+    """Create the monthly archive partitions (Postgres) the given timestamps fall into"""
+    for index in sorted({_month_index(value.year, value.month) for value in map(parse_timestamp, created_at)}):
+        start, end = _month_start(index), _month_start(index + 1)
+        await session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS chat_history_archive_y{start.year}m{start.month:02d} "
+                f"PARTITION OF chat_history_archive "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+
+
+async def _invalidate_chat_history() -> None:
+    # chat_history reads through this module, so its service is only imported when needed
+    from services.chat_history import Chat_historyService
+
+    await Chat_historyService.repository.invalidate(None)
+
+
+async def archive_chat_history(batch_size: Optional[int] = None, pause: float = 0.05) -> int:
+    """Move the messages from before the archive horizon to the archive; returns how many moved
+
+    chat_history is walked once in id order (it only holds the hot months, so the walk is
+    bounded); each batch commits on its own.
+    """
+    batch_size = batch_size or settings.chat_archive_batch_size
+    engine = db_manager.engine
+    if engine is None:
+        return 0
+    horizon = archive_horizon()
+    live, archive = Chat_history.__table__, Chat_history_archive.__table__
+    cold = select(live).where(live.c.created_at < horizon).order_by(live.c.id).limit(batch_size)
+
+    after, moved = 0, 0
+    while True:
+        async with AsyncSession(engine) as session:
+            rows = (await session.execute(cold.where(live.c.id > after))).all()
+            if not rows:
+                break
+            if engine.dialect.name == "postgresql":
+                await _create_partitions(session, [row.created_at for row in rows])
+            await session.execute(
+                archive.insert(), [dict(row._mapping, content=compress_content(row.content)) for row in rows]
+            )
+            ids = [row.id for row in rows]
+            await session.execute(delete(live).where(live.c.id.in_(ids)))
+            # Archived messages leave the search index; chat_sessions keeps counting them
+            await chat_search_projection.changed(session, {(obj_id,) for obj_id in ids})
+            await session.commit()
+        await _invalidate_chat_history()
+        after = rows[-1].id
+        moved += len(rows)
+        logger.debug(f"Chat history archival reached id {after} ({moved} moved)")
+        # Leave the connection pool to foreground requests between batches
+        await asyncio.sleep(pause)
+
+    if moved:
+        logger.info(f"Archived {moved} chat_history messages from before {horizon.date()}")
+    return moved
+
+
+async def restore_chat_history(batch_size: Optional[int] = None) -> int:
+    """Move every archived message back to chat_history (e.g. before a downgrade); returns how many"""
+    batch_size = batch_size or settings.chat_archive_batch_size
+    engine = db_manager.engine
+    if engine is None:
+        return 0
+    live, archive = Chat_history.__table__, Chat_history_archive.__table__
+    oldest = select(archive).order_by(archive.c.id).limit(batch_size)
+
+    restored = 0
+    while True:
+        async with AsyncSession(engine) as session:
+            rows = (await session.execute(oldest)).all()
+            if not rows:
+                break
+            await session.execute(
+                live.insert(), [dict(row._mapping, content=decompress_content(row.content)) for row in rows]
+            )
+            ids = [row.id for row in rows]
+            await session.execute(delete(archive).where(archive.c.id.in_(ids)))
+            back = (await session.execute(select(live).where(live.c.id.in_(ids)))).all()
+            await chat_search_projection.inserted(session, back)
+            await session.commit()
+        await _invalidate_chat_history()
+        restored += len(rows)
+
+    if restored:
+        logger.info(f"Restored {restored} archived chat_history messages")
+    return restored
+
+
+async def _archive_periodically() -> None:
+    try:
+        while True:
+            try:
+                await archive_chat_history()
+            except Exception as e:
+                logger.error(f"Chat history archival failed: {e}", exc_info=True)
+            await asyncio.sleep(settings.chat_archive_interval_hours * 3600)
+    except asyncio.CancelledError:
+        logger.info("Chat history archival stopped")
+        raise
+
+
+def start_chat_archival() -> asyncio.Task:
+    """Run ``archive_chat_history`` now and then every ``chat_archive_interval_hours`` in the background"""
+    return asyncio.get_running_loop().create_task(_archive_periodically())
+
+
+if __name__ == "__main__":
+    from services.database import close_database, initialize_database
+
+    async def _main(restore: bool) -> None:
+        await initialize_database()
+        try:
+            await (restore_chat_history() if restore else archive_chat_history())
+        finally:
+            await close_database()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main("--restore" in sys.argv[1:]))
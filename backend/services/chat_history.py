@@ -1,172 +1,283 @@
 import logging
-from typing import Optional, Dict, Any, List
+from heapq import merge
+from itertools import islice
+from operator import itemgetter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from sqlalchemy import select, func
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.chat_history import Chat_history
+from models.chat_history_archive import Chat_history_archive
+from services.chat_archive import ArchivedMessageError, merge_ordered, reaches_archive, restore_row
+from services.chat_search import chat_search_projection, search_messages
+from services.chat_sessions import chat_session_projection
+from services.crud import STREAM_BATCH_SIZE, CrudService, EntityRepository
+from utils.pagination import encode_cursor
+from utils.timestamps import format_timestamp
 
 logger = logging.getLogger(__name__)
 
 
 # ------------------ Service Layer ------------------
-class Chat_historyService:
+class Chat_historyService(CrudService):
     """Service layer for Chat_history operations"""
 
-    def __init__(self, db: AsyncSession):
-        self.db = db
+    repository = EntityRepository(
+        Chat_history,
+        filterable=("id", "user_id", "session_id", "role", "intake_step", "created_at"),
+        sortable=("id", "created_at"),
+        # Two inserts per chat turn; coalesced across requests when write_behind_mode is enabled
+        write_behind=True,
+        projections=(chat_session_projection, chat_search_projection),
+    )
 
-    async def create(self, data: Dict[str, Any], user_id: Optional[str] = None) -> Optional[Chat_history]:
-        """Create a new chat_history"""
+    async def search(self, q: str, user_id: Optional[str] = None, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """Full-text search of message content, best match first (see services.chat_search)
+
+        Items are JSON-ready records plus their ``rank`` and an HTML-escaped ``snippet`` with
+        the matched words in ``<mark>`` tags.
+        """
+        repo = self.repository
+        await self._sync(user_id)
+        matches = await search_messages(self.db, q, user_id, skip=skip, limit=limit)
+        records = {}
+        if matches:
+            query = select(*(repo.columns[name] for name in repo.column_names)).where(
+                Chat_history.id.in_([obj_id for obj_id, _rank, _snippet in matches])
+            )
+            rows = (await self.db.execute(query)).all()
+            records = {record["id"]: record for record in repo.to_records(rows, repo.column_names)}
+        # A message deleted between the two queries is skipped
+        items = [
+            dict(records[obj_id], rank=rank, snippet=snippet)
+            for obj_id, rank, snippet in matches
+            if obj_id in records
+        ]
+        return {"items": items, "skip": skip, "limit": limit}
+
+    async def _archived_ids(self, obj_ids: List[int], user_id: Optional[str]) -> List[int]:
+        """Which of ``obj_ids`` (of ``user_id``, if given) are archived"""
+        archive = Chat_history_archive.__table__
+        query = select(archive.c.id).where(archive.c.id.in_(obj_ids))
+        if user_id:
+            query = query.where(archive.c.user_id == user_id)
+        return sorted((await self.db.scalars(query)).all())
+
+    async def update(self, obj_id: int, update_data: Dict[str, Any], user_id: Optional[str] = None):
+        """Update a live message (see ``CrudService.update``)
+
+        Raises:
+            ArchivedMessageError: If the message is archived; archived messages are read-only.
+        """
+        obj = await super().update(obj_id, update_data, user_id)
+        if obj is None:
+            archived = await self._archived_ids([obj_id], user_id)
+            await self.db.rollback()
+            if archived:
+                raise ArchivedMessageError(archived)
+        return obj
+
+    async def update_many(self, updates: List[Tuple[int, Dict[str, Any]]], user_id: Optional[str] = None) -> List[Any]:
+        """Update several live messages (see ``CrudService.update_many``)
+
+        Raises:
+            ArchivedMessageError: If any of them is archived; nothing is updated then.
+        """
+        archived = await self._archived_ids([obj_id for obj_id, _update_data in updates], user_id)
+        if archived:
+            await self.db.rollback()
+            raise ArchivedMessageError(archived)
+        return await super().update_many(updates, user_id)
+
+    async def delete(self, obj_id: int, user_id: Optional[str] = None) -> bool:
+        """Delete a message, live or archived (see ``CrudService.delete``)"""
+        if await super().delete(obj_id, user_id):
+            return True
+        return await self._delete_archived([obj_id], user_id) > 0
+
+    async def delete_many(self, obj_ids: List[int], user_id: Optional[str] = None) -> int:
+        """Delete several messages, live or archived (see ``CrudService.delete_many``)"""
+        deleted = await super().delete_many(obj_ids, user_id)
+        if deleted < len(set(obj_ids)):
+            # After the live delete: a message archived in between is found here instead
+            deleted += await self._delete_archived(obj_ids, user_id)
+        return deleted
+
+    async def _delete_archived(self, obj_ids: List[int], user_id: Optional[str]) -> int:
+        """Delete archived messages and recount their sessions in one transaction; returns how many"""
+        archive = Chat_history_archive.__table__
         try:
+            owned = archive.c.id.in_(obj_ids)
             if user_id:
-                data['user_id'] = user_id
-            obj = Chat_history(**data)
-            self.db.add(obj)
+                owned = owned & (archive.c.user_id == user_id)
+            keys = set((await self.db.execute(select(archive.c.user_id, archive.c.session_id).where(owned))).all())
+            if not keys:
+                await self.db.rollback()
+                return 0
+            result = await self.db.execute(delete(archive).where(owned))
+            # Archived messages are not in the search index, only in chat_sessions
+            await chat_session_projection.changed(self.db, keys)
             await self.db.commit()
-            await self.db.refresh(obj)
-            logger.info(f"Created chat_history with id: {obj.id}")
-            return obj
+            await self._invalidate(user_id)
+            await Chat_history_archiveService.repository.invalidate(user_id)
+            logger.info(f"Deleted {result.rowcount} archived {self.repository.name}s")
+            return result.rowcount
         except Exception as e:
             await self.db.rollback()
-            logger.error(f"Error creating chat_history: {str(e)}")
+            logger.error(f"Error deleting archived {self.repository.name}s: {str(e)}")
             raise
 
-    async def check_ownership(self, obj_id: int, user_id: str) -> bool:
-        """Check if user owns this record"""
-        try:
-            obj = await self.get_by_id(obj_id, user_id=user_id)
-            return obj is not None
-        except Exception as e:
-            logger.error(f"Error checking ownership for chat_history {obj_id}: {str(e)}")
-            return False
+    def _merged_queries(
+        self,
+        user_id: Optional[str],
+        query_dict: Optional[Dict[str, Any]],
+        sort: Optional[str],
+        cursor: Optional[str],
+        fields: Optional[List[str]],
+    ):
+        """The list query over chat_history and the archive, selecting the same columns
 
-    async def get_by_id(self, obj_id: int, user_id: Optional[str] = None) -> Optional[Chat_history]:
-        """Get chat_history by ID (user can only see their own records)"""
-        try:
-            query = select(Chat_history).where(Chat_history.id == obj_id)
-            if user_id:
-                query = query.where(Chat_history.user_id == user_id)
-            result = await self.db.execute(query)
-            return result.scalar_one_or_none()
-        except Exception as e:
-            logger.error(f"Error fetching chat_history {obj_id}: {str(e)}")
-            raise
+        Returns ``(live_query, archive_query, live_count, archive_count, sort_spec,
+        output_fields, row_key, content_index)``: rows carry the output fields followed by the
+        sort key when it is not one of them, and ``row_key`` reads their ``(sort key, id)``
+        order, which both tables share.
+        """
+        repo = self.repository
+        archive = Chat_history_archiveService(self.db)
+        live_query, live_count, sort_spec, sort_column = self._list_query(user_id, query_dict, sort, cursor)
+        archive_query, archive_count, _spec, _column = archive._list_query(user_id, query_dict, sort, cursor)
+
+        output_fields = repo.projected_fields(fields) if fields else list(repo.column_names)
+        names = output_fields if sort_column.key in output_fields else [*output_fields, sort_column.key]
+        live_query = live_query.with_only_columns(*(repo.columns[name] for name in names))
+        archive_query = archive_query.with_only_columns(*(archive.repository.columns[name] for name in names))
+        content_index = names.index("content") if "content" in names else None
+        row_key = itemgetter(names.index(sort_column.key), names.index("id"))
+        return live_query, archive_query, live_count, archive_count, sort_spec, output_fields, row_key, content_index
 
     async def get_list(
-        self, 
-        skip: int = 0, 
-        limit: int = 20, 
+        self,
+        skip: int = 0,
+        limit: int = 20,
         user_id: Optional[str] = None,
         query_dict: Optional[Dict[str, Any]] = None,
         sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        total_mode: str = "exact",
+        fields: Optional[List[str]] = None,
     ) -> Dict[str, Any]:
-        """Get paginated list of chat_historys (user can only see their own records)"""
+        """Get a paginated list of messages (see ``CrudService.get_list``)
+
+        When ``query_dict`` asks for messages from before the archive horizon, archived ones
+        are merged in (see services.chat_archive); ``total`` is then always an exact count.
+        """
+        if not reaches_archive(query_dict):
+            return await super().get_list(skip, limit, user_id, query_dict, sort, cursor, total_mode, fields)
+
+        repo = self.repository
+        await self._sync(user_id)
         try:
-            query = select(Chat_history)
-            count_query = select(func.count(Chat_history.id))
-            
-            if user_id:
-                query = query.where(Chat_history.user_id == user_id)
-                count_query = count_query.where(Chat_history.user_id == user_id)
-            
-            if query_dict:
-                for field, value in query_dict.items():
-                    if hasattr(Chat_history, field):
-                        query = query.where(getattr(Chat_history, field) == value)
-                        count_query = count_query.where(getattr(Chat_history, field) == value)
-            
-            count_result = await self.db.execute(count_query)
-            total = count_result.scalar()
-
-            if sort:
-                if sort.startswith('-'):
-                    field_name = sort[1:]
-                    if hasattr(Chat_history, field_name):
-                        query = query.order_by(getattr(Chat_history, field_name).desc())
-                else:
-                    if hasattr(Chat_history, sort):
-                        query = query.order_by(getattr(Chat_history, sort))
-            else:
-                query = query.order_by(Chat_history.id.desc())
-
-            result = await self.db.execute(query.offset(skip).limit(limit))
-            items = result.scalars().all()
+            (
+                live_query, archive_query, live_count, archive_count, sort_spec, output_fields, row_key, content_index
+            ) = self._merged_queries(user_id, query_dict, sort, cursor, fields)
+            descending = sort_spec.startswith("-")
+            # Each table is read up to the end of the page (plus one row to detect a next page)
+            window = skip + limit + 1
+            live_rows = (await self.db.execute(live_query.limit(window))).all()
+            archive_rows = [
+                restore_row(row, content_index)
+                for row in (await self.db.execute(archive_query.limit(window))).all()
+            ]
+            rows = list(islice(merge(live_rows, archive_rows, key=row_key, reverse=descending), skip, window))
+
+            total = None
+            if total_mode != "none":
+                # Old ranges are read rarely; their totals span both tables and are not cached
+                total = (await self.db.execute(live_count)).scalar_one() + (
+                    await self.db.execute(archive_count)
+                ).scalar_one()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last_key, last_id = row_key(rows[-1])
+                next_cursor = encode_cursor(sort_spec, format_timestamp(last_key), last_id)
 
             return {
-                "items": items,
+                "items": repo.to_records(rows, output_fields),
                 "total": total,
+                "total_estimated": False,
                 "skip": skip,
                 "limit": limit,
+                "next_cursor": next_cursor,
             }
         except Exception as e:
-            logger.error(f"Error fetching chat_history list: {str(e)}")
+            logger.error(f"Error fetching {repo.name} list with archive: {str(e)}")
             raise
 
-    async def update(self, obj_id: int, update_data: Dict[str, Any], user_id: Optional[str] = None) -> Optional[Chat_history]:
-        """Update chat_history (requires ownership)"""
-        try:
-            obj = await self.get_by_id(obj_id, user_id=user_id)
-            if not obj:
-                logger.warning(f"Chat_history {obj_id} not found for update")
-                return None
-            for key, value in update_data.items():
-                if hasattr(obj, key) and key != 'user_id':
-                    setattr(obj, key, value)
+    async def stream_list(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        user_id: Optional[str] = None,
+        query_dict: Optional[Dict[str, Any]] = None,
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream the messages of a list query in batches (see ``CrudService.stream_list``)
 
-            await self.db.commit()
-            await self.db.refresh(obj)
-            logger.info(f"Updated chat_history {obj_id}")
-            return obj
-        except Exception as e:
-            await self.db.rollback()
-            logger.error(f"Error updating chat_history {obj_id}: {str(e)}")
-            raise
+        Archived messages are merged in as in ``get_list``, from a server-side cursor on each
+        table.
+        """
+        if not reaches_archive(query_dict):
+            return await super().stream_list(skip, limit, user_id, query_dict, sort, cursor, fields)
 
-    async def delete(self, obj_id: int, user_id: Optional[str] = None) -> bool:
-        """Delete chat_history (requires ownership)"""
-        try:
-            obj = await self.get_by_id(obj_id, user_id=user_id)
-            if not obj:
-                logger.warning(f"Chat_history {obj_id} not found for deletion")
-                return False
-            await self.db.delete(obj)
-            await self.db.commit()
-            logger.info(f"Deleted chat_history {obj_id}")
-            return True
-        except Exception as e:
-            await self.db.rollback()
-            logger.error(f"Error deleting chat_history {obj_id}: {str(e)}")
-            raise
+        repo = self.repository
+        (
+            live_query, archive_query, _live_count, _archive_count, sort_spec, output_fields, row_key, content_index
+        ) = self._merged_queries(user_id, query_dict, sort, cursor, fields)
+        descending = sort_spec.startswith("-")
+        await self._sync(user_id)
+        live_query = live_query.execution_options(yield_per=STREAM_BATCH_SIZE)
+        archive_query = archive_query.execution_options(yield_per=STREAM_BATCH_SIZE)
+        end = None if limit is None else skip + limit
 
-    async def get_by_field(self, field_name: str, field_value: Any) -> Optional[Chat_history]:
-        """Get chat_history by any field"""
-        try:
-            if not hasattr(Chat_history, field_name):
-                raise ValueError(f"Field {field_name} does not exist on Chat_history")
-            result = await self.db.execute(
-                select(Chat_history).where(getattr(Chat_history, field_name) == field_value)
-            )
-            return result.scalar_one_or_none()
-        except Exception as e:
-            logger.error(f"Error fetching chat_history by {field_name}: {str(e)}")
-            raise
+        async def restored(result):
+            async for row in result:
+                yield restore_row(row, content_index)
 
-    async def list_by_field(
-        self, field_name: str, field_value: Any, skip: int = 0, limit: int = 20
-    ) -> List[Chat_history]:
-        """Get list of chat_historys filtered by field"""
-        try:
-            if not hasattr(Chat_history, field_name):
-                raise ValueError(f"Field {field_name} does not exist on Chat_history")
-            result = await self.db.execute(
-                select(Chat_history)
-                .where(getattr(Chat_history, field_name) == field_value)
-                .offset(skip)
-                .limit(limit)
-                .order_by(Chat_history.id.desc())
-            )
-            return result.scalars().all()
-        except Exception as e:
-            logger.error(f"Error fetching chat_historys by {field_name}: {str(e)}")
-            raise
\ No newline at end of file
+        async def batches():
+            streamed, position, batch = 0, 0, []
+            async with AsyncSession(self.db.bind) as live_session, AsyncSession(self.db.bind) as archive_session:
+                live = await live_session.stream(live_query)
+                archived = restored(await archive_session.stream(archive_query))
+                async for row in merge_ordered(live, archived, row_key, reverse=descending):
+                    if end is not None and position >= end:
+                        break
+                    position += 1
+                    if position <= skip:
+                        continue
+                    batch.append(row)
+                    if len(batch) >= STREAM_BATCH_SIZE:
+                        streamed += len(batch)
+                        yield repo.to_records(batch, output_fields)
+                        batch = []
+            if batch:
+                streamed += len(batch)
+                yield repo.to_records(batch, output_fields)
+            logger.debug(f"Streamed {streamed} {repo.name}s with archive")
+
+        return batches()
+
+
+class Chat_history_archiveService(CrudService):
+    """Read-only view of archived messages, merged into chat_history lists (see services.chat_archive)"""
+
+    repository = EntityRepository(
+        Chat_history_archive,
+        # The same whitelist, so one list query compiles for both tables
+        filterable=Chat_historyService.repository.query_compiler.filterable,
+        sortable=Chat_historyService.repository.query_compiler.sortable,
+    )
@@ -0,0 +1,265 @@
+"""
+Full-text search over chat_history content.
+
+Messages are indexed in a shadow table keyed by message id:
+
+- Postgres: ``chat_history_search(id, user_id, document tsvector)`` with a GIN index;
+  queries use ``websearch_to_tsquery``, are ranked by ``ts_rank_cd`` and highlighted by
+  ``ts_headline``.
+- SQLite: the FTS5 table ``chat_history_fts(content, user_id UNINDEXED)`` with the message
+  id as rowid; results are ranked by ``bm25`` and highlighted by ``snippet``.
+
+``ChatSearchProjection`` keeps the index in step inside the transactions writing
+chat_history (see ``services.crud.Projection``). Messages stored before the index existed
+are indexed by ``backfill_search_index``: a background job that walks chat_history in id
+order in small committed batches and finds the unindexed rows from the index itself, so it
+can be stopped and restarted at any point. Run it with ``python -m services.chat_search``
+where there is no long-lived process (Lambda).
+
+Other dialects have no index; searching them raises ``SearchUnavailable``.
+"""
+
+import asyncio
+import html
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import Base, db_manager
+from models.chat_history import Chat_history
+from services.crud import Projection
+
+logger = logging.getLogger(__name__)
+
+# Idempotent DDL run after every create_all (an alembic migration creates the same)
+SCHEMA = {
+    "postgresql": (
+        "CREATE TABLE IF NOT EXISTS chat_history_search "
+        "(id INTEGER PRIMARY KEY, user_id VARCHAR NOT NULL, document TSVECTOR NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_chat_history_search_document ON chat_history_search USING gin (document)",
+        "CREATE INDEX IF NOT EXISTS ix_chat_history_search_user_id ON chat_history_search (user_id)",
+    ),
+    "sqlite": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts "
+        "USING fts5(content, user_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    ),
+}
+
+# Highlight markers that cannot occur in text; the snippet is HTML-escaped before they become <mark>
+_START, _STOP = "\x02", "\x03"
+
+_INDEX = {
+    "postgresql": text(
+        "INSERT INTO chat_history_search (id, user_id, document) "
+        "VALUES (:id, :user_id, to_tsvector(CAST(CAST(:config AS TEXT) AS regconfig), :content)) "
+        "ON CONFLICT (id) DO UPDATE SET user_id = excluded.user_id, document = excluded.document"
+    ),
+    "sqlite": text("INSERT OR REPLACE INTO chat_history_fts (rowid, content, user_id) VALUES (:id, :content, :user_id)"),
+}
+
+_UNINDEX = {
+    "postgresql": text("DELETE FROM chat_history_search WHERE id IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    ),
+    "sqlite": text("DELETE FROM chat_history_fts WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+}
+
+# The next messages after :after that are not indexed yet, in id order
+_UNINDEXED = {
+    "postgresql": text(
+        "SELECT h.id, h.user_id, h.content FROM chat_history h "
+        "WHERE h.id > :after AND NOT EXISTS (SELECT 1 FROM chat_history_search s WHERE s.id = h.id) "
+        "ORDER BY h.id LIMIT :limit"
+    ),
+    "sqlite": text(
+        "SELECT h.id, h.user_id, h.content FROM chat_history h "
+        "WHERE h.id > :after AND NOT EXISTS (SELECT 1 FROM chat_history_fts f WHERE f.rowid = h.id) "
+        "ORDER BY h.id LIMIT :limit"
+    ),
+}
+
+# Ranked page of matches (best first) as (id, rank, snippet); the headline is computed for that page only
+_SEARCH = {
+    "postgresql": (
+        "SELECT m.id, m.rank, ts_headline(CAST(CAST(:config AS TEXT) AS regconfig), h.content, m.query, "
+        "'StartSel=\x02, StopSel=\x03, MaxFragments=2, MaxWords=24, MinWords=8') AS snippet "
+        "FROM ("
+        "SELECT s.id, ts_rank_cd(s.document, q.query) AS rank, q.query FROM chat_history_search s, "
+        "websearch_to_tsquery(CAST(CAST(:config AS TEXT) AS regconfig), :q) AS q(query) "
+        "WHERE s.document @@ q.query {user_filter} ORDER BY rank DESC, s.id DESC LIMIT :limit OFFSET :skip"
+        ") m JOIN chat_history h ON h.id = m.id ORDER BY m.rank DESC, m.id DESC"
+    ),
+    "sqlite": (
+        "SELECT rowid AS id, -bm25(chat_history_fts) AS rank, "
+        "snippet(chat_history_fts, 0, char(2), char(3), '…', 24) AS snippet "
+        "FROM chat_history_fts WHERE chat_history_fts MATCH :q {user_filter} "
+        "ORDER BY bm25(chat_history_fts), rowid DESC LIMIT :limit OFFSET :skip"
+    ),
+}
+
+
+# Part of the schema fingerprint, so changing it re-runs create_all (and with it this DDL)
+Base.metadata.info.setdefault("extra_ddl", []).extend(
+    statement for statements in SCHEMA.values() for statement in statements
+)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw) -> None:
+    for statement in SCHEMA.get(connection.dialect.name, ()):
+        connection.exec_driver_sql(statement)
+
+
+def _dialect(session: AsyncSession) -> str:
+    return session.bind.dialect.name
+
+
+def _fts5_query(q: str) -> str:
+    """Every word of ``q`` as a quoted FTS5 term (all must match), so user input is never parsed as syntax"""
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """HTML-escape a snippet and turn its match markers into ``<mark>`` tags"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+async def _index(session: AsyncSession, rows: Sequence[Any]) -> None:
+    statement = _INDEX.get(_dialect(session))
+    if statement is None or not rows:
+        return
+    params = [
+        {"id": row.id, "user_id": row.user_id, "content": row.content, "config": settings.chat_search_config}
+        for row in rows
+    ]
+    await session.execute(statement, params)
+
+
+class ChatSearchProjection(Projection):
+    """Keeps the full-text index in step with chat_history."""
+
+    key_columns = ("id",)
+
+    async def inserted(self, session: AsyncSession, objs: Sequence[Any]) -> None:
+        await _index(session, objs)
+
+    async def changed(self, session: AsyncSession, keys: Set[Tuple[int]]) -> None:
+        statement = _UNINDEX.get(_dialect(session))
+        if statement is None:
+            return
+        ids = [obj_id for (obj_id,) in keys]
+        await session.execute(statement, {"ids": ids})
+        # Deleted messages are gone now; updated ones are indexed again with their new content
+        result = await session.execute(
+            select(Chat_history.id, Chat_history.user_id, Chat_history.content).where(Chat_history.id.in_(ids))
+        )
+        await _index(session, result.all())
+
+
+chat_search_projection = ChatSearchProjection()
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database has no full-text index to search (an unsupported dialect)."""
+
+    def __init__(self, dialect: str):
+        self.dialect = dialect
+        super().__init__(f"Full-text search is not available on {dialect}")
+
+
+async def search_messages(
+    session: AsyncSession, q: str, user_id: Optional[str], skip: int = 0, limit: int = 20
+) -> List[Tuple[int, float, Optional[str]]]:
+    """Rank the messages matching ``q`` (of ``user_id``, or everyone's if None)
+
+    Returns ``(id, rank, snippet)`` for the requested page, best match first; snippets are
+    HTML-escaped with ``<mark>`` around the matched words.
+
+    Raises:
+        SearchUnavailable: If the database dialect has no full-text index.
+    """
+    dialect = _dialect(session)
+    template = _SEARCH.get(dialect)
+    if template is None:
+        raise SearchUnavailable(dialect)
+
+    params: Dict[str, Any] = {"skip": skip, "limit": limit}
+    if dialect == "sqlite":
+        params["q"] = _fts5_query(q)
+        if not params["q"]:
+            return []
+        user_filter = "AND user_id = :user_id" if user_id else ""
+    else:
+        params.update(q=q, config=settings.chat_search_config)
+        user_filter = "AND s.user_id = :user_id" if user_id else ""
+    if user_id:
+        params["user_id"] = user_id
+
+    result = await session.execute(text(template.format(user_filter=user_filter)), params)
+    return [(row.id, float(row.rank), highlight(row.snippet)) for row in result.all()]
+
+
+async def backfill_search_index(batch_size: Optional[int] = None, pause: float = 0.05) -> int:
+    """Index the messages stored before the search index existed; returns how many were indexed
+
+    Each batch commits on its own and the unindexed rows are found from the index, so the
+    job can be cancelled and started again without losing or repeating work.
+    """
+    batch_size = batch_size or settings.chat_search_backfill_batch_size
+    engine = db_manager.engine
+    if engine is None or engine.dialect.name not in _UNINDEXED:
+        return 0
+    statement = _UNINDEXED[engine.dialect.name]
+
+    after, indexed = 0, 0
+    while True:
+        async with AsyncSession(engine) as session:
+            rows = (await session.execute(statement, {"after": after, "limit": batch_size})).all()
+            if not rows:
+                break
+            await _index(session, rows)
+            await session.commit()
+        after = rows[-1].id
+        indexed += len(rows)
+        logger.debug(f"Search index backfill reached chat_history id {after} ({indexed} indexed)")
+        # Leave the connection pool to foreground requests between batches
+        await asyncio.sleep(pause)
+
+    if indexed:
+        logger.info(f"Search index backfill indexed {indexed} chat_history messages")
+    return indexed
+
+
+async def _backfill_in_background() -> None:
+    try:
+        await backfill_search_index()
+    except asyncio.CancelledError:
+        logger.info("Search index backfill stopped; it resumes on the next start")
+        raise
+    except Exception as e:
+        logger.error(f"Search index backfill failed: {e}", exc_info=True)
+
+
+def start_search_backfill() -> asyncio.Task:
+    """Run ``backfill_search_index`` as a background task of the running event loop"""
+    return asyncio.get_running_loop().create_task(_backfill_in_background())
+
+
+if __name__ == "__main__":
+    from services.database import close_database, initialize_database
+
+    async def _main() -> None:
+        await initialize_database()
+        try:
+            await backfill_search_index()
+        finally:
+            await close_database()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
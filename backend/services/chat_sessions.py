@@ -0,0 +1,180 @@
+"""
+Chat session index: one ``chat_sessions`` row per (user, session_id) of chat_history.
+
+Inserted messages are folded into their session's row by one upsert per session (count,
+first/last timestamps and a snippet of the latest message) in the transaction that inserts
+them. Updates and deletes recompute the affected sessions from chat_history and its archive
+through their (user_id, session_id, ...) indexes. Listing a user's sessions is then one
+indexed page of this table instead of a scan of every message.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, delete, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.chat_history import Chat_history
+from models.chat_history_archive import Chat_history_archive
+from models.chat_sessions import Chat_sessions
+from services.chat_archive import decompress_content
+from services.crud import CrudService, EntityRepository, Projection
+
+# Characters of the latest message kept for the session list
+SNIPPET_LENGTH = 160
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _snippet(content: Optional[str]) -> Optional[str]:
+    return content[:SNIPPET_LENGTH] if content is not None else None
+
+
+class ChatSessionProjection(Projection):
+    """Keeps ``chat_sessions`` in step with chat_history."""
+
+    key_columns = ("user_id", "session_id")
+
+    async def inserted(self, session: AsyncSession, objs: Sequence[Any]) -> None:
+        insert = _UPSERT_INSERTS.get(session.bind.dialect.name)
+        if insert is None:
+            # No upsert to merge into concurrently written rows: recompute instead
+            await self.changed(session, {(obj.user_id, obj.session_id) for obj in objs})
+            return
+
+        summaries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for obj in objs:
+            summary = summaries.get((obj.user_id, obj.session_id))
+            if summary is None:
+                summaries[(obj.user_id, obj.session_id)] = {
+                    "user_id": obj.user_id,
+                    "session_id": obj.session_id,
+                    "message_count": 1,
+                    "first_message_at": obj.created_at,
+                    "last_message_at": obj.created_at,
+                    "last_message_id": obj.id,
+                    "last_snippet": _snippet(obj.content),
+                }
+                continue
+            summary["message_count"] += 1
+            summary["first_message_at"] = min(summary["first_message_at"], obj.created_at)
+            if (obj.created_at, obj.id) > (summary["last_message_at"], summary["last_message_id"]):
+                summary.update(
+                    last_message_at=obj.created_at, last_message_id=obj.id, last_snippet=_snippet(obj.content)
+                )
+
+        table = Chat_sessions.__table__
+        stmt = insert(table)
+        new = stmt.excluded
+        # Messages may arrive out of timestamp order; the latest one by (created_at, id) wins
+        newer = tuple_(new.last_message_at, new.last_message_id) > tuple_(
+            table.c.last_message_at, table.c.last_message_id
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.session_id],
+            set_={
+                "message_count": table.c.message_count + new.message_count,
+                "first_message_at": case(
+                    (new.first_message_at < table.c.first_message_at, new.first_message_at),
+                    else_=table.c.first_message_at,
+                ),
+                "last_message_at": case((newer, new.last_message_at), else_=table.c.last_message_at),
+                "last_message_id": case((newer, new.last_message_id), else_=table.c.last_message_id),
+                "last_snippet": case((newer, new.last_snippet), else_=table.c.last_snippet),
+            },
+        )
+        await session.execute(stmt, list(summaries.values()))
+
+    async def changed(self, session: AsyncSession, keys: Set[Tuple[str, str]]) -> None:
+        for user_id, session_id in keys:
+            await self._recompute(session, user_id, session_id)
+
+    async def _recompute(self, session: AsyncSession, user_id: str, session_id: str) -> None:
+        """Recount one session from its messages and update its row in place
+
+        The row is locked before counting, so a concurrent upsert for the session has either
+        committed (and is counted, each statement seeing the latest commits) or waits for
+        this transaction. A session without a row is inserted; if another transaction
+        inserted it meanwhile, its row is locked and counted again.
+        """
+        table = Chat_sessions.__table__
+        this_session = (table.c.user_id == user_id, table.c.session_id == session_id)
+        upsert_insert = _UPSERT_INSERTS.get(session.bind.dialect.name)
+        while True:
+            row_id = (await session.execute(select(table.c.id).where(*this_session).with_for_update())).scalar()
+            summary = await self._summarize(session, user_id, session_id)
+            if summary is None:
+                if row_id is not None:
+                    await session.execute(delete(table).where(table.c.id == row_id))
+                return
+            if row_id is not None:
+                await session.execute(update(table).where(table.c.id == row_id).values(**summary))
+                return
+            if upsert_insert is None:
+                await session.execute(table.insert().values(user_id=user_id, session_id=session_id, **summary))
+                return
+            result = await session.execute(
+                upsert_insert(table)
+                .values(user_id=user_id, session_id=session_id, **summary)
+                .on_conflict_do_nothing(index_elements=[table.c.user_id, table.c.session_id])
+            )
+            if result.rowcount:
+                return
+
+    async def _summarize(self, session: AsyncSession, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """The ``chat_sessions`` values of a session's messages, or None if it has none left"""
+        # Archived messages still belong to their session
+        message_count, first_message_at, last = 0, None, None
+        for model in (Chat_history, Chat_history_archive):
+            in_session = (model.user_id == user_id, model.session_id == session_id)
+            count, first = (
+                await session.execute(select(func.count(model.id), func.min(model.created_at)).where(*in_session))
+            ).one()
+            if not count:
+                continue
+            latest = (
+                await session.execute(
+                    select(model.created_at, model.id, model.content)
+                    .where(*in_session)
+                    .order_by(model.created_at.desc(), model.id.desc())
+                    .limit(1)
+                )
+            ).one()
+            message_count += count
+            first_message_at = first if first_message_at is None else min(first_message_at, first)
+            if model is Chat_history_archive:
+                latest = (latest.created_at, latest.id, decompress_content(latest.content))
+            last = tuple(latest) if last is None else max(last, tuple(latest))
+        if not message_count:
+            return None
+        last_message_at, last_message_id, last_content = last
+        return {
+            "message_count": message_count,
+            "first_message_at": first_message_at,
+            "last_message_at": last_message_at,
+            "last_message_id": last_message_id,
+            "last_snippet": _snippet(last_content),
+        }
+
+
+chat_session_projection = ChatSessionProjection()
+
+
+# ------------------ Service Layer ------------------
+class Chat_sessionsService(CrudService):
+    """Service layer for the chat session index (read-only; written through chat_history)"""
+
+    repository = EntityRepository(
+        Chat_sessions,
+        filterable=("id", "user_id", "session_id", "last_message_at"),
+        sortable=("id", "last_message_at"),
+    )
+
+    async def _sync(self, user_id: Optional[str]) -> None:
+        # Sessions are derived from chat_history, whose buffered messages have to land first
+        from services.chat_history import Chat_historyService
+
+        buffer = Chat_historyService.repository.write_buffer
+        if buffer is not None:
+            await buffer.sync(user_id)
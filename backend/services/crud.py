@@ -0,0 +1,769 @@
+"""
+Generic CRUD engine shared by the entity services.
+
+Everything that only depends on the model (column maps, timestamp and updatable field
+sets, the filter/sort whitelist compiler, the list-total cache and the statements that do
+not vary per request) is built once per model by ``EntityRepository`` when the entity
+service module is imported. ``CrudService`` implements the operations on top of it, so an
+entity service is just a subclass naming its repository.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from operator import attrgetter
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import DateTime, bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import db_manager
+from services.write_buffer import write_buffer_for
+from utils.counting import CountCache, count_on_own_connection, estimate_row_count
+from utils.etag import make_etag, new_row_version
+from utils.filters import QueryCompiler
+from utils.pagination import decode_cursor, encode_cursor, keyset_condition
+from utils.read_cache import ReadCache
+from utils.timestamps import coerce_timestamps, format_timestamp, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping columns that are never exchanged with clients
+INTERNAL_COLUMNS = frozenset({"row_version"})
+
+# Rows fetched per server-side cursor round trip when streaming a list
+STREAM_BATCH_SIZE = 500
+
+
+class Projection(ABC):
+    """A derived table kept in step with an entity inside the transactions writing it."""
+
+    # Source columns identifying the derived row a source row contributes to
+    key_columns: Tuple[str, ...] = ()
+
+    @abstractmethod
+    async def inserted(self, session: AsyncSession, objs: Sequence[Any]) -> None:
+        """Fold the new source rows ``objs`` into the derived rows incrementally"""
+
+    @abstractmethod
+    async def changed(self, session: AsyncSession, keys: Set[Tuple[Any, ...]]) -> None:
+        """Recompute the derived rows of ``keys`` after source rows were updated or deleted"""
+
+
+class EntityRepository:
+    """Per-model metadata and statements, computed once at registration."""
+
+    def __init__(
+        self,
+        model,
+        filterable: Iterable[str],
+        sortable: Iterable[str],
+        cached: bool = False,
+        write_behind: bool = False,
+        projections: Iterable[Projection] = (),
+    ):
+        self.model = model
+        self.name = model.__tablename__
+        self.label = model.__name__
+        table = model.__table__
+
+        self.column_names = tuple(name for name in table.c.keys() if name not in INTERNAL_COLUMNS)
+        self.columns = {name: getattr(model, name) for name in self.column_names}
+        # Reads a mapped instance as a tuple in column order
+        self.row_of = attrgetter(*self.column_names)
+        # Columns stored as native timestamps but exchanged as ISO-8601 strings
+        self.timestamp_fields = frozenset(c.name for c in table.c if isinstance(c.type, DateTime))
+        # Columns a client may change; id and ownership are immutable
+        self.updatable_fields = frozenset(name for name in self.column_names if name not in ("id", "user_id"))
+
+        # Filters apply inside the (user_id, ...) index range and sorts are served by the
+        # (user_id, id|created_at) indexes
+        self.query_compiler = QueryCompiler(model, filterable=filterable, sortable=sortable)
+
+        # Exact list totals per (user, filter), dropped on every write through this repository
+        self.count_cache = CountCache(ttl=settings.list_count_cache_ttl)
+
+        # Per-user cache of record and list reads, for entities read far more often than written
+        self.read_cache = (
+            ReadCache(self.name, ttl=settings.read_cache_ttl, max_entries=settings.read_cache_max_entries)
+            if cached
+            else None
+        )
+
+        # Coalesced INSERTs across requests for append-heavy entities, when write_behind_mode enables them
+        self.write_buffer = write_buffer_for(self) if write_behind else None
+
+        # Derived tables updated in the same transaction as every write to this one
+        self.projections = tuple(projections)
+        self.projection_columns = sorted({name for p in self.projections for name in p.key_columns})
+
+        # Statements that only differ by bound values; built once so requests skip statement
+        # construction and hit SQLAlchemy's compiled cache with the same cache key every time
+        self.select_entity = select(model)
+        self.count_entity = select(func.count(model.id))
+        self.select_by_id = select(model).where(model.id == bindparam("obj_id"))
+        self.select_owned_by_id = self.select_by_id.where(model.user_id == bindparam("user_id"))
+        self.delete_by_id = delete(table).where(table.c.id == bindparam("obj_id"))
+        self.delete_owned_by_id = self.delete_by_id.where(table.c.user_id == bindparam("user_id"))
+
+        # Tables with a row_version stamp serve ETags from one aggregate instead of the rows
+        self.versioned = "row_version" in table.c
+        if self.versioned:
+            self.version_entity = select(
+                func.count(model.id), func.max(model.id), func.coalesce(func.sum(model.row_version), 0)
+            )
+            self.select_version_by_id = select(model.row_version).where(model.id == bindparam("obj_id"))
+            self.select_owned_version_by_id = self.select_version_by_id.where(
+                model.user_id == bindparam("user_id")
+            )
+
+    async def invalidate(self, user_id: Optional[str]) -> None:
+        """Drop cached totals and reads affected by a write of ``user_id`` (everything if None)
+
+        The user's reads are also kept off the read replicas until the write has replicated.
+        """
+        db_manager.note_write(user_id)
+        self.count_cache.invalidate(user_id)
+        if self.read_cache is not None:
+            await self.read_cache.invalidate(user_id)
+
+    async def project_inserted(self, session: AsyncSession, objs: Sequence[Any]) -> None:
+        """Fold newly inserted rows into the projections (before the transaction commits)"""
+        for projection in self.projections:
+            await projection.inserted(session, objs)
+
+    async def projection_rows(
+        self, session: AsyncSession, obj_ids: Iterable[int], user_id: Optional[str]
+    ) -> List[Any]:
+        """Projection key columns of the rows ``obj_ids``, read before they are updated or deleted"""
+        if not self.projections:
+            return []
+        query = select(*(self.columns[name] for name in self.projection_columns)).where(
+            self.model.id.in_(list(obj_ids))
+        )
+        if user_id:
+            query = query.where(self.model.user_id == user_id)
+        return list((await session.execute(query)).all())
+
+    async def project_changed(self, session: AsyncSession, rows: Iterable[Any]) -> None:
+        """Recompute the projections touched by updated or deleted ``rows`` (before the commit)"""
+        rows = list(rows)
+        for projection in self.projections:
+            keys = {tuple(getattr(row, name) for name in projection.key_columns) for row in rows}
+            if keys:
+                await projection.changed(session, keys)
+
+    def projected_fields(self, fields: List[str]) -> List[str]:
+        """Validate a ``fields`` projection and return it in column order (``id`` is always included)"""
+        unknown = [name for name in fields if name not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown fields for {self.name}: {', '.join(unknown)}")
+        return [name for name in self.column_names if name == "id" or name in fields]
+
+    def to_records(self, rows: Iterable[Sequence[Any]], names: Sequence[str]) -> List[Dict[str, Any]]:
+        """Turn result rows whose leading columns are ``names`` into JSON-ready dicts
+
+        Timestamps become ISO-8601 strings, so the records serialize as they are, with
+        no per-row response model validation.
+        """
+        timestamp_names = [name for name in names if name in self.timestamp_fields]
+        records = [dict(zip(names, row)) for row in rows]
+        if timestamp_names:
+            for record in records:
+                for name in timestamp_names:
+                    record[name] = format_timestamp(record[name])
+        return records
+
+    def object_record(self, obj) -> Dict[str, Any]:
+        """Turn a mapped instance into a JSON-ready dict (see ``to_records``)"""
+        return self.to_records([self.row_of(obj)], self.column_names)[0]
+
+    def object_records(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Turn mapped instances into JSON-ready dicts (see ``to_records``)"""
+        return self.to_records(map(self.row_of, objs), self.column_names)
+
+    def column(self, field_name: str):
+        """Return the mapped column attribute for ``field_name``"""
+        try:
+            return self.columns[field_name]
+        except KeyError:
+            raise ValueError(f"Field {field_name} does not exist on {self.label}") from None
+
+
+# ------------------ Service Layer ------------------
+class CrudService:
+    """Generic service layer; subclasses set ``repository`` to the entity they serve"""
+
+    repository: EntityRepository
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _invalidate(self, user_id: Optional[str]) -> None:
+        """Drop cached totals and reads affected by a write of ``user_id`` (everything if None)"""
+        await self.repository.invalidate(user_id)
+
+    async def _sync(self, user_id: Optional[str]) -> None:
+        """Make writes of ``user_id`` still in the write buffer visible (everyone's if None)"""
+        if self.repository.write_buffer is not None:
+            await self.repository.write_buffer.sync(user_id)
+
+    async def create(self, data: Dict[str, Any], user_id: Optional[str] = None):
+        """Create a new record with a single INSERT ... RETURNING
+
+        With a write buffer the row is inserted together with other requests' rows instead;
+        in ``async`` write-behind mode the returned instance is then not yet stored and has
+        no id.
+        """
+        repo = self.repository
+        try:
+            data = dict(data)  # The caller's dict is left as it was
+            if user_id:
+                data['user_id'] = user_id
+            coerce_timestamps(data, repo.timestamp_fields)
+            if repo.versioned:
+                data['row_version'] = new_row_version()
+            if repo.write_buffer is not None:
+                return await repo.write_buffer.submit(self.db.bind, data)
+            if self.db.bind.dialect.insert_returning:
+                obj = await self.db.scalar(insert(repo.model).values(**data).returning(repo.model))
+            else:
+                # The INSERT still reports the new primary key; no columns have server defaults to refresh
+                obj = repo.model(**data)
+                self.db.add(obj)
+                await self.db.flush()
+            await repo.project_inserted(self.db, [obj])
+            await self.db.commit()
+            await self._invalidate(obj.user_id)
+            logger.info(f"Created {repo.name} with id: {obj.id}")
+            return obj
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error creating {repo.name}: {str(e)}")
+            raise
+
+    async def create_many(self, items: List[Dict[str, Any]], user_id: Optional[str] = None) -> List[Any]:
+        """Create several records in a single transaction (all or nothing)
+
+        Where the dialect can return the rows of a multi-row INSERT in parameter order
+        (Postgres), that is one ``INSERT ... VALUES (...), (...) RETURNING`` per page of
+        rows; SQLite cannot guarantee that order, so there it is one ``INSERT ... RETURNING``
+        per row, still in the one transaction.
+        """
+        repo = self.repository
+        if not items:
+            return []
+        try:
+            # Rows this user still has buffered go first, keeping ids in submission order
+            await self._sync(user_id)
+            rows = []
+            for data in items:
+                data = dict(data)
+                if user_id:
+                    data['user_id'] = user_id
+                if repo.versioned:
+                    data['row_version'] = new_row_version()
+                rows.append(coerce_timestamps(data, repo.timestamp_fields))
+
+            if self.db.bind.dialect.insert_executemany_returning:
+                # insertmanyvalues: multi-row INSERT ... RETURNING where the order is guaranteed, else per row
+                result = await self.db.scalars(
+                    insert(repo.model).returning(repo.model, sort_by_parameter_order=True), rows
+                )
+                objs = list(result.all())
+            else:
+                # Dialects without multi-row RETURNING: still one flush and one transaction
+                objs = [repo.model(**data) for data in rows]
+                self.db.add_all(objs)
+                await self.db.flush()
+            await repo.project_inserted(self.db, objs)
+            await self.db.commit()
+            await self._invalidate(user_id)
+            logger.info(f"Created {len(objs)} {repo.name}s in one transaction")
+            return objs
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error bulk creating {repo.name}s: {str(e)}")
+            raise
+
+    async def check_ownership(self, obj_id: int, user_id: str) -> bool:
+        """Check if user owns this record"""
+        try:
+            obj = await self.get_by_id(obj_id, user_id=user_id)
+            return obj is not None
+        except Exception as e:
+            logger.error(f"Error checking ownership for {self.repository.name} {obj_id}: {str(e)}")
+            return False
+
+    async def get_by_id(self, obj_id: int, user_id: Optional[str] = None, fields: Optional[List[str]] = None):
+        """Get a record by ID (user can only see their own records)
+
+        With ``fields`` only those columns are selected and a JSON-ready dict is returned.
+        """
+        repo = self.repository
+        try:
+            await self._sync(user_id)
+            if fields:
+                output_fields = repo.projected_fields(fields)
+                query = select(*(repo.columns[name] for name in output_fields)).where(repo.model.id == obj_id)
+                if user_id:
+                    query = query.where(repo.model.user_id == user_id)
+                row = (await self.db.execute(query)).one_or_none()
+                return repo.to_records([row], output_fields)[0] if row is not None else None
+            if user_id:
+                result = await self.db.execute(repo.select_owned_by_id, {"obj_id": obj_id, "user_id": user_id})
+            else:
+                result = await self.db.execute(repo.select_by_id, {"obj_id": obj_id})
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Error fetching {repo.name} {obj_id}: {str(e)}")
+            raise
+
+    async def get_record(
+        self, obj_id: int, user_id: Optional[str] = None, fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get a record by ID as a JSON-ready dict (served from the read cache when enabled)"""
+        repo = self.repository
+        await self._sync(user_id)
+
+        async def load():
+            obj = await self.get_by_id(obj_id, user_id=user_id, fields=fields)
+            if obj is None or fields:
+                return obj
+            return repo.object_record(obj)
+
+        if repo.read_cache is None:
+            return await load()
+        return await repo.read_cache.get_or_load(user_id, ("record", obj_id, fields), load)
+
+    async def record_etag(
+        self, obj_id: int, user_id: Optional[str] = None, fields: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """Weak ETag of ``get_record``'s result from the row's version alone.
+
+        None when the entity is not versioned or the record does not exist.
+        """
+        repo = self.repository
+        if not repo.versioned:
+            return None
+        await self._sync(user_id)
+
+        async def load():
+            if user_id:
+                params = {"obj_id": obj_id, "user_id": user_id}
+                version = await self.db.scalar(repo.select_owned_version_by_id, params)
+            else:
+                version = await self.db.scalar(repo.select_version_by_id, {"obj_id": obj_id})
+            return make_etag(repo.name, obj_id, version, fields) if version is not None else None
+
+        if repo.read_cache is None:
+            return await load()
+        return await repo.read_cache.get_or_load(user_id, ("record-etag", obj_id, fields), load)
+
+    async def list_etag(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        user_id: Optional[str] = None,
+        query_dict: Optional[Dict[str, Any]] = None,
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        total_mode: str = "exact",
+        fields: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        """Weak ETag of ``get_list``'s result from one ``count/max(id)/sum(row_version)`` aggregate
+
+        Takes the same arguments as ``get_list``; None when the entity is not versioned.
+        """
+        repo = self.repository
+        if not repo.versioned:
+            return None
+        await self._sync(user_id)
+        params = (skip, limit, query_dict, sort, cursor, total_mode, fields)
+
+        async def load():
+            query = repo.version_entity
+            if user_id:
+                query = query.where(repo.model.user_id == user_id)
+            for clause in repo.query_compiler.compile_filters(query_dict):
+                query = query.where(clause)
+            count, max_id, version_sum = (await self.db.execute(query)).one()
+            # sum() of a BIGINT is NUMERIC on Postgres
+            return make_etag(repo.name, user_id, count, max_id, int(version_sum), params)
+
+        if repo.read_cache is None:
+            return await load()
+        return await repo.read_cache.get_or_load(user_id, ("list-etag", *params), load)
+
+    def _list_query(
+        self,
+        user_id: Optional[str],
+        query_dict: Optional[Dict[str, Any]],
+        sort: Optional[str],
+        cursor: Optional[str],
+    ):
+        """Build the filtered, ordered (and seeked) list query with its matching count query.
+
+        Returns ``(query, count_query, sort_spec, sort_column)``.
+        """
+        repo = self.repository
+        model = repo.model
+        query = repo.select_entity
+        count_query = repo.count_entity
+
+        if user_id:
+            query = query.where(model.user_id == user_id)
+            count_query = count_query.where(model.user_id == user_id)
+
+        for clause in repo.query_compiler.compile_filters(query_dict):
+            query = query.where(clause)
+            count_query = count_query.where(clause)
+
+        # Always tie-break on id so that both offset and keyset pages are stable
+        sort_spec, sort_column, descending = repo.query_compiler.resolve_sort(sort)
+        if descending:
+            query = query.order_by(sort_column.desc())
+            if sort_column is not model.id:
+                query = query.order_by(model.id.desc())
+        else:
+            query = query.order_by(sort_column)
+            if sort_column is not model.id:
+                query = query.order_by(model.id)
+
+        if cursor:
+            # Keyset positions are only well-defined on non-nullable sort keys
+            if sort_column.nullable:
+                raise ValueError(f"Cursor pagination is not supported when sorting by '{sort_spec}'")
+            key, last_id = decode_cursor(cursor, sort_spec)
+            if sort_column.key in repo.timestamp_fields:
+                key = parse_timestamp(key)
+            query = query.where(keyset_condition(sort_column, model.id, key, last_id, descending))
+
+        return query, count_query, sort_spec, sort_column
+
+    async def get_list(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        user_id: Optional[str] = None,
+        query_dict: Optional[Dict[str, Any]] = None,
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        total_mode: str = "exact",
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Get a paginated list of records (user can only see their own records)
+
+        Pages by ``skip``/``limit`` offsets, or by a ``(sort_key, id)`` seek when ``cursor``
+        (the ``next_cursor`` of a previous page with the same sort) is given.
+
+        ``total_mode`` is ``"exact"`` (cached for a short TTL), ``"estimated"`` (from table
+        statistics; exact when filtered by ``query_dict`` or no statistics exist) or
+        ``"none"`` (``total`` is None).
+
+        ``query_dict`` and ``sort`` follow the filter language of ``utils.filters``; disallowed
+        fields, unknown operators and mistyped values raise ValueError.
+
+        Items are plain dicts with ISO-8601 timestamps built straight from result rows; with
+        ``fields`` only those columns (plus ``id``) are selected.
+
+        Served from the read cache when the repository has one; the result is then shared
+        and must not be mutated.
+        """
+        repo = self.repository
+        await self._sync(user_id)
+        args = (skip, limit, user_id, query_dict, sort, cursor, total_mode, fields)
+        if repo.read_cache is None:
+            return await self._get_list(*args)
+        read_key = ("list", skip, limit, query_dict, sort, cursor, total_mode, fields)
+        return await repo.read_cache.get_or_load(user_id, read_key, lambda: self._get_list(*args))
+
+    async def _get_list(
+        self,
+        skip: int,
+        limit: int,
+        user_id: Optional[str],
+        query_dict: Optional[Dict[str, Any]],
+        sort: Optional[str],
+        cursor: Optional[str],
+        total_mode: str,
+        fields: Optional[List[str]],
+    ) -> Dict[str, Any]:
+        repo = self.repository
+        model = repo.model
+        try:
+            query, count_query, sort_spec, sort_column = self._list_query(user_id, query_dict, sort, cursor)
+            # Keyset positions are only well-defined on non-nullable sort keys
+            seekable = not sort_column.nullable
+
+            # Read-only page: plain Row tuples instead of identity-mapped ORM instances; the
+            # sort key trails the output columns when it is needed for the cursor only
+            output_fields = repo.projected_fields(fields) if fields else repo.column_names
+            selected = [repo.columns[name] for name in output_fields]
+            if sort_column.key not in output_fields:
+                selected.append(sort_column)
+            query = query.with_only_columns(*selected)
+
+            # Fetch one extra row to learn whether another page exists
+            page_query = query.offset(skip).limit(limit + 1)
+            total, total_estimated = None, False
+            if total_mode == "estimated" and not query_dict:
+                total = await estimate_row_count(self.db, model.__table__, user_id)
+                total_estimated = total is not None
+            if total_mode != "none" and total is None:
+                count_key = repo.count_cache.make_key(user_id, query_dict)
+                total = repo.count_cache.get(count_key)
+                if total is None:
+                    # Count on a separate connection while the page is fetched on this one
+                    total, result = await asyncio.gather(
+                        count_on_own_connection(self.db, count_query), self.db.execute(page_query)
+                    )
+                    repo.count_cache.set(count_key, total)
+                else:
+                    result = await self.db.execute(page_query)
+            else:
+                result = await self.db.execute(page_query)
+            rows = result.all()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                if seekable:
+                    last = rows[-1]
+                    last_key = getattr(last, sort_column.key)
+                    next_cursor = encode_cursor(sort_spec, format_timestamp(last_key), last.id)
+
+            return {
+                "items": repo.to_records(rows, output_fields),
+                "total": total,
+                "total_estimated": total_estimated,
+                "skip": skip,
+                "limit": limit,
+                "next_cursor": next_cursor,
+            }
+        except Exception as e:
+            logger.error(f"Error fetching {repo.name} list: {str(e)}")
+            raise
+
+    async def stream_list(
+        self,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        user_id: Optional[str] = None,
+        query_dict: Optional[Dict[str, Any]] = None,
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream the rows of a list query in batches of plain dicts (timestamps as ISO strings)
+
+        Arguments are validated before returning, so a bad filter raises ValueError here
+        rather than halfway through a response. The rows are then read through a
+        server-side cursor (``yield_per``) on a session of their own, since the request
+        session may be closed before a streaming response is sent; only one batch of rows
+        is held in memory at a time. ``limit`` None streams every matching row.
+        """
+        repo = self.repository
+        query, _count_query, _sort_spec, _sort_column = self._list_query(user_id, query_dict, sort, cursor)
+        await self._sync(user_id)
+        output_fields = repo.projected_fields(fields) if fields else repo.column_names
+        # Plain column rows: no ORM identity map or instance state per streamed row
+        query = query.with_only_columns(*(repo.columns[name] for name in output_fields))
+        if skip:
+            query = query.offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        query = query.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+        async def batches():
+            streamed = 0
+            async with AsyncSession(self.db.bind) as session:
+                result = await session.stream(query)
+                async for partition in result.partitions():
+                    records = repo.to_records(partition, output_fields)
+                    streamed += len(records)
+                    yield records
+            logger.debug(f"Streamed {streamed} {repo.name}s")
+
+        return batches()
+
+    async def update(self, obj_id: int, update_data: Dict[str, Any], user_id: Optional[str] = None):
+        """Update a record (requires ownership)
+
+        Ownership is part of the WHERE clause, so with RETURNING this is one
+        ``UPDATE ... WHERE id = :id AND user_id = :u RETURNING`` statement.
+        """
+        repo = self.repository
+        model = repo.model
+        try:
+            await self._sync(user_id)
+            values = coerce_timestamps(dict(update_data), repo.timestamp_fields)
+            values = {k: v for k, v in values.items() if k in repo.updatable_fields}
+            if not values:
+                return await self.get_by_id(obj_id, user_id=user_id)
+            if repo.versioned:
+                values['row_version'] = new_row_version()
+            previous = await repo.projection_rows(self.db, [obj_id], user_id)
+
+            stmt = update(model).where(model.id == obj_id).values(**values)
+            if user_id:
+                stmt = stmt.where(model.user_id == user_id)
+            if self.db.bind.dialect.update_returning:
+                obj = await self.db.scalar(stmt.returning(model))
+            else:
+                result = await self.db.execute(stmt)
+                obj = await self.get_by_id(obj_id, user_id=user_id) if result.rowcount else None
+            if not obj:
+                # Ends the transaction the projection read and the UPDATE began
+                await self.db.rollback()
+                logger.warning(f"{repo.label} {obj_id} not found for update")
+                return None
+
+            await repo.project_changed(self.db, [*previous, obj])
+            await self.db.commit()
+            await self._invalidate(obj.user_id)
+            logger.info(f"Updated {repo.name} {obj_id}")
+            return obj
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error updating {repo.name} {obj_id}: {str(e)}")
+            raise
+
+    async def delete(self, obj_id: int, user_id: Optional[str] = None) -> bool:
+        """Delete a record (requires ownership) with a single DELETE ... WHERE id = :id AND user_id = :u"""
+        repo = self.repository
+        try:
+            await self._sync(user_id)
+            previous = await repo.projection_rows(self.db, [obj_id], user_id)
+            if user_id:
+                result = await self.db.execute(repo.delete_owned_by_id, {"obj_id": obj_id, "user_id": user_id})
+            else:
+                result = await self.db.execute(repo.delete_by_id, {"obj_id": obj_id})
+            if not result.rowcount:
+                await self.db.rollback()
+                logger.warning(f"{repo.label} {obj_id} not found for deletion")
+                return False
+            await repo.project_changed(self.db, previous)
+            await self.db.commit()
+            await self._invalidate(user_id)
+            logger.info(f"Deleted {repo.name} {obj_id}")
+            return True
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error deleting {repo.name} {obj_id}: {str(e)}")
+            raise
+
+    async def update_many(self, updates: List[Tuple[int, Dict[str, Any]]], user_id: Optional[str] = None) -> List[Any]:
+        """Update several records set-based (requires ownership)
+
+        Ids sharing the same change set are updated by a single
+        ``UPDATE ... WHERE user_id = :u AND id IN (...) RETURNING`` statement, all in one transaction.
+        """
+        repo = self.repository
+        model = repo.model
+        try:
+            await self._sync(user_id)
+            # Later updates of the same id win, as if they had been applied one after another
+            merged: Dict[int, Dict[str, Any]] = {}
+            for obj_id, update_data in updates:
+                merged.setdefault(obj_id, {}).update(update_data)
+
+            groups: Dict[Tuple[Tuple[str, Any], ...], List[int]] = {}
+            for obj_id, update_data in merged.items():
+                values = coerce_timestamps(dict(update_data), repo.timestamp_fields)
+                change_set = tuple(sorted((k, v) for k, v in values.items() if k in repo.updatable_fields))
+                groups.setdefault(change_set, []).append(obj_id)
+
+            previous = await repo.projection_rows(self.db, merged, user_id)
+            returning = self.db.bind.dialect.update_returning
+            updated: Dict[int, Any] = {}
+            reload_ids: List[int] = []
+            for change_set, ids in groups.items():
+                if not change_set:
+                    reload_ids.extend(ids)
+                    continue
+                values = dict(change_set)
+                if repo.versioned:
+                    values['row_version'] = new_row_version()
+                stmt = update(model).where(model.id.in_(ids)).values(values)
+                if user_id:
+                    stmt = stmt.where(model.user_id == user_id)
+                if returning:
+                    result = await self.db.scalars(stmt.returning(model))
+                    updated.update((obj.id, obj) for obj in result.all())
+                else:
+                    await self.db.execute(stmt)
+                    reload_ids.extend(ids)
+
+            if reload_ids:
+                query = repo.select_entity.where(model.id.in_(reload_ids))
+                if user_id:
+                    query = query.where(model.user_id == user_id)
+                result = await self.db.scalars(query.execution_options(populate_existing=True))
+                updated.update((obj.id, obj) for obj in result.all())
+
+            await repo.project_changed(self.db, [*previous, *updated.values()])
+            await self.db.commit()
+            await self._invalidate(user_id)
+            logger.info(f"Updated {len(updated)} {repo.name}s in {len(groups)} statements")
+            return [updated[obj_id] for obj_id in merged if obj_id in updated]
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error bulk updating {repo.name}s: {str(e)}")
+            raise
+
+    async def delete_many(self, obj_ids: List[int], user_id: Optional[str] = None) -> int:
+        """Delete several records with one ``DELETE ... WHERE user_id = :u AND id IN (...)`` (requires ownership)"""
+        repo = self.repository
+        model = repo.model
+        if not obj_ids:
+            return 0
+        try:
+            await self._sync(user_id)
+            previous = await repo.projection_rows(self.db, obj_ids, user_id)
+            stmt = delete(model).where(model.id.in_(obj_ids))
+            if user_id:
+                stmt = stmt.where(model.user_id == user_id)
+            result = await self.db.execute(stmt.execution_options(synchronize_session=False))
+            await repo.project_changed(self.db, previous)
+            await self.db.commit()
+            await self._invalidate(user_id)
+            logger.info(f"Deleted {result.rowcount} {repo.name}s in one statement")
+            return result.rowcount
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error bulk deleting {repo.name}s: {str(e)}")
+            raise
+
+    async def get_by_field(self, field_name: str, field_value: Any):
+        """Get a record by any column"""
+        repo = self.repository
+        try:
+            column = repo.column(field_name)
+            if field_name in repo.timestamp_fields:
+                field_value = parse_timestamp(field_value)
+            await self._sync(None)
+            result = await self.db.execute(repo.select_entity.where(column == field_value))
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Error fetching {repo.name} by {field_name}: {str(e)}")
+            raise
+
+    async def list_by_field(self, field_name: str, field_value: Any, skip: int = 0, limit: int = 20) -> List[Any]:
+        """Get a list of records filtered by any column"""
+        repo = self.repository
+        try:
+            column = repo.column(field_name)
+            if field_name in repo.timestamp_fields:
+                field_value = parse_timestamp(field_value)
+            await self._sync(None)
+            result = await self.db.execute(
+                repo.select_entity.where(column == field_value)
+                .offset(skip)
+                .limit(limit)
+                .order_by(repo.model.id.desc())
+            )
+            return result.scalars().all()
+        except Exception as e:
+            logger.error(f"Error fetching {repo.name}s by {field_name}: {str(e)}")
+            raise
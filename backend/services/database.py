@@ -2,6 +2,7 @@ import logging
 import time
 
 from core.database import db_manager
+from services.write_buffer import flush_write_buffers
 from sqlalchemy import text
 
 logger = logging.getLogger(__name__)
@@ -31,10 +32,9 @@ async def initialize_database():
     logger.debug("[DB_OP] Starting database initialization")
     try:
         logger.info("🔧 Starting database initialization...")
-        await db_manager.init_db()
-        logger.info("🔧 Database connection initialized, now creating tables if tables not exist...")
-        await db_manager.create_tables()
-        logger.info("🔧 Table creation completed")
+        # Shared with lazy initialization from concurrent first requests: one engine, one create_all
+        await db_manager.ensure_initialized()
+        logger.info("🔧 Database connection and tables initialized")
         logger.info("Database initialized successfully")
         logger.debug(f"[DB_OP] Database initialization completed in {time.time() - start_time:.4f}s")
     except Exception as e:
@@ -47,6 +47,8 @@ async def close_database():
     start_time = time.time()
     logger.debug("[DB_OP] Starting database close")
     try:
+        # Buffered writes go out while the engine is still open
+        await flush_write_buffers()
         await db_manager.close_db()
         logger.info("Database connections closed")
         logger.debug(f"[DB_OP] Database close completed in {time.time() - start_time:.4f}s")
@@ -0,0 +1,229 @@
+"""
+Write-behind buffering of single-row INSERTs.
+
+Append-heavy entities (chat_history gets a user message and an assistant reply on every
+chat turn) can route ``create`` through a ``WriteBuffer``: rows from concurrent requests
+are queued and written together in one transaction (one multi-row INSERT on Postgres),
+every ``write_behind_flush_interval_ms`` or as soon as ``write_behind_max_rows`` are queued.
+
+``write_behind_mode`` is the durability knob:
+
+- ``off``: no buffering, every create is its own transaction (the default).
+- ``group``: the request waits until the batch holding its row has committed and gets
+  the stored row back, so an acknowledged write is durable; only the commits are shared.
+- ``async``: the request is acknowledged as soon as its row is queued, without an id.
+  Rows still queued when the process dies are lost. Lambda freezes the process between
+  invocations, so ``async`` falls back to ``group`` there.
+
+Reads stay consistent for the writer: ``sync`` flushes the rows a user still has queued
+(or in flight) before ``CrudService`` reads or modifies that user's rows, and
+``close_database`` flushes everything on shutdown.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+# Every buffer, so that shutdown can flush them all
+_buffers: List["WriteBuffer"] = []
+
+
+class WriteBuffer:
+    """Queue of rows for one entity, written in batches on a session of its own."""
+
+    def __init__(self, repository, durable: bool, flush_interval: float, max_rows: int):
+        self.repository = repository
+        self.durable = durable
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._rows: List[Dict[str, Any]] = []
+        self._waiters: List[Optional[asyncio.Future]] = []
+        # Queued or in-flight rows per user, for read-your-writes
+        self._unflushed: Counter = Counter()
+        self._bind = None
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        _buffers.append(self)
+
+    async def submit(self, bind, row: Dict[str, Any]):
+        """Queue ``row`` for insertion through ``bind``.
+
+        Returns the stored instance once its batch has committed when durable, otherwise
+        (right away) a transient instance without an id.
+        """
+        loop = asyncio.get_running_loop()
+        self._bind = bind
+        waiter = loop.create_future() if self.durable else None
+        self._rows.append(row)
+        self._waiters.append(waiter)
+        self._unflushed[row.get("user_id")] += 1
+        # Reads that flush this row on the primary must not then go to a replica
+        db_manager.note_write(row.get("user_id"))
+
+        if len(self._rows) >= self.max_rows:
+            task = loop.create_task(self.flush())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif self._timer is None:
+            self._timer = loop.create_task(self._flush_later())
+
+        if waiter is None:
+            return self.repository.model(**row)
+        return await waiter
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        await self.flush()
+
+    async def sync(self, user_id: Optional[str] = None) -> None:
+        """Wait until the rows ``user_id`` submitted so far are committed (everyone's if None)"""
+        unflushed = self._unflushed[user_id] if user_id is not None else sum(self._unflushed.values())
+        if unflushed:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write every queued row; returns once earlier in-flight batches are done as well"""
+        async with self._lock:
+            rows, waiters = self._rows, self._waiters
+            self._rows, self._waiters = [], []
+            if not rows:
+                return
+            results: Optional[List[Any]] = None
+            try:
+                results = await self._write(rows)
+                for user_id in {row.get("user_id") for row in rows}:
+                    await self.repository.invalidate(user_id)
+                self.flushes += 1
+            except Exception as e:
+                # Row failures come back in ``results``; this is the batch itself failing
+                logger.error(f"Flushing {len(rows)} buffered {self.repository.name}s failed: {e}")
+                if results is None:
+                    results = [e] * len(rows)
+                raise
+            finally:
+                # Readers may skip the flush only once the rows are visible and caches dropped
+                self._unflushed.subtract(row.get("user_id") for row in rows)
+                self._unflushed = +self._unflushed
+                # Every waiter gets an outcome, however the flush ended, so no request hangs
+                if results is None:
+                    results = [RuntimeError(f"Flush of buffered {self.repository.name}s was interrupted")] * len(rows)
+                self._resolve(waiters, results)
+
+    @staticmethod
+    def _resolve(waiters: List[Optional[asyncio.Future]], results: List[Any]) -> None:
+        for waiter, result in zip(waiters, results):
+            if waiter is None or waiter.done():
+                continue
+            if isinstance(result, Exception):
+                waiter.set_exception(result)
+            else:
+                waiter.set_result(result)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        """Insert ``rows`` in one transaction, or one by one if the batch fails.
+
+        Returns the stored instance or the exception of each row, in order.
+        """
+        # Rows of one executemany must bind the same columns
+        columns = set().union(*rows)
+        batch = [dict(dict.fromkeys(columns), **row) for row in rows]
+        try:
+            async with AsyncSession(self._bind, expire_on_commit=False) as session:
+                objs = await self._insert(session, batch)
+                await self.repository.project_inserted(session, objs)
+                await session.commit()
+            self.flushed_rows += len(objs)
+            logger.debug(f"Flushed {len(objs)} buffered {self.repository.name}s in one transaction")
+            return objs
+        except Exception as e:
+            logger.warning(f"Buffered insert of {len(rows)} {self.repository.name}s failed, retrying row by row: {e}")
+
+        # Isolate the failing rows instead of losing the whole batch
+        results: List[Any] = []
+        for row in rows:
+            try:
+                async with AsyncSession(self._bind, expire_on_commit=False) as session:
+                    (obj,) = await self._insert(session, [row])
+                    await self.repository.project_inserted(session, [obj])
+                    await session.commit()
+                self.flushed_rows += 1
+                results.append(obj)
+            except Exception as e:
+                self.failed_rows += 1
+                if not self.durable:
+                    # Nobody is waiting for this row any more
+                    logger.error(f"Dropped buffered {self.repository.name} of user {row.get('user_id')}: {e}")
+                results.append(e)
+        return results
+
+    async def _insert(self, session: AsyncSession, rows: List[Dict[str, Any]]) -> List[Any]:
+        model = self.repository.model
+        if session.bind.dialect.insert_executemany_returning:
+            result = await session.scalars(insert(model).returning(model, sort_by_parameter_order=True), rows)
+            return list(result.all())
+        objs = [model(**row) for row in rows]
+        session.add_all(objs)
+        await session.flush()
+        return objs
+
+    async def close(self) -> None:
+        """Stop the flush timer and write everything still queued"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "durable": self.durable,
+            "queued": len(self._rows),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+        }
+
+
+def write_buffer_for(repository) -> Optional[WriteBuffer]:
+    """The ``WriteBuffer`` configured by ``write_behind_mode`` for ``repository``, if any"""
+    mode = settings.write_behind_mode.lower()
+    if mode == "off":
+        return None
+    if mode not in ("group", "async"):
+        raise ValueError(f"Unknown write_behind_mode '{settings.write_behind_mode}' (expected off, group or async)")
+    if mode == "async" and settings.running_on_lambda:
+        logger.warning("write_behind_mode 'async' is not safe on Lambda; using 'group'")
+        mode = "group"
+    return WriteBuffer(
+        repository,
+        durable=mode == "group",
+        flush_interval=settings.write_behind_flush_interval_ms / 1000,
+        max_rows=settings.write_behind_max_rows,
+    )
+
+
+async def flush_write_buffers() -> None:
+    """Flush every write buffer (called on shutdown)"""
+    for buffer in _buffers:
+        try:
+            await buffer.close()
+        except Exception as e:
+            logger.error(f"Error flushing {buffer.repository.name} write buffer: {e}")
+
+
+def write_buffer_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters of every write buffer by entity"""
+    return {buffer.repository.name: buffer.stats() for buffer in _buffers}
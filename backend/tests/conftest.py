@@ -0,0 +1,123 @@
+"""
+Shared fixtures: a throwaway SQLite database per test, and the entity routers mounted on
+a bare FastAPI app whose database and auth dependencies point at it.
+
+Tests that need a real Postgres use ``postgres_url``: TEST_POSTGRES_URL if set, otherwise a
+throwaway cluster started when ``initdb`` and ``pg_ctl`` are on PATH (as a non-root user);
+without either they are skipped. ``pooler_url`` puts a transaction-mode pooler in front of
+it (see tests/postgres.py), or is TEST_PGBOUNCER_URL, a real PgBouncer, if set.
+
+Run from backend/: ``python -m pytest tests``
+"""
+
+import os
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.database import Base
+from dependencies.auth import get_current_user
+from dependencies.database import get_all_read_db, get_db, get_read_db
+from routers import chat_history, chat_sessions, protocol_recommendations, subscriptions, user_profiles
+from schemas.auth import UserResponse
+from services.crud import CrudService
+from tests.postgres import TransactionPooler, start_postgres
+
+USER_ID = "u1"
+
+ROUTERS = (chat_history, chat_sessions, protocol_recommendations, subscriptions, user_profiles)
+
+
+def _services():
+    pending, found = list(CrudService.__subclasses__()), []
+    while pending:
+        service = pending.pop()
+        found.append(service)
+        pending.extend(service.__subclasses__())
+    return found
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # Totals and reads are cached per repository across requests, i.e. across tests
+    for service in _services():
+        await service.repository.invalidate(None)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db(engine):
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements the engine executes, in order"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest_asyncio.fixture
+async def client(engine):
+    app = FastAPI()
+    for module in ROUTERS:
+        app.include_router(module.router)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def session():
+        async with session_maker() as db:
+            yield db
+
+    for dependency in (get_db, get_read_db, get_all_read_db):
+        app.dependency_overrides[dependency] = session
+    app.dependency_overrides[get_current_user] = lambda: UserResponse(id=USER_ID, email="user@example.com")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+    try:
+        url, stop = start_postgres(tmp_path_factory.mktemp("postgres"))
+    except RuntimeError as e:
+        pytest.skip(f"No Postgres server: {e}")
+    yield url
+    stop()
+
+
+@pytest.fixture(scope="session")
+def transaction_pooler(postgres_url):
+    """The pooler stand-in in front of ``postgres_url``, taking server connections in turn"""
+    url = make_url(postgres_url)
+    pooler = TransactionPooler(url.host, url.port, url.username, url.database, round_robin=True).start()
+    yield pooler
+    pooler.stop()
+
+
+@pytest.fixture(scope="session")
+def pooler_url(request):
+    url = os.environ.get("TEST_PGBOUNCER_URL")
+    if url:
+        return url
+    return request.getfixturevalue("transaction_pooler").url()
@@ -0,0 +1,250 @@
+"""
+A throwaway Postgres server and a transaction-mode pooler in front of it, for the tests that
+need a real server (see the ``postgres_url`` and ``pooler_url`` fixtures in conftest.py).
+
+``start_postgres`` runs ``initdb`` and ``pg_ctl`` from PATH (which refuse to run as root).
+``TransactionPooler`` stands in for PgBouncer with ``pool_mode = transaction``: clients are
+authenticated by the pooler itself, and each transaction (or statement outside one) runs on
+whichever server connection is free, handed back as soon as the server reports the session
+idle. It speaks just enough of the wire protocol for asyncpg and supports only ``trust``
+authentication towards the server.
+"""
+
+import asyncio
+import shutil
+import socket
+import struct
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+SSL_REQUEST = 80877103
+GSSENC_REQUEST = 80877104
+CANCEL_REQUEST = 80877102
+PROTOCOL_VERSION = 196608
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_postgres(directory: Path) -> Tuple[str, Callable[[], None]]:
+    """Initialize and start a cluster in ``directory``; returns its URL and a stop function
+
+    Raises:
+        RuntimeError: If the binaries are missing or the server does not start.
+    """
+    initdb, pg_ctl = shutil.which("initdb"), shutil.which("pg_ctl")
+    if not (initdb and pg_ctl):
+        raise RuntimeError("initdb and pg_ctl are not on PATH")
+    data = directory / "data"
+    port = free_port()
+    steps = [
+        [initdb, "-D", str(data), "-A", "trust", "-U", "postgres", "--no-sync"],
+        [
+            pg_ctl, "-D", str(data), "-l", str(directory / "postgres.log"), "-w", "start",
+            "-o", f"-p {port} -k {directory} -c listen_addresses=127.0.0.1 -c fsync=off",
+        ],
+    ]
+    for step in steps:
+        result = subprocess.run(step, capture_output=True, text=True)
+        if result.returncode:
+            raise RuntimeError(f"{Path(step[0]).name} failed: {(result.stderr or result.stdout).strip()}")
+
+    def stop():
+        subprocess.run([pg_ctl, "-D", str(data), "-m", "immediate", "stop"], capture_output=True)
+
+    return f"postgresql://postgres@127.0.0.1:{port}/postgres", stop
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Tuple[bytes, bytes]:
+    """One typed protocol message: its type byte and the whole message (type and length included)"""
+    header = await reader.readexactly(5)
+    (length,) = struct.unpack("!I", header[1:])
+    return header[:1], header + await reader.readexactly(length - 4)
+
+
+def _message(kind: bytes, body: bytes = b"") -> bytes:
+    return kind + struct.pack("!I", len(body) + 4) + body
+
+
+class _ServerConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+
+class TransactionPooler:
+    """Transaction-mode pooler on 127.0.0.1 relaying to the server at ``host:port`` (see the module docstring)
+
+    Server connections are reused most-recently-released first, like PgBouncer; with
+    ``round_robin`` (PgBouncer's ``server_round_robin``) they are taken in turn instead, so
+    consecutive transactions of one client land on different server connections.
+    """
+
+    def __init__(self, host: str, port: int, user: str, database: str, pool_size: int = 2, round_robin: bool = False):
+        self.server_address = (host, port)
+        self.user = user
+        self.database = database
+        self.pool_size = pool_size
+        self.round_robin = round_robin
+        self.port = free_port()
+        self.transactions = 0  # Server connection assignments, for tests to check the pooler was used
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._clients: set = set()
+
+    def start(self) -> "TransactionPooler":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._listen(), self._loop).result(timeout=10)
+        return self
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+
+    def url(self) -> str:
+        return f"postgresql://{self.user}@127.0.0.1:{self.port}/{self.database}"
+
+    def drop_clients(self) -> None:
+        """Close every client connection, as a pooler does when its idle clients time out"""
+
+        def drop():
+            for writer in list(self._clients):
+                writer.close()
+
+        self._loop.call_soon_threadsafe(drop)
+
+    async def _listen(self) -> None:
+        self._idle: deque = deque()
+        self._opened = 0
+        self._released = asyncio.Condition()
+        self._parameters: Optional[Dict[str, bytes]] = None
+        self._server = await asyncio.start_server(self._serve_client, "127.0.0.1", self.port)
+
+    async def _close(self) -> None:
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        while self._idle:
+            self._idle.pop().writer.close()
+
+    async def _connect_server(self) -> _ServerConnection:
+        reader, writer = await asyncio.open_connection(*self.server_address)
+        params = b"".join(key + b"\0" + value.encode() + b"\0" for key, value in ((b"user", self.user), (b"database", self.database)))
+        body = struct.pack("!I", PROTOCOL_VERSION) + params + b"\0"
+        writer.write(struct.pack("!I", len(body) + 4) + body)
+        parameters = {}
+        while True:
+            kind, message = await _read_message(reader)
+            if kind == b"R" and struct.unpack("!I", message[5:9])[0] != 0:
+                raise RuntimeError("TransactionPooler only supports trust authentication")
+            if kind == b"E":
+                raise RuntimeError(f"Server refused the connection: {message[5:]!r}")
+            if kind == b"S":
+                name, value = message[5:-1].split(b"\0", 1)
+                parameters[name.decode()] = value
+            if kind == b"Z":
+                break
+        if self._parameters is None:
+            self._parameters = parameters
+        return _ServerConnection(reader, writer)
+
+    async def _acquire(self) -> _ServerConnection:
+        async with self._released:
+            while True:
+                if self._idle:
+                    self.transactions += 1
+                    return self._idle.popleft() if self.round_robin else self._idle.pop()
+                if self._opened < self.pool_size:
+                    self._opened += 1
+                    break
+                await self._released.wait()
+        try:
+            connection = await self._connect_server()
+        except Exception:
+            async with self._released:
+                self._opened -= 1
+                self._released.notify()
+            raise
+        self.transactions += 1
+        return connection
+
+    async def _release(self, connection: _ServerConnection, reusable: bool) -> None:
+        async with self._released:
+            if reusable:
+                self._idle.append(connection)
+            else:
+                connection.writer.close()
+                self._opened -= 1
+            self._released.notify()
+
+    async def _startup(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Answer the client's startup as the server would; False for a cancel request"""
+        while True:
+            (length,) = struct.unpack("!I", await reader.readexactly(4))
+            payload = await reader.readexactly(length - 4)
+            (code,) = struct.unpack("!I", payload[:4])
+            if code in (SSL_REQUEST, GSSENC_REQUEST):
+                writer.write(b"N")
+                continue
+            if code == CANCEL_REQUEST:
+                return False
+            break
+        if self._parameters is None:
+            # The server's parameters (server_version, encodings, ...) are reported to every client
+            await self._release(await self._acquire(), True)
+            self.transactions -= 1
+        writer.write(_message(b"R", struct.pack("!I", 0)))
+        for name, value in self._parameters.items():
+            writer.write(_message(b"S", name.encode() + b"\0" + value + b"\0"))
+        writer.write(_message(b"K", struct.pack("!II", 0, 0)))
+        writer.write(_message(b"Z", b"I"))
+        await writer.drain()
+        return True
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        assigned: Optional[_ServerConnection] = None
+        relay: Optional[asyncio.Task] = None
+        try:
+            if not await self._startup(reader, writer):
+                return
+            while True:
+                kind, message = await _read_message(reader)
+                if kind == b"X":
+                    break
+                if assigned is None or relay.done():
+                    assigned = await self._acquire()
+                    relay = asyncio.ensure_future(self._relay(assigned, writer))
+                assigned.writer.write(message)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+            if relay is not None and not relay.done():
+                # Gone in the middle of a transaction: the server connection's state is unknown
+                relay.cancel()
+                await self._release(assigned, False)
+
+    async def _relay(self, server: _ServerConnection, client: asyncio.StreamWriter) -> None:
+        """Forward server messages to the client until the server is idle, then hand it back"""
+        while True:
+            try:
+                kind, message = await _read_message(server.reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                await self._release(server, False)
+                client.close()
+                return
+            if kind == b"Z" and message[5:6] == b"I":
+                # Released before the client hears of it, so its next message takes a new assignment
+                await self._release(server, True)
+                client.write(message)
+                return
+            client.write(message)
@@ -0,0 +1,152 @@
+"""Which chat_history list filters include archived messages, and writes to archived messages"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.database import db_manager
+from models.chat_history_archive import Chat_history_archive
+from models.chat_sessions import Chat_sessions
+from services.chat_archive import archive_chat_history, archive_horizon, compress_content, reaches_archive
+from tests.conftest import USER_ID
+
+HORIZON = archive_horizon()
+BEFORE = (HORIZON - timedelta(days=1)).isoformat()
+AFTER = (HORIZON + timedelta(days=1)).isoformat()
+
+
+@pytest.mark.parametrize(
+    "query_dict",
+    [
+        {"created_at": BEFORE},
+        {"created_at": {"$eq": BEFORE}},
+        {"created_at": {"$in": [AFTER, BEFORE]}},
+        {"created_at": {"$gte": BEFORE}},
+        {"created_at": {"$gt": BEFORE, "$lt": AFTER}},
+        {"created_at": {"$lt": AFTER}},
+        {"created_at": {"$lte": BEFORE}},
+        # No lower bound: older messages match too
+        {"created_at": {"$ne": AFTER}},
+        {"created_at": {"$ne": AFTER, "$lt": AFTER}},
+        {"created_at": {"$prefix": "20"}},
+    ],
+)
+def test_reaches_archive(query_dict):
+    assert reaches_archive(query_dict)
+
+
+@pytest.mark.parametrize(
+    "query_dict",
+    [
+        None,
+        {},
+        {"session_id": "s1"},
+        {"created_at": AFTER},
+        {"created_at": {"$eq": None}},
+        {"created_at": {"$in": [AFTER]}},
+        {"created_at": {"$gte": AFTER}},
+        {"created_at": {"$gt": AFTER, "$lt": AFTER}},
+        {"created_at": {"$ne": BEFORE, "$gte": AFTER}},
+        {"created_at": {}},
+        {"created_at": "not a timestamp"},
+    ],
+)
+def test_does_not_reach_archive(query_dict):
+    assert not reaches_archive(query_dict)
+
+
+@pytest.mark.asyncio
+async def test_ne_filter_lists_archived_messages(client, db):
+    archived_at = datetime.now(timezone.utc) - timedelta(days=4 * 366)
+    await db.execute(
+        insert(Chat_history_archive).values(
+            id=1, user_id=USER_ID, session_id="s1", role="user", content=compress_content("old"), created_at=archived_at
+        )
+    )
+    await db.commit()
+    response = await client.post(
+        "/api/v1/entities/chat_history",
+        json={"session_id": "s1", "role": "user", "content": "new", "created_at": AFTER},
+    )
+    assert response.status_code == 201
+
+    query = json.dumps({"created_at": {"$ne": "2000-01-01T00:00:00Z"}})
+    response = await client.get("/api/v1/entities/chat_history", params={"query": query, "sort": "created_at"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["content"] for item in body["items"]] == ["old", "new"]
+    assert body["total"] == 2
+
+
+async def archive_messages(client, engine, monkeypatch) -> dict:
+    """Two archived and one live message in s1, one archived in s2; returns their ids by content"""
+    monkeypatch.setattr(db_manager, "engine", engine)
+    ids = {}
+    for session_id, content, created_at in (
+        ("s1", "old", BEFORE),
+        ("s1", "older", (HORIZON - timedelta(days=2)).isoformat()),
+        ("s1", "new", AFTER),
+        ("s2", "other", BEFORE),
+    ):
+        response = await client.post(
+            "/api/v1/entities/chat_history",
+            json={"session_id": session_id, "role": "user", "content": content, "created_at": created_at},
+        )
+        ids[content] = response.json()["id"]
+    assert await archive_chat_history(pause=0) == 3
+    return ids
+
+
+async def session_counts(engine) -> dict:
+    async with AsyncSession(engine) as session:
+        rows = (await session.execute(select(Chat_sessions.session_id, Chat_sessions.message_count))).all()
+    return dict(rows)
+
+
+@pytest.mark.asyncio
+async def test_archived_messages_are_read_only(client, engine, monkeypatch):
+    ids = await archive_messages(client, engine, monkeypatch)
+    path = "/api/v1/entities/chat_history"
+
+    response = await client.put(f"{path}/{ids['old']}", json={"content": "edited"})
+    assert response.status_code == 400 and "read-only" in response.json()["detail"]
+    # The batch is rejected as a whole, live messages included
+    items = [{"id": ids["new"], "updates": {"content": "edited"}}, {"id": ids["old"], "updates": {"content": "edited"}}]
+    assert (await client.put(f"{path}/batch", json={"items": items})).status_code == 400
+    assert (await client.get(f"{path}/{ids['new']}")).json()["content"] == "new"
+    assert (await client.put(f"{path}/999", json={"content": "edited"})).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_deletes_reach_archived_messages(client, engine, monkeypatch):
+    ids = await archive_messages(client, engine, monkeypatch)
+    path = "/api/v1/entities/chat_history"
+    assert await session_counts(engine) == {"s1": 3, "s2": 1}
+
+    assert (await client.delete(f"{path}/{ids['old']}")).status_code == 200
+    assert await session_counts(engine) == {"s1": 2, "s2": 1}
+    assert (await client.delete(f"{path}/{ids['old']}")).status_code == 404
+
+    response = await client.request("DELETE", f"{path}/batch", json={"ids": [ids["older"], ids["new"], ids["other"], 999]})
+    assert response.json()["deleted_count"] == 3
+    assert await session_counts(engine) == {}
+    async with AsyncSession(engine) as session:
+        assert (await session.execute(select(Chat_history_archive))).all() == []
+
+
+@pytest.mark.asyncio
+async def test_deletes_of_archived_messages_require_ownership(client, engine, monkeypatch):
+    monkeypatch.setattr(db_manager, "engine", engine)
+    async with AsyncSession(engine) as session:
+        await session.execute(
+            insert(Chat_history_archive).values(
+                id=1, user_id="u2", session_id="s1", role="user", content=compress_content("x"), created_at=HORIZON
+            )
+        )
+        await session.commit()
+    assert (await client.delete("/api/v1/entities/chat_history/1")).status_code == 404
+    response = await client.request("DELETE", "/api/v1/entities/chat_history/batch", json={"ids": [1]})
+    assert response.json()["deleted_count"] == 0
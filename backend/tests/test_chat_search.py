@@ -0,0 +1,113 @@
+"""Full-text search of chat_history (services/chat_search.py) and its shadow index"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import services.chat_search
+from core.database import db_manager
+from models.chat_history import Chat_history
+from services.chat_history import Chat_historyService
+from services.chat_search import SearchUnavailable, backfill_search_index, search_messages
+from tests.conftest import USER_ID
+
+pytestmark = pytest.mark.asyncio
+
+PATH = "/api/v1/entities/chat_history"
+
+
+def message(content: str, **values) -> dict:
+    return {"session_id": "s1", "role": "user", "content": content, "created_at": "2026-01-01T00:00:00Z", **values}
+
+
+async def found(client, q: str) -> list:
+    response = await client.get(f"{PATH}/search", params={"q": q})
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["items"]]
+
+
+async def indexed(engine) -> dict:
+    async with engine.connect() as conn:
+        return dict((await conn.execute(text("SELECT rowid, content FROM chat_history_fts ORDER BY rowid"))).all())
+
+
+async def test_index_follows_updates_and_deletes(client, engine):
+    sleep = (await client.post(PATH, json=message("trouble sleeping at night"))).json()["id"]
+    focus = (await client.post(PATH, json=message("cannot focus at work"))).json()["id"]
+    assert await found(client, "sleeping") == [sleep]
+    assert sorted(await found(client, "at")) == sorted([sleep, focus])
+
+    assert (await client.put(f"{PATH}/{sleep}", json={"content": "restless evenings"})).status_code == 200
+    assert await found(client, "sleeping") == []
+    assert await found(client, "restless") == [sleep]
+    assert await indexed(engine) == {sleep: "restless evenings", focus: "cannot focus at work"}
+
+    response = await client.put(f"{PATH}/batch", json={"items": [{"id": focus, "updates": {"content": "calm"}}]})
+    assert response.status_code == 200
+    assert await found(client, "focus") == [] and await found(client, "calm") == [focus]
+
+    assert (await client.delete(f"{PATH}/{sleep}")).status_code == 200
+    assert await found(client, "restless") == []
+    other = (await client.post(PATH, json=message("calm again"))).json()["id"]
+    assert (await client.request("DELETE", f"{PATH}/batch", json={"ids": [focus]})).status_code == 200
+    assert await found(client, "calm") == [other]
+    assert await indexed(engine) == {other: "calm again"}
+
+
+async def test_search_is_scoped_to_the_user(client, engine):
+    async with engine.begin() as conn:
+        await conn.execute(text("INSERT INTO chat_history_fts (rowid, content, user_id) VALUES (99, 'sleeping', 'u2')"))
+    mine = (await client.post(PATH, json=message("sleeping"))).json()["id"]
+    assert await found(client, "sleeping") == [mine]
+
+
+async def test_backfill_resumes_after_an_interruption(engine, monkeypatch):
+    monkeypatch.setattr(db_manager, "engine", engine)
+    # Stored before the index existed: inserted without going through the projection
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = [dict(message(f"word{i} common"), user_id=USER_ID, created_at=created_at) for i in range(10)]
+    async with engine.begin() as conn:
+        await conn.execute(insert(Chat_history), rows)
+    assert await indexed(engine) == {}
+
+    index, batches = services.chat_search._index, []
+
+    async def failing_index(session, rows):
+        if len(batches) == 2:
+            raise RuntimeError("connection lost")
+        batches.append([row.id for row in rows])
+        await index(session, rows)
+
+    monkeypatch.setattr(services.chat_search, "_index", failing_index)
+    with pytest.raises(RuntimeError):
+        await backfill_search_index(batch_size=3, pause=0)
+    assert list(await indexed(engine)) == [1, 2, 3, 4, 5, 6]
+
+    # The next run starts from the unindexed rows instead of the beginning
+    monkeypatch.setattr(services.chat_search, "_index", index)
+    assert await backfill_search_index(batch_size=3, pause=0) == 4
+    assert list(await indexed(engine)) == list(range(1, 11))
+    assert await backfill_search_index(batch_size=3, pause=0) == 0
+
+    async with AsyncSession(engine) as session:
+        matches = await search_messages(session, "word7", USER_ID)
+    assert [obj_id for obj_id, _rank, _snippet in matches] == [8]
+
+
+async def test_unsupported_dialect_raises_search_unavailable():
+    session = SimpleNamespace(bind=SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+    with pytest.raises(SearchUnavailable) as excinfo:
+        await search_messages(session, "sleep", USER_ID)
+    assert excinfo.value.dialect == "mysql"
+
+
+@pytest.mark.parametrize("error, status", [(SearchUnavailable("mysql"), 501), (NotImplementedError("bug"), 500)])
+async def test_only_search_unavailable_is_501(client, monkeypatch, error, status):
+    async def search(self, *args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(Chat_historyService, "search", search)
+    assert (await client.get(f"{PATH}/search", params={"q": "sleep"})).status_code == status
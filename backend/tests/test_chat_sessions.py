@@ -0,0 +1,136 @@
+"""The chat_sessions projection stays in step with every way chat_history changes"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.database import db_manager
+from models.chat_sessions import Chat_sessions
+from services.chat_archive import archive_chat_history, archive_horizon
+from services.crud import Projection
+
+pytestmark = pytest.mark.asyncio
+
+PATH = "/api/v1/entities/chat_history"
+
+
+async def sessions(engine) -> dict:
+    """session_id -> (message_count, first_message_at, last_message_at, last_message_id, last_snippet)"""
+    async with AsyncSession(engine) as db:
+        rows = (await db.execute(select(Chat_sessions))).scalars().all()
+    return {
+        row.session_id: (
+            row.message_count,
+            row.first_message_at.strftime("%Y-%m-%d"),
+            row.last_message_at.strftime("%Y-%m-%d"),
+            row.last_message_id,
+            row.last_snippet,
+        )
+        for row in rows
+    }
+
+
+async def post(client, session_id: str, content: str, day: int) -> int:
+    response = await client.post(
+        PATH,
+        json={"session_id": session_id, "role": "user", "content": content, "created_at": f"2026-01-{day:02d}T00:00:00Z"},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_projection_is_abstract():
+    with pytest.raises(TypeError):
+        Projection()
+
+
+async def test_create_and_batch_create(client, engine):
+    first = await post(client, "s1", "hello", 2)
+    # Out of timestamp order: older than the first message
+    await post(client, "s1", "earlier", 1)
+    response = await client.post(
+        f"{PATH}/batch",
+        json={
+            "items": [
+                {"session_id": "s1", "role": "assistant", "content": "latest", "created_at": "2026-01-05T00:00:00Z"},
+                {"session_id": "s2", "role": "user", "content": "other", "created_at": "2026-01-03T00:00:00Z"},
+            ]
+        },
+    )
+    assert response.status_code == 201
+    latest, other = (item["id"] for item in response.json())
+
+    assert first < latest
+    assert await sessions(engine) == {
+        "s1": (3, "2026-01-01", "2026-01-05", latest, "latest"),
+        "s2": (1, "2026-01-03", "2026-01-03", other, "other"),
+    }
+
+
+async def test_update(client, engine):
+    older = await post(client, "s1", "older", 1)
+    newer = await post(client, "s1", "newer", 2)
+
+    assert (await client.put(f"{PATH}/{newer}", json={"content": "edited"})).status_code == 200
+    assert await sessions(engine) == {"s1": (2, "2026-01-01", "2026-01-02", newer, "edited")}
+
+    # Moving a message in time changes which one is the last
+    assert (await client.put(f"{PATH}/{older}", json={"created_at": "2026-01-09T00:00:00Z"})).status_code == 200
+    assert await sessions(engine) == {"s1": (2, "2026-01-02", "2026-01-09", older, "older")}
+
+    # Moving it to another session updates both
+    assert (await client.put(f"{PATH}/{older}", json={"session_id": "s2"})).status_code == 200
+    assert await sessions(engine) == {
+        "s1": (1, "2026-01-02", "2026-01-02", newer, "edited"),
+        "s2": (1, "2026-01-09", "2026-01-09", older, "older"),
+    }
+
+    response = await client.put(f"{PATH}/batch", json={"items": [{"id": newer, "updates": {"content": "batch"}}]})
+    assert response.status_code == 200
+    assert (await sessions(engine))["s1"][4] == "batch"
+
+
+async def test_delete_and_batch_delete(client, engine):
+    first = await post(client, "s1", "first", 1)
+    last = await post(client, "s1", "last", 2)
+    other = [await post(client, "s2", f"other {i}", i) for i in (1, 2)]
+
+    assert (await client.delete(f"{PATH}/{last}")).status_code == 200
+    assert await sessions(engine) == {
+        "s1": (1, "2026-01-01", "2026-01-01", first, "first"),
+        "s2": (2, "2026-01-01", "2026-01-02", other[1], "other 2"),
+    }
+
+    response = await client.request("DELETE", f"{PATH}/batch", json={"ids": [first, *other]})
+    assert response.status_code == 200
+    # Sessions without messages are gone
+    assert await sessions(engine) == {}
+
+
+async def test_archival_keeps_counts(client, engine, monkeypatch):
+    monkeypatch.setattr(db_manager, "engine", engine)
+    old = (archive_horizon() - timedelta(days=40)).replace(tzinfo=timezone.utc)
+    recent = datetime.now(timezone.utc)
+    ids = []
+    for content, created_at in (("old", old), ("older still", old - timedelta(days=1)), ("recent", recent)):
+        response = await client.post(
+            PATH, json={"session_id": "s1", "role": "user", "content": content, "created_at": created_at.isoformat()}
+        )
+        ids.append(response.json()["id"])
+    response = await client.post(
+        PATH, json={"session_id": "s2", "role": "user", "content": "archived last", "created_at": old.isoformat()}
+    )
+    archived_last = response.json()["id"]
+    before = await sessions(engine)
+
+    assert await archive_chat_history(pause=0) == 3
+    assert await sessions(engine) == before
+    assert before["s1"][0] == 3 and before["s1"][4] == "recent"
+    assert before["s2"] == (1, old.strftime("%Y-%m-%d"), old.strftime("%Y-%m-%d"), archived_last, "archived last")
+
+    # A later recompute of a session reads the archived messages back
+    assert (await client.put(f"{PATH}/{ids[2]}", json={"content": "recent, edited"})).status_code == 200
+    assert (await sessions(engine))["s1"][:4] == before["s1"][:4]
+    assert (await sessions(engine))["s1"][4] == "recent, edited"
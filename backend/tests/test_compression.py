@@ -0,0 +1,235 @@
+"""Response compression (middlewares/compression.py) and precompressed static files (lambda_handler.py)"""
+
+import asyncio
+import base64
+import gzip
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+import lambda_handler
+import middlewares.compression
+from middlewares.compression import CompressionMiddleware, choose_encoding
+
+brotli = pytest.importorskip("brotli")
+
+BODY = b'{"items": [' + b", ".join(b'{"id": %d, "content": "hello"}' % i for i in range(100)) + b"]}"
+
+
+async def lines(count: int):
+    for i in range(count):
+        yield b'{"id": %d}\n' % i
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/json")
+    async def json_body(size: int = len(BODY)):
+        return Response(BODY[:size], media_type="application/json")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(BODY), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/png")
+    async def png():
+        return Response(BODY, media_type="image/png")
+
+    @app.get("/ndjson")
+    async def ndjson():
+        return StreamingResponse(lines(200), media_type="application/x-ndjson")
+
+    @app.get("/text-stream")
+    async def text_stream():
+        return StreamingResponse(lines(200), media_type="text/plain")
+
+    @app.get("/no-transform")
+    async def no_transform():
+        return PlainTextResponse(BODY.decode(), headers={"Cache-Control": "no-transform"})
+
+    return app
+
+
+@pytest.fixture
+def compressed_client():
+    app = CompressionMiddleware(make_app(), minimum_size=500)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def raw_get(client, path: str, accept_encoding: str):
+    """Status, headers and the body as sent, before httpx decodes it"""
+    async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response.status_code, response.headers, b"".join([chunk async for chunk in response.aiter_raw()])
+
+
+def test_choose_encoding():
+    available = ("br", "gzip")
+    assert choose_encoding("gzip, deflate, br", available) == "br"
+    assert choose_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert choose_encoding("br;q=0, gzip;q=0", available) is None
+    assert choose_encoding("identity", available) is None
+    assert choose_encoding("*", available) == "br"
+    assert choose_encoding("*;q=0.1, gzip;q=0.5", available) == "gzip"
+    assert choose_encoding("", available) is None
+    assert choose_encoding("br", ("gzip",)) is None
+
+
+@pytest.mark.asyncio
+async def test_negotiates_brotli_gzip_and_identity(compressed_client):
+    status, headers, body = await raw_get(compressed_client, "/json", "gzip, br")
+    assert status == 200 and headers["Content-Encoding"] == "br" and headers["Vary"] == "Accept-Encoding"
+    assert brotli.decompress(body) == BODY and int(headers["Content-Length"]) == len(body) < len(BODY)
+
+    status, headers, body = await raw_get(compressed_client, "/json", "br;q=0.5, gzip")
+    assert headers["Content-Encoding"] == "gzip" and headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == BODY and int(headers["Content-Length"]) == len(body)
+
+    status, headers, body = await raw_get(compressed_client, "/json", "identity")
+    assert "Content-Encoding" not in headers and body == BODY
+
+
+@pytest.mark.asyncio
+async def test_gzip_only_without_brotli(monkeypatch):
+    monkeypatch.setattr(middlewares.compression, "brotli", None)
+    app = CompressionMiddleware(make_app(), minimum_size=500)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        _status, headers, body = await raw_get(client, "/json", "br, gzip")
+        assert headers["Content-Encoding"] == "gzip" and gzip.decompress(body) == BODY
+        _status, headers, body = await raw_get(client, "/json", "br")
+        assert "Content-Encoding" not in headers and body == BODY
+
+
+@pytest.mark.asyncio
+async def test_small_bodies_are_not_compressed(compressed_client):
+    _status, headers, body = await raw_get(compressed_client, "/json?size=499", "gzip")
+    assert "Content-Encoding" not in headers and "Vary" not in headers and body == BODY[:499]
+    _status, headers, body = await raw_get(compressed_client, "/json?size=500", "gzip")
+    assert headers["Content-Encoding"] == "gzip" and gzip.decompress(body) == BODY[:500]
+
+
+@pytest.mark.asyncio
+async def test_vary_is_added_to_existing_values():
+    app = FastAPI()
+
+    @app.get("/")
+    async def varied():
+        return Response(BODY, media_type="application/json", headers={"Vary": "Origin"})
+
+    transport = httpx.ASGITransport(app=CompressionMiddleware(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        _status, headers, _body = await raw_get(client, "/", "gzip")
+    assert headers["Vary"] == "Origin, Accept-Encoding"
+
+
+@pytest.mark.asyncio
+async def test_encoded_and_incompressible_responses_pass_through(compressed_client):
+    _status, headers, body = await raw_get(compressed_client, "/encoded", "br")
+    assert headers["Content-Encoding"] == "gzip" and gzip.decompress(body) == BODY
+
+    for path in ("/png", "/no-transform"):
+        _status, headers, body = await raw_get(compressed_client, path, "br, gzip")
+        assert "Content-Encoding" not in headers and body == BODY
+
+
+@pytest.mark.asyncio
+async def test_ndjson_streams_are_not_compressed(compressed_client):
+    _status, headers, body = await raw_get(compressed_client, "/ndjson", "br, gzip")
+    assert "Content-Encoding" not in headers
+    assert body == b"".join(b'{"id": %d}\n' % i for i in range(200))
+
+
+@pytest.mark.asyncio
+async def test_other_streams_are_flushed_chunk_by_chunk():
+    sent = []
+    requested = asyncio.Event()
+
+    async def receive():
+        if not requested.is_set():
+            requested.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # No disconnect
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/text-stream",
+        "raw_path": b"/text-stream",
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "server": ("test", 80),
+        "client": ("test", 1),
+        "http_version": "1.1",
+    }
+    await CompressionMiddleware(make_app())(scope, receive, send)
+
+    start, *chunks = sent
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+    # Every chunk decodes to its line on arrival, before the stream ends
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body_chunks = [chunk for chunk in chunks if chunk.get("more_body")]
+    assert [decoder.decompress(chunk["body"]) for chunk in body_chunks[:3]] == [
+        b'{"id": 0}\n',
+        b'{"id": 1}\n',
+        b'{"id": 2}\n',
+    ]
+    assert not chunks[-1].get("more_body")
+    decoded = b"".join(decoder.decompress(chunk["body"]) for chunk in body_chunks[3:] + chunks[-1:])
+    assert decoded == b"".join(b'{"id": %d}\n' % i for i in range(3, 200))
+
+
+@pytest.fixture
+def dist(tmp_path, monkeypatch):
+    monkeypatch.setattr(lambda_handler, "FRONTEND_DIST", str(tmp_path))
+    (tmp_path / "assets").mkdir()
+    return tmp_path / "assets"
+
+
+def test_static_file_prefers_the_accepted_precompressed_sibling(dist):
+    script = b"console.log('hello');\n" * 50
+    (dist / "app.js").write_bytes(script)
+    (dist / "app.js.br").write_bytes(brotli.compress(script))
+    (dist / "app.js.gz").write_bytes(gzip.compress(script))
+
+    response = lambda_handler.serve_static_file("/assets/app.js", {"accept-encoding": "gzip, deflate, br"})
+    assert response["statusCode"] == 200 and response["isBase64Encoded"]
+    assert response["headers"]["Content-Encoding"] == "br" and response["headers"]["Vary"] == "Accept-Encoding"
+    assert response["headers"]["Content-Type"] == "application/javascript"
+    assert brotli.decompress(base64.b64decode(response["body"])) == script
+
+    response = lambda_handler.serve_static_file("/assets/app.js", {"Accept-Encoding": "gzip"})
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert gzip.decompress(base64.b64decode(response["body"])) == script
+
+    response = lambda_handler.serve_static_file("/assets/app.js", {"accept-encoding": "br;q=0, gzip;q=0"})
+    assert "Content-Encoding" not in response["headers"] and response["headers"]["Vary"] == "Accept-Encoding"
+    assert base64.b64decode(response["body"]) == script
+
+    response = lambda_handler.serve_static_file("/assets/app.js")
+    assert "Content-Encoding" not in response["headers"]
+
+
+def test_static_file_without_siblings(dist):
+    (dist / "logo.png").write_bytes(b"\x89PNG")
+    (dist / "only-gzip.css").write_text("body {}")
+    (dist / "only-gzip.css.gz").write_bytes(gzip.compress(b"body {}"))
+
+    response = lambda_handler.serve_static_file("/assets/logo.png", {"accept-encoding": "br, gzip"})
+    assert "Content-Encoding" not in response["headers"] and "Vary" not in response["headers"]
+    assert base64.b64decode(response["body"]) == b"\x89PNG"
+
+    response = lambda_handler.serve_static_file("/assets/only-gzip.css", {"accept-encoding": "br"})
+    assert "Content-Encoding" not in response["headers"] and response["body"] == "body {}"
+    response = lambda_handler.serve_static_file("/assets/only-gzip.css", {"accept-encoding": "br, gzip"})
+    assert response["headers"]["Content-Encoding"] == "gzip"
+
+    assert lambda_handler.serve_static_file("/assets/missing.js", {})["statusCode"] == 404
@@ -0,0 +1,38 @@
+"""CrudService writes leave the caller's data and the session as they found them"""
+
+import pytest
+
+from services.user_profiles import User_profilesService
+
+pytestmark = pytest.mark.asyncio
+
+PROFILE = {"primary_goal": "sleep", "age_verified": True, "created_at": "2026-01-01T00:00:00Z"}
+
+
+async def test_create_does_not_change_the_input(db):
+    service = User_profilesService(db)
+    data = dict(PROFILE)
+    obj = await service.create(data, user_id="u1")
+    assert obj.user_id == "u1"
+    assert data == PROFILE
+
+    items = [dict(PROFILE), dict(PROFILE, primary_goal="focus")]
+    objs = await service.create_many(items, user_id="u2")
+    assert [obj.user_id for obj in objs] == ["u2", "u2"]
+    assert items == [PROFILE, dict(PROFILE, primary_goal="focus")]
+
+
+async def test_missing_rows_end_the_transaction(db):
+    service = User_profilesService(db)
+    obj_id = (await service.create(dict(PROFILE), user_id="u1")).id  # A rollback expires the instance
+
+    assert await service.update(obj_id + 1, {"primary_goal": "focus"}, user_id="u1") is None
+    assert not db.in_transaction()
+    # Another user's row is not found either
+    assert await service.update(obj_id, {"primary_goal": "focus"}, user_id="u2") is None
+    assert not db.in_transaction()
+    assert await service.delete(obj_id, user_id="u2") is False
+    assert not db.in_transaction()
+
+    updated = await service.update(obj_id, {"primary_goal": "focus"}, user_id="u1")
+    assert updated.primary_goal == "focus"
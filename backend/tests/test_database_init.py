@@ -0,0 +1,89 @@
+"""Lazy initialization of DatabaseManager under a burst of first requests"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+import core.database
+from core.config import settings
+from core.database import Base, DatabaseManager, get_db
+
+pytestmark = pytest.mark.asyncio
+
+CALLERS = 300
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """A fresh db_manager on an empty SQLite database, counting engines and create_all runs"""
+    monkeypatch.setitem(settings.__dict__, "database_url", f"sqlite:///{tmp_path / 'init.db'}")
+    manager = DatabaseManager()
+    monkeypatch.setattr(core.database, "db_manager", manager)
+    manager.calls = {"engines": 0, "create_all": 0}
+
+    create_engine = core.database.create_async_engine
+
+    def counting_create_engine(*args, **kwargs):
+        manager.calls["engines"] += 1
+        return create_engine(*args, **kwargs)
+
+    create_all = Base.metadata.create_all
+
+    def counting_create_all(*args, **kwargs):
+        manager.calls["create_all"] += 1
+        return create_all(*args, **kwargs)
+
+    monkeypatch.setattr(core.database, "create_async_engine", counting_create_engine)
+    monkeypatch.setattr(Base.metadata, "create_all", counting_create_all)
+    return manager
+
+
+async def first_request():
+    async for session in get_db():
+        return await session.scalar(text("SELECT count(*) FROM chat_history"))
+
+
+async def test_concurrent_first_requests_initialize_once(manager):
+    results = await asyncio.gather(*(first_request() for _ in range(CALLERS)))
+    try:
+        assert results == [0] * CALLERS
+        assert manager.calls == {"engines": 1, "create_all": 1}
+        assert manager.ready and manager._init_task.done()
+    finally:
+        await manager.close_db()
+
+
+async def test_cancelled_caller_does_not_cancel_initialization(manager):
+    first = asyncio.ensure_future(first_request())
+    await asyncio.sleep(0)
+    first.cancel()
+    try:
+        assert await asyncio.gather(*(first_request() for _ in range(10))) == [0] * 10
+        assert manager.calls == {"engines": 1, "create_all": 1}
+    finally:
+        await manager.close_db()
+
+
+async def test_failed_initialization_is_retried(manager, monkeypatch):
+    create_all = Base.metadata.create_all
+    failures = []
+
+    def failing_once(*args, **kwargs):
+        if not failures:
+            failures.append(True)
+            raise RuntimeError("database unavailable")
+        return create_all(*args, **kwargs)
+
+    monkeypatch.setattr(Base.metadata, "create_all", failing_once)
+    try:
+        results = await asyncio.gather(*(first_request() for _ in range(50)), return_exceptions=True)
+        # Everyone waiting on the failed attempt sees it fail...
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert not manager.ready and manager._init_task is None
+
+        # ...and the next burst starts a new one, on the same engine
+        assert await asyncio.gather(*(first_request() for _ in range(50))) == [0] * 50
+        assert manager.ready and manager.calls["engines"] == 1
+    finally:
+        await manager.close_db()
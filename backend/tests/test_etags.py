@@ -0,0 +1,84 @@
+"""Conditional GETs of versioned entities (utils/etag.py)"""
+
+import pytest
+
+import utils.etag
+from utils.etag import new_row_version
+
+pytestmark = pytest.mark.asyncio
+
+PATH = "/api/v1/entities/user_profiles"
+PROFILE = {"primary_goal": "sleep", "age_verified": True, "created_at": "2026-01-01T00:00:00Z"}
+
+
+def test_row_versions_keep_increasing_when_the_clock_steps_back(monkeypatch):
+    now = [utils.etag.ROW_VERSION_EPOCH_MS * 1_000_000 + 10**12]
+    monkeypatch.setattr(utils.etag.time, "time_ns", lambda: now[0])
+    monkeypatch.setattr(utils.etag, "_last_row_version", 0)  # Rows written by earlier tests
+    first = new_row_version()
+    assert new_row_version() == first + 1  # Same millisecond
+    now[0] -= 10**9
+    assert new_row_version() == first + 2
+    now[0] += 10**10
+    assert new_row_version() == first + 9000
+
+
+async def conditional_get(client, path: str, etag: str):
+    return await client.get(path, headers={"If-None-Match": etag})
+
+
+async def test_record_etag(client):
+    obj_id = (await client.post(PATH, json=PROFILE)).json()["id"]
+    response = await client.get(f"{PATH}/{obj_id}")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    response = await conditional_get(client, f"{PATH}/{obj_id}", etag)
+    assert response.status_code == 304 and response.headers["ETag"] == etag and not response.content
+
+    assert (await client.put(f"{PATH}/{obj_id}", json={"primary_goal": "focus"})).status_code == 200
+    response = await conditional_get(client, f"{PATH}/{obj_id}", etag)
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+
+async def test_list_etag_changes_with_every_write(client):
+    ids = [(await client.post(PATH, json=PROFILE)).json()["id"] for _ in range(3)]
+    seen = []
+
+    async def list_etag():
+        response = await client.get(PATH)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert (await conditional_get(client, PATH, etag)).status_code == 304
+        assert etag not in seen
+        seen.append(etag)
+
+    await list_etag()
+    # An update changes neither count nor max(id), only sum(row_version)
+    await client.put(f"{PATH}/{ids[0]}", json={"primary_goal": "focus"})
+    await list_etag()
+    await client.put(f"{PATH}/batch", json={"items": [{"id": ids[1], "updates": {"primary_goal": "calm"}}]})
+    await list_etag()
+    await client.post(PATH, json=PROFILE)
+    await list_etag()
+    await client.delete(f"{PATH}/{ids[2]}")
+    await list_etag()
+    # The ETag names the page too
+    response = await client.get(PATH, params={"limit": 1}, headers={"If-None-Match": seen[-1]})
+    assert response.status_code == 200
+
+
+async def test_list_etag_follows_a_row_moving_between_filters(client):
+    """One row leaving a filter while another enters keeps count and max(id) the same"""
+    first, second, third = [
+        (await client.post(PATH, json=dict(PROFILE, primary_goal=goal))).json()["id"]
+        for goal in ("sleep", "focus", "sleep")
+    ]
+    path = f'{PATH}?query={{"primary_goal": "sleep"}}'
+    etag = (await client.get(path)).headers["ETag"]
+
+    await client.put(f"{PATH}/{first}", json={"primary_goal": "focus"})
+    await client.put(f"{PATH}/{second}", json={"primary_goal": "sleep"})
+    response = await conditional_get(client, path, etag)
+    assert response.status_code == 200
+    assert sorted(item["id"] for item in response.json()["items"]) == [second, third]
@@ -0,0 +1,60 @@
+"""Query-plan regressions: per-user list queries are served by the (user_id, ...) indexes"""
+
+import re
+
+import pytest
+from sqlalchemy import text
+
+from services.chat_history import Chat_historyService
+from services.protocol_recommendations import Protocol_recommendationsService
+from services.subscriptions import SubscriptionsService
+from services.user_profiles import User_profilesService
+from tests.conftest import USER_ID
+from utils.pagination import encode_cursor
+
+pytestmark = pytest.mark.asyncio
+
+ENTITY_SERVICES = [Chat_historyService, User_profilesService, Protocol_recommendationsService, SubscriptionsService]
+
+
+async def query_plan(db, query) -> str:
+    sql = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    rows = (await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize("service", ENTITY_SERVICES, ids=lambda service: service.repository.name)
+@pytest.mark.parametrize(
+    "sort, index", [("-id", "user_id_id"), ("id", "user_id_id"), ("-created_at", "user_id_created_at")]
+)
+async def test_list_page_is_an_index_range(db, service, sort, index):
+    query, *_ = service(db)._list_query(USER_ID, None, sort, None)
+    plan = await query_plan(db, query.limit(20))
+    assert f"SEARCH {service.repository.name} USING INDEX ix_{service.repository.name}_{index}" in plan, plan
+    # The index order serves ORDER BY (id tie-break included); no sort of the user's rows
+    assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.parametrize("service", ENTITY_SERVICES, ids=lambda service: service.repository.name)
+async def test_keyset_page_seeks_in_the_index(db, service):
+    query, *_ = service(db)._list_query(USER_ID, None, "-id", encode_cursor("-id", 500, 500))
+    plan = await query_plan(db, query.limit(20))
+    name = service.repository.name
+    # The seek on id is part of the index search (SQLite versions name it id or rowid)
+    assert re.search(rf"SEARCH {name} USING INDEX ix_{name}_user_id_id \(user_id=\? AND (row)?id<\?\)", plan), plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.parametrize("service", ENTITY_SERVICES, ids=lambda service: service.repository.name)
+async def test_total_counts_from_an_index(db, service):
+    _, count_query, *_ = service(db)._list_query(USER_ID, None, None, None)
+    plan = await query_plan(db, count_query)
+    name = service.repository.name
+    assert f"SEARCH {name} USING COVERING INDEX ix_{name}_user_id" in plan, plan
+
+
+async def test_chat_session_messages_use_the_session_index(db):
+    query, *_ = Chat_historyService(db)._list_query(USER_ID, {"session_id": "s1"}, "-id", None)
+    plan = await query_plan(db, query.limit(50))
+    assert "USING INDEX ix_chat_history_user_id_session_id_id (user_id=? AND session_id=?)" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
@@ -0,0 +1,222 @@
+"""
+Lambda connection modes: the persistent pool kept across warm invocations, its idle-ping
+liveness check, and the asyncpg options for a transaction-mode pooler.
+
+The tests against a real server use the ``postgres_url`` and ``pooler_url`` fixtures (see
+conftest.py): a throwaway cluster, started when the Postgres binaries are on PATH, behind the
+transaction-mode pooler stand-in of tests/postgres.py. To run them against a real PgBouncer
+in transaction mode instead (``pool_mode = transaction`` in pgbouncer.ini):
+
+    TEST_POSTGRES_URL=postgresql://user@127.0.0.1:5432/db \
+    TEST_PGBOUNCER_URL=postgresql://user@127.0.0.1:6432/db python -m pytest tests/test_lambda_pool.py
+"""
+
+import asyncio
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import NullPool
+
+from core.config import settings
+from core.database import DatabaseManager, InstrumentedQueuePool
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def lambda_settings(tmp_path, monkeypatch):
+    monkeypatch.setitem(settings.__dict__, "database_url", f"sqlite:///{tmp_path / 'lambda.db'}")
+    monkeypatch.setattr(settings, "is_lambda", True)
+    monkeypatch.setattr(settings, "lambda_pool_mode", "persistent")
+    monkeypatch.setattr(settings, "database_replica_urls", "")
+    # Short enough for a test to sleep past it (the environment being frozen)
+    monkeypatch.setattr(settings, "lambda_pool_idle_ping_seconds", 0.2)
+    return settings
+
+
+@pytest_asyncio.fixture
+async def manager(lambda_settings):
+    manager = DatabaseManager()
+    await manager.init_db()
+    manager.connects = []
+    event.listen(manager.engine.sync_engine, "connect", lambda *args: manager.connects.append(args[0]))
+    yield manager
+    await manager.close_db()
+
+
+async def invoke(manager):
+    """One warm invocation's worth of work"""
+    async with manager.async_session_maker() as session:
+        return await session.scalar(text("SELECT 1"))
+
+
+async def test_null_mode_uses_null_pool(lambda_settings, monkeypatch):
+    monkeypatch.setattr(settings, "lambda_pool_mode", "null")
+    assert DatabaseManager()._engine_kwargs(settings.database_url)["poolclass"] is NullPool
+
+
+async def test_persistent_mode_reuses_the_connection(manager):
+    pool = manager.engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    assert pool.size() == settings.lambda_pool_size
+
+    for _ in range(5):
+        assert await invoke(manager) == 1
+    assert len(manager.connects) == 1
+
+
+async def test_idle_connection_is_pinged(manager, monkeypatch):
+    dialect = manager.engine.dialect
+    pings = []
+    do_ping = dialect.do_ping
+    monkeypatch.setattr(dialect, "do_ping", lambda dbapi_connection: pings.append(1) or do_ping(dbapi_connection))
+
+    await invoke(manager)
+    await invoke(manager)
+    assert pings == []  # Back to back: no round trip
+
+    await asyncio.sleep(0.3)  # Frozen past the threshold
+    await invoke(manager)
+    assert len(pings) == 1 and len(manager.connects) == 1
+
+
+async def test_dead_connection_is_replaced_after_thaw(manager, monkeypatch):
+    await invoke(manager)
+    dead = manager.connects[0]
+
+    def ping(dbapi_connection):
+        if dbapi_connection is dead:
+            raise ConnectionResetError("server closed the connection unexpectedly")
+        return True
+
+    monkeypatch.setattr(manager.engine.dialect, "do_ping", ping)
+    await asyncio.sleep(0.3)
+    # The failed ping costs a reconnect within the same checkout, not an error
+    assert await invoke(manager) == 1
+    assert len(manager.connects) == 2 and manager.connects[1] is not dead
+
+
+async def test_adopt_running_loop_replaces_the_pool(manager):
+    await invoke(manager)
+    pool = manager.engine.sync_engine.pool
+
+    manager.adopt_running_loop()
+    assert manager.engine.sync_engine.pool is pool  # Same loop: kept
+
+    manager._engine_loop = object()  # As if the pool had been filled on another loop
+    manager.adopt_running_loop()
+    assert manager.engine.sync_engine.pool is not pool
+    assert manager._engine_loop is asyncio.get_running_loop()
+    await invoke(manager)
+    assert len(manager.connects) == 2
+
+
+async def test_transaction_pooler_disables_prepared_statement_caches(lambda_settings, monkeypatch):
+    monkeypatch.setattr(settings, "database_transaction_pooler", True)
+    manager = DatabaseManager()
+
+    connect_args = manager._engine_kwargs("postgresql+asyncpg://u:p@localhost/db")["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    name = connect_args["prepared_statement_name_func"]
+    assert len({name() for _ in range(100)}) == 100
+
+    # SQLite (and any other driver) is left alone
+    assert "connect_args" not in manager._engine_kwargs(settings.database_url)
+
+    captured = {}
+
+    async def connect(*args, **kwargs):
+        captured.update(kwargs)
+        raise ConnectionRefusedError("no server in tests")
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    engine = manager._create_engine("postgresql://u:p@localhost/db")
+    try:
+        with pytest.raises(ConnectionRefusedError):
+            async with engine.connect():
+                pass
+    finally:
+        await engine.dispose()
+    assert captured["statement_cache_size"] == 0
+
+
+async def test_persistent_pool_recovers_after_the_server_drops_it(lambda_settings, monkeypatch, postgres_url):
+    monkeypatch.setitem(settings.__dict__, "database_url", postgres_url)
+    manager = DatabaseManager()
+    await manager.init_db()
+    connects = []
+    event.listen(manager.engine.sync_engine, "connect", lambda *args: connects.append(args[0]))
+    try:
+        async with manager.async_session_maker() as session:
+            pid = await session.scalar(text("SELECT pg_backend_pid()"))
+
+        # While the environment is frozen the server (or a proxy) closes the connection
+        admin = await asyncpg.connect(postgres_url)
+        try:
+            assert await admin.fetchval("SELECT pg_terminate_backend($1)", pid)
+        finally:
+            await admin.close()
+        await asyncio.sleep(0.3)
+
+        async with manager.async_session_maker() as session:
+            assert await session.scalar(text("SELECT pg_backend_pid()")) != pid
+        assert len(connects) == 2
+    finally:
+        await manager.close_db()
+
+
+async def pooled_transactions(manager, workers: int, transactions: int) -> None:
+    async def worker(number):
+        for i in range(transactions):
+            async with manager.async_session_maker() as session, session.begin():
+                # The same parameterized statement on whichever server connection is free
+                value = number * 1000 + i
+                assert await session.scalar(text("SELECT CAST(:value AS integer)"), {"value": value}) == value
+
+    await asyncio.gather(*(worker(number) for number in range(workers)))
+
+
+async def test_through_transaction_pooler(lambda_settings, monkeypatch, pooler_url):
+    monkeypatch.setitem(settings.__dict__, "database_url", pooler_url)
+    monkeypatch.setattr(settings, "database_transaction_pooler", True)
+    monkeypatch.setattr(settings, "lambda_pool_size", 4)
+    manager = DatabaseManager()
+    await manager.init_db()
+    try:
+        await pooled_transactions(manager, workers=8, transactions=20)
+    finally:
+        await manager.close_db()
+
+
+async def test_statement_caches_break_behind_transaction_pooler(lambda_settings, monkeypatch, transaction_pooler):
+    """The control for the test above: without the setting the same workload fails"""
+    monkeypatch.setitem(settings.__dict__, "database_url", transaction_pooler.url())
+    monkeypatch.setattr(settings, "database_transaction_pooler", False)
+    manager = DatabaseManager()
+    await manager.init_db()
+    try:
+        with pytest.raises(DBAPIError, match="prepared statement"):
+            await pooled_transactions(manager, workers=1, transactions=4)
+    finally:
+        await manager.close_db()
+
+
+async def test_persistent_pool_recovers_after_the_pooler_drops_it(lambda_settings, monkeypatch, transaction_pooler):
+    monkeypatch.setitem(settings.__dict__, "database_url", transaction_pooler.url())
+    monkeypatch.setattr(settings, "database_transaction_pooler", True)
+    manager = DatabaseManager()
+    await manager.init_db()
+    connects = []
+    event.listen(manager.engine.sync_engine, "connect", lambda *args: connects.append(args[0]))
+    try:
+        await pooled_transactions(manager, workers=1, transactions=2)
+        transaction_pooler.drop_clients()
+        await asyncio.sleep(0.3)
+        await pooled_transactions(manager, workers=1, transactions=2)
+        assert len(connects) == 2
+    finally:
+        await manager.close_db()
@@ -0,0 +1,116 @@
+"""Migrations run against tables that create_all may have made first
+
+On Postgres each test runs in a transaction that is rolled back, DDL included.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from models.chat_history_archive import Chat_history_archive
+
+VERSIONS = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+
+
+def migration(revision: str):
+    (path,) = VERSIONS.glob(f"{revision}_*.py")
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_upgrade(conn, revision: str, setup=None):
+    if setup is not None:
+        setup(conn)
+    with Operations.context(MigrationContext.configure(conn)):
+        migration(revision).upgrade()
+    return sa.inspect(conn)
+
+
+@pytest.fixture
+def upgrade(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+
+    def run(revision: str, setup=None):
+        with engine.begin() as conn:
+            run_upgrade(conn, revision, setup)
+        return sa.inspect(engine)
+
+    yield run
+    engine.dispose()
+
+
+def archive_indexes(inspector) -> set:
+    return {index["name"] for index in inspector.get_indexes("chat_history_archive")}
+
+
+def test_archive_is_created(upgrade):
+    inspector = upgrade("a81d5f3c7e20")
+    assert inspector.get_pk_constraint("chat_history_archive")["constrained_columns"] == ["id", "created_at"]
+    assert archive_indexes(inspector) == {index.name for index in Chat_history_archive.__table__.indexes}
+
+
+def test_archive_from_create_all_gets_its_missing_indexes(upgrade):
+    def create_all_without_indexes(conn):
+        Chat_history_archive.__table__.create(conn)
+        conn.exec_driver_sql("DROP INDEX ix_chat_history_archive_user_id_session_id_created_at")
+
+    inspector = upgrade("a81d5f3c7e20", create_all_without_indexes)
+    assert archive_indexes(inspector) == {index.name for index in Chat_history_archive.__table__.indexes}
+
+
+def test_archive_of_another_shape_fails(upgrade):
+    def create_other_table(conn):
+        conn.exec_driver_sql("CREATE TABLE chat_history_archive (id INTEGER PRIMARY KEY, content TEXT)")
+
+    with pytest.raises(RuntimeError, match="does not have the expected shape"):
+        upgrade("a81d5f3c7e20", create_other_table)
+
+
+@pytest.mark.asyncio
+async def test_postgres_archive_must_be_partitioned(postgres_url):
+    engine = create_async_engine(make_url(postgres_url).set(drivername="postgresql+asyncpg"))
+
+    def create_all(conn):
+        Chat_history_archive.__table__.create(conn)
+
+    def create_unpartitioned(conn):
+        conn.exec_driver_sql(
+            "CREATE TABLE chat_history_archive (id INTEGER NOT NULL, user_id VARCHAR NOT NULL, "
+            "session_id VARCHAR NOT NULL, role VARCHAR NOT NULL, content BYTEA NOT NULL, intake_step VARCHAR, "
+            "created_at TIMESTAMP WITH TIME ZONE NOT NULL, PRIMARY KEY (id, created_at))"
+        )
+
+    try:
+        async with engine.connect() as conn:
+            await conn.run_sync(run_upgrade, "a81d5f3c7e20", create_all)
+            indexes = await conn.run_sync(lambda sync_conn: archive_indexes(sa.inspect(sync_conn)))
+            assert indexes >= {index.name for index in Chat_history_archive.__table__.indexes}
+            await conn.rollback()
+        async with engine.connect() as conn:
+            with pytest.raises(RuntimeError, match="not partitioned"):
+                await conn.run_sync(run_upgrade, "a81d5f3c7e20", create_unpartitioned)
+            await conn.rollback()
+    finally:
+        await engine.dispose()
+
+
+def test_row_version_is_widened(upgrade):
+    def create_tables(conn):
+        for table in ("user_profiles", "protocol_recommendations"):
+            conn.exec_driver_sql(
+                f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, row_version INTEGER DEFAULT '0' NOT NULL)"
+            )
+            conn.exec_driver_sql(f"INSERT INTO {table} (id, row_version) VALUES (1, 12345)")
+
+    inspector = upgrade("d2b6f08c4a17", create_tables)
+    for table in ("user_profiles", "protocol_recommendations"):
+        (column,) = [column for column in inspector.get_columns(table) if column["name"] == "row_version"]
+        assert isinstance(column["type"], sa.BigInteger)
@@ -0,0 +1,75 @@
+"""Connection pool metrics (PoolStats, /database/pool-stats)"""
+
+import asyncio
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from sqlalchemy import exc, text
+
+from core.config import settings
+from core.database import DatabaseManager
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def pool_settings(tmp_path, monkeypatch):
+    monkeypatch.setitem(settings.__dict__, "database_url", f"sqlite:///{tmp_path / 'pool.db'}")
+    monkeypatch.setattr(settings, "is_lambda", False)
+    monkeypatch.setattr(settings, "database_replica_urls", "")
+    monkeypatch.setattr(settings, "db_pool_size", 3)
+    monkeypatch.setattr(settings, "db_max_overflow", 7)
+    return settings
+
+
+@pytest_asyncio.fixture
+async def manager(pool_settings):
+    manager = DatabaseManager()
+    await manager.init_db()
+    yield manager
+    await manager.close_db()
+
+
+async def test_snapshot_reports_the_configured_pool(manager):
+    async with manager.async_session_maker() as session:
+        await session.execute(text("SELECT 1"))
+    stats = manager.pool_stats()["primary"]
+    assert stats["size"] == 3 and stats["max_overflow"] == 7
+    assert stats["checkouts"] == 1 and stats["connects"] == 1 and stats["checked_in"] == 1
+    assert stats["disconnects"] == 0
+
+    # dispose() replaces the pool; configuration and counters carry over
+    await manager.engine.dispose()
+    stats = manager.pool_stats()["primary"]
+    assert stats["max_overflow"] == 7 and stats["checkouts"] == 1 and stats["checked_in"] == 0
+
+
+async def test_dropped_connections_are_counted_and_replaced(pool_settings, monkeypatch, postgres_url):
+    monkeypatch.setitem(settings.__dict__, "database_url", postgres_url)
+    monkeypatch.setattr(settings, "db_pool_pre_ping", False)
+    manager = DatabaseManager()
+    await manager.init_db()
+    try:
+        async with manager.async_session_maker() as session:
+            pid = await session.scalar(text("SELECT pg_backend_pid()"))
+        admin = await asyncpg.connect(postgres_url)
+        try:
+            assert await admin.fetchval("SELECT pg_terminate_backend($1)", pid)
+        finally:
+            await admin.close()
+        await asyncio.sleep(0.3)
+
+        # Without pre-ping the first statement on the dropped connection fails...
+        with pytest.raises(exc.DBAPIError) as excinfo:
+            async with manager.async_session_maker() as session:
+                await session.execute(text("SELECT 1"))
+        assert excinfo.value.connection_invalidated
+        # ...and the pool reconnects for the next one
+        async with manager.async_session_maker() as session:
+            assert await session.scalar(text("SELECT pg_backend_pid()")) != pid
+
+        stats = manager.pool_stats()["primary"]
+        assert stats["disconnects"] == 1 and stats["invalidations"] >= 1 and stats["connects"] == 2
+    finally:
+        await manager.close_db()
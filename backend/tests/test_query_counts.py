@@ -0,0 +1,127 @@
+"""Statements per single-row CRUD endpoint: each mutation is one statement with RETURNING"""
+
+import pytest
+from sqlalchemy import event
+
+pytestmark = pytest.mark.asyncio
+
+# entity -> (create body, update body)
+ENTITIES = {
+    "subscriptions": (
+        {
+            "subscription_type": "monthly",
+            "status": "active",
+            "start_date": "2026-01-01T00:00:00Z",
+            "created_at": "2026-01-01T00:00:00Z",
+        },
+        {"status": "paused"},
+    ),
+    "user_profiles": (
+        {"primary_goal": "sleep", "age_verified": True, "created_at": "2026-01-01T00:00:00Z"},
+        {"primary_goal": "focus"},
+    ),
+    "protocol_recommendations": (
+        {
+            "protocol_name": "p",
+            "confidence_level": "high",
+            "eligibility": "eligible",
+            "profile_id": 1,
+            "created_at": "2026-01-01T00:00:00Z",
+        },
+        {"confidence_level": "low"},
+    ),
+}
+
+
+def without_returning(engine, monkeypatch):
+    dialect = engine.sync_engine.dialect
+    for flag in ("insert_returning", "update_returning", "delete_returning", "insert_executemany_returning"):
+        monkeypatch.setattr(dialect, flag, False)
+
+
+@pytest.mark.parametrize("name", ENTITIES)
+async def test_mutations_are_single_statements(client, statements, name):
+    path = f"/api/v1/entities/{name}"
+    create_body, update_body = ENTITIES[name]
+
+    statements.clear()
+    response = await client.post(path, json=create_body)
+    assert response.status_code == 201
+    assert len(statements) == 1 and statements[0].startswith(f"INSERT INTO {name} ") and "RETURNING" in statements[0]
+    obj_id = response.json()["id"]
+
+    statements.clear()
+    response = await client.put(f"{path}/{obj_id}", json=update_body)
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+    # Ownership is folded into the WHERE clause instead of a select first
+    assert statements[0].startswith(f"UPDATE {name} ") and f"{name}.user_id = ?" in statements[0]
+    assert "RETURNING" in statements[0]
+
+    statements.clear()
+    response = await client.put(f"{path}/{obj_id + 1}", json=update_body)
+    assert response.status_code == 404
+    assert len(statements) == 1, statements
+
+    statements.clear()
+    response = await client.delete(f"{path}/{obj_id}")
+    assert response.status_code == 200
+    assert statements == [f"DELETE FROM {name} WHERE {name}.id = ? AND {name}.user_id = ?"]
+
+
+@pytest.mark.parametrize("name", ENTITIES)
+async def test_mutations_without_returning(client, statements, engine, monkeypatch, name):
+    without_returning(engine, monkeypatch)
+    path = f"/api/v1/entities/{name}"
+    create_body, update_body = ENTITIES[name]
+
+    statements.clear()
+    response = await client.post(path, json=create_body)
+    assert response.status_code == 201
+    # The INSERT still reports the new id; nothing is read back
+    assert len(statements) == 1 and "RETURNING" not in statements[0]
+    obj_id = response.json()["id"]
+
+    statements.clear()
+    response = await client.put(f"{path}/{obj_id}", json=update_body)
+    assert response.status_code == 200
+    assert response.json()[next(iter(update_body))] == next(iter(update_body.values()))
+    # The UPDATE, then one read of the updated row
+    assert len(statements) == 2 and statements[0].startswith(f"UPDATE {name} ") and "RETURNING" not in statements[0]
+
+    statements.clear()
+    response = await client.put(f"{path}/{obj_id + 1}", json=update_body)
+    assert response.status_code == 404
+    assert len(statements) == 1, statements
+
+    statements.clear()
+    response = await client.delete(f"{path}/{obj_id}")
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+
+
+async def test_chat_message_create_budget(client, statements):
+    """The message row plus one upsert per projection (chat_sessions, search index)"""
+    statements.clear()
+    response = await client.post(
+        "/api/v1/entities/chat_history",
+        json={"session_id": "s1", "role": "user", "content": "hello", "created_at": "2026-01-01T00:00:00Z"},
+    )
+    assert response.status_code == 201
+    assert len(statements) == 3, statements
+    assert statements[0].startswith("INSERT INTO chat_history ") and "RETURNING" in statements[0]
+    assert statements[1].startswith("INSERT INTO chat_sessions ") and "ON CONFLICT" in statements[1]
+
+
+async def test_batch_create_is_one_transaction(client, statements, engine):
+    """One INSERT per row on SQLite (no ordered multi-row RETURNING), but a single commit"""
+    commits = []
+    event.listen(engine.sync_engine, "commit", lambda conn: commits.append(conn))
+    items = [dict(ENTITIES["user_profiles"][0], primary_goal=f"goal {i}") for i in range(3)]
+
+    statements.clear()
+    response = await client.post("/api/v1/entities/user_profiles/batch", json={"items": items})
+    assert response.status_code == 201
+    assert [item["primary_goal"] for item in response.json()] == ["goal 0", "goal 1", "goal 2"]
+    assert len(commits) == 1
+    assert len([statement for statement in statements if statement.startswith("INSERT INTO user_profiles ")]) == 3
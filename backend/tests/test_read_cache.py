@@ -0,0 +1,135 @@
+"""Per-user read cache (utils/read_cache.py) and its invalidation by the entity writes"""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import utils.read_cache
+from dependencies.auth import get_current_user
+from routers import health
+from schemas.auth import UserResponse
+from services.user_profiles import User_profilesService
+from utils.read_cache import CacheBackend, LocalCacheBackend, ReadCache
+
+pytestmark = pytest.mark.asyncio
+
+PATH = "/api/v1/entities/user_profiles"
+CACHE = User_profilesService.repository.read_cache
+
+PROFILE = {"primary_goal": "sleep", "age_verified": True, "created_at": "2026-01-01T00:00:00Z"}
+
+
+@pytest.fixture
+def read_cache(monkeypatch):
+    """A ReadCache that is not registered for the metrics endpoint"""
+    monkeypatch.setattr(utils.read_cache, "_caches", {})
+
+    def make(ttl: float = 60, max_entries: int = 100) -> ReadCache:
+        return ReadCache("test", ttl=ttl, max_entries=max_entries)
+
+    return make
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+async def test_writes_replace_the_generation_tokens(read_cache):
+    cache, load = read_cache(), Loader()
+    assert await cache.get_or_load("u1", "a", load) == 1
+    assert await cache.get_or_load("u1", "a", load) == 1
+    assert await cache.get_or_load("u2", "a", load) == 2
+    assert await cache.get_or_load(None, "a", load) == 3
+
+    # A write of u1 drops u1's and the unscoped reads, not u2's
+    await cache.invalidate("u1")
+    assert await cache.get_or_load("u1", "a", load) == 4
+    assert await cache.get_or_load("u2", "a", load) == 2
+    assert await cache.get_or_load(None, "a", load) == 5
+
+    # A write of an unknown user drops everything
+    await cache.invalidate(None)
+    assert await cache.get_or_load("u2", "a", load) == 6
+    assert (cache.hits, cache.misses, cache.invalidations) == (2, 6, 2)
+
+
+async def test_entries_expire_after_the_ttl(read_cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(utils.read_cache.time, "monotonic", lambda: now[0])
+    cache, load = read_cache(ttl=10), Loader()
+    assert await cache.get_or_load("u1", "a", load) == 1
+    now[0] += 9
+    assert await cache.get_or_load("u1", "a", load) == 1
+    now[0] += 2
+    assert await cache.get_or_load("u1", "a", load) == 2
+
+
+async def test_least_recently_used_entries_are_evicted():
+    backend = LocalCacheBackend(max_entries=2)
+    await backend.set("a", 1)
+    await backend.set("b", 2)
+    assert await backend.get("a") == 1  # b is now the least recently used
+    await backend.set("c", 3)
+    assert (await backend.get("a"), await backend.get("b"), await backend.get("c")) == (1, None, 3)
+    assert backend.size() == 2
+
+
+async def test_zero_ttl_disables_the_cache(read_cache):
+    cache, load = read_cache(ttl=0), Loader()
+    assert [await cache.get_or_load("u1", "a", load) for _ in range(2)] == [1, 2]
+    assert cache.hits == cache.misses == 0
+
+
+async def test_entity_writes_invalidate_cached_reads(client, statements):
+    created = (await client.post(PATH, json=PROFILE)).json()
+    path = f"{PATH}/{created['id']}"
+
+    assert (await client.get(path)).json()["primary_goal"] == "sleep"
+    assert (await client.get(PATH)).json()["total"] == 1
+    statements.clear()
+    hits = CACHE.hits
+    assert (await client.get(path)).json()["primary_goal"] == "sleep"
+    assert (await client.get(PATH)).json()["total"] == 1
+    assert CACHE.hits > hits and statements == []
+
+    assert (await client.put(path, json={"primary_goal": "focus"})).status_code == 200
+    assert (await client.get(path)).json()["primary_goal"] == "focus"
+    assert [item["primary_goal"] for item in (await client.get(PATH)).json()["items"]] == ["focus"]
+
+    assert (await client.post(PATH, json=PROFILE)).status_code == 201
+    assert (await client.get(PATH)).json()["total"] == 2
+
+    assert (await client.delete(path)).status_code == 200
+    assert (await client.get(path)).status_code == 404
+    assert (await client.get(PATH)).json()["total"] == 1
+
+
+async def test_cache_stats_endpoint(client):
+    await client.get(PATH)
+    await client.get(PATH)
+    app = FastAPI()
+    app.include_router(health.router)
+    role = ["user"]
+    app.dependency_overrides[get_current_user] = lambda: UserResponse(id="admin", email="a@example.com", role=role[0])
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as admin:
+        assert (await admin.get("/database/cache-stats")).status_code == 403
+        role[0] = "admin"
+        response = await admin.get("/database/cache-stats")
+
+    assert response.status_code == 200
+    stats = response.json()["read_caches"]["user_profiles"]
+    assert stats == CACHE.stats()
+    assert set(stats) == {"hits", "misses", "hit_ratio", "invalidations", "entries", "ttl"}
+    assert stats["hits"] >= 1 and stats["misses"] >= 1 and stats["entries"] >= 1
+    assert "write_buffers" in response.json()
@@ -0,0 +1,115 @@
+"""Read routing between the primary and read replicas (DatabaseManager.read_session)
+
+A second SQLite database plays the replica. Each database knows which one it is, and the
+replica reports the lag the test sets through a stand-in for the Postgres lag query.
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+import core.database
+import services.crud
+from core.config import settings
+from core.database import DatabaseManager
+from services.subscriptions import SubscriptionsService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def replica_settings(tmp_path, monkeypatch):
+    monkeypatch.setitem(settings.__dict__, "database_url", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(settings, "database_replica_urls", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(settings, "replica_max_lag_seconds", 5.0)
+    monkeypatch.setattr(settings, "replica_lag_check_interval", 0.0)  # Measure on every read
+    monkeypatch.setattr(settings, "read_your_writes_seconds", 30.0)
+    monkeypatch.setitem(core.database.REPLICA_LAG_QUERY, "sqlite", text("SELECT lag FROM whoami"))
+    return settings
+
+
+@pytest_asyncio.fixture
+async def manager(replica_settings):
+    manager = DatabaseManager()
+    await manager.init_db()
+    (replica,) = manager.replicas
+    for name, engine in (("primary", manager.engine), ("replica", replica.engine)):
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE whoami (name VARCHAR, lag FLOAT)"))
+            await conn.execute(text("INSERT INTO whoami VALUES (:name, 0)"), {"name": name})
+    yield manager
+    await manager.close_db()
+
+
+async def read_from(manager, user_id="u1") -> str:
+    async with manager.read_session(user_id) as session:
+        return await session.scalar(text("SELECT name FROM whoami"))
+
+
+async def set_lag(manager, seconds: float) -> None:
+    async with manager.replicas[0].engine.begin() as conn:
+        await conn.execute(text("UPDATE whoami SET lag = :lag"), {"lag": seconds})
+
+
+async def test_reads_go_to_the_replica(manager):
+    assert await read_from(manager) == "replica"
+    assert await read_from(manager, None) == "replica"
+
+
+async def test_lagging_replica_falls_back_to_the_primary(manager):
+    await set_lag(manager, 10)
+    assert await read_from(manager) == "primary"
+    await set_lag(manager, 1)
+    assert await read_from(manager) == "replica"
+
+
+async def test_lag_is_reused_between_checks(manager, monkeypatch):
+    monkeypatch.setattr(settings, "replica_lag_check_interval", 60.0)
+    assert await read_from(manager) == "replica"
+    await set_lag(manager, 10)
+    # Not measured again yet
+    assert await read_from(manager) == "replica"
+
+
+async def test_failing_replica_falls_back_to_the_primary(manager):
+    async with manager.replicas[0].engine.begin() as conn:
+        await conn.execute(text("DROP TABLE whoami"))  # The lag query fails
+    assert await read_from(manager) == "primary"
+
+
+async def test_writes_pin_reads_to_the_primary(manager, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(core.database.time, "monotonic", lambda: now[0])
+
+    manager.note_write("u1")
+    assert await read_from(manager, "u1") == "primary"
+    assert await read_from(manager, "u2") == "replica"
+    # Reads across every user's rows see anyone's write
+    assert await read_from(manager, None) == "primary"
+
+    now[0] += 31
+    assert await read_from(manager, "u1") == "replica"
+    assert await read_from(manager, None) == "replica"
+
+    # A write of an unknown user pins everyone
+    manager.note_write(None)
+    assert await read_from(manager, "u2") == "primary"
+
+
+async def test_service_writes_note_the_writer(manager, monkeypatch):
+    monkeypatch.setattr(services.crud, "db_manager", manager)
+    async with manager.engine.begin() as conn:
+        await conn.run_sync(core.database.Base.metadata.create_all)
+
+    async with manager.async_session_maker() as db:
+        await SubscriptionsService(db).create(
+            {
+                "subscription_type": "monthly",
+                "status": "active",
+                "start_date": "2026-01-01T00:00:00Z",
+                "created_at": "2026-01-01T00:00:00Z",
+            },
+            user_id="u1",
+        )
+    assert await read_from(manager, "u1") == "primary"
+    assert await read_from(manager, "u2") == "replica"
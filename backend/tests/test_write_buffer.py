@@ -0,0 +1,157 @@
+"""Write-behind buffering of chat_history inserts (services/write_buffer.py)"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import services.write_buffer
+from models.chat_history import Chat_history
+from services.chat_history import Chat_historyService
+from services.database import close_database
+from services.write_buffer import WriteBuffer
+from tests.conftest import USER_ID
+
+pytestmark = pytest.mark.asyncio
+
+REPO = Chat_historyService.repository
+
+
+def message(i: int, **values) -> dict:
+    return {"session_id": "s1", "role": "user", "content": f"m{i}", "created_at": "2026-01-01T00:00:00Z", **values}
+
+
+@pytest.fixture
+def make_buffer(monkeypatch):
+    """Install a WriteBuffer on chat_history, as write_behind_mode would"""
+
+    def make(durable: bool = True, flush_interval: float = 0.01, max_rows: int = 100) -> WriteBuffer:
+        monkeypatch.setattr(services.write_buffer, "_buffers", [])
+        buffer = WriteBuffer(REPO, durable=durable, flush_interval=flush_interval, max_rows=max_rows)
+        monkeypatch.setattr(REPO, "write_buffer", buffer)
+        return buffer
+
+    return make
+
+
+@pytest.fixture
+def session_maker(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def create(session_maker, data: dict, user_id: str = USER_ID):
+    async with session_maker() as db:
+        return await Chat_historyService(db).create(data, user_id=user_id)
+
+
+async def stored(session_maker) -> list:
+    async with session_maker() as db:
+        return list((await db.scalars(select(Chat_history.content).order_by(Chat_history.id))).all())
+
+
+async def test_group_mode_returns_stored_rows_from_one_batch(make_buffer, session_maker):
+    buffer = make_buffer(durable=True)
+    objs = await asyncio.gather(*(create(session_maker, message(i)) for i in range(10)))
+
+    assert [obj.content for obj in objs] == [f"m{i}" for i in range(10)]
+    assert all(obj.id is not None for obj in objs)
+    assert len({obj.id for obj in objs}) == 10
+    assert buffer.flushes == 1 and buffer.flushed_rows == 10
+    assert await stored(session_maker) == [f"m{i}" for i in range(10)]
+
+
+async def test_async_mode_answers_202_with_null_id(make_buffer, client, session_maker):
+    buffer = make_buffer(durable=False, flush_interval=60)
+    response = await client.post("/api/v1/entities/chat_history", json=message(0))
+
+    assert response.status_code == 202
+    assert response.json()["id"] is None and response.json()["content"] == "m0"
+    assert await stored(session_maker) == []  # Queued, not written yet
+    await buffer.close()
+    assert await stored(session_maker) == ["m0"]
+
+
+async def test_max_rows_flushes_right_away(make_buffer, session_maker):
+    buffer = make_buffer(durable=False, flush_interval=60, max_rows=3)
+    for i in range(3):
+        await create(session_maker, message(i))
+    await asyncio.gather(*buffer._tasks)
+
+    assert buffer.flushes == 1
+    assert await stored(session_maker) == ["m0", "m1", "m2"]
+    await buffer.close()
+
+
+async def test_interval_flushes_queued_rows(make_buffer, session_maker):
+    buffer = make_buffer(durable=False, flush_interval=0.05, max_rows=100)
+    await create(session_maker, message(0))
+    await create(session_maker, message(1))
+    assert buffer.flushes == 0
+
+    await asyncio.sleep(0.2)
+    assert buffer.flushes == 1
+    assert await stored(session_maker) == ["m0", "m1"]
+
+
+async def test_failing_row_is_isolated(make_buffer, session_maker):
+    buffer = make_buffer(durable=True)
+    results = await asyncio.gather(
+        create(session_maker, message(0)),
+        create(session_maker, message(1, role=None)),  # NOT NULL violation
+        create(session_maker, message(2)),
+        return_exceptions=True,
+    )
+
+    assert results[0].content == "m0" and results[2].content == "m2"
+    assert isinstance(results[1], Exception)
+    assert buffer.failed_rows == 1 and buffer.flushed_rows == 2
+    assert await stored(session_maker) == ["m0", "m2"]
+
+
+async def test_reads_see_the_users_queued_rows(make_buffer, session_maker):
+    buffer = make_buffer(durable=False, flush_interval=60)
+    await create(session_maker, message(0))
+    await create(session_maker, message(1), user_id="someone else")
+
+    async with session_maker() as db:
+        page = await Chat_historyService(db).get_list(user_id=USER_ID)
+    assert [item["content"] for item in page["items"]] == ["m0"]
+    assert buffer.stats()["queued"] == 0  # The flush took the other user's row along
+    await buffer.close()
+
+
+async def test_close_database_flushes_buffers(make_buffer, session_maker):
+    make_buffer(durable=False, flush_interval=60)
+    await create(session_maker, message(0))
+    await create(session_maker, message(1))
+
+    await close_database()
+    assert await stored(session_maker) == ["m0", "m1"]
+
+
+async def test_waiters_are_resolved_when_invalidation_fails(make_buffer, session_maker, monkeypatch):
+    make_buffer(durable=True)
+
+    async def invalidate(user_id):
+        raise RuntimeError("cache unavailable")
+
+    monkeypatch.setattr(REPO, "invalidate", invalidate)
+    objs = await asyncio.wait_for(asyncio.gather(*(create(session_maker, message(i)) for i in range(3))), timeout=5)
+    # The rows were committed, so their writers get them back
+    assert [obj.content for obj in objs] == ["m0", "m1", "m2"]
+
+
+async def test_waiters_get_the_error_when_the_batch_fails(make_buffer, session_maker, monkeypatch):
+    buffer = make_buffer(durable=True)
+
+    async def write(rows):
+        raise RuntimeError("database gone")
+
+    monkeypatch.setattr(buffer, "_write", write)
+    results = await asyncio.wait_for(
+        asyncio.gather(*(create(session_maker, message(i)) for i in range(3)), return_exceptions=True), timeout=5
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    async with session_maker() as db:
+        assert await db.scalar(select(func.count()).select_from(Chat_history)) == 0
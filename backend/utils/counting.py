@@ -0,0 +1,135 @@
+"""
+Helpers for computing list totals without a COUNT(*) on every list call.
+
+- ``CountCache`` keeps exact totals per ``(user, filter)`` for a short TTL and is
+  invalidated by the owning service whenever that user's rows are written.
+- ``estimate_row_count`` reads planner statistics (``pg_class``/``pg_stats`` on
+  Postgres, ``sqlite_stat1`` on SQLite) instead of scanning.
+- ``count_on_own_connection`` runs an exact count on a separate session so it can
+  be awaited concurrently with the page query of the request session.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import Table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class CountCache:
+    """Short-TTL cache of exact list totals keyed by ``(user_id, filter)``."""
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[Optional[str], Hashable], Tuple[float, int]] = {}
+
+    @staticmethod
+    def make_key(user_id: Optional[str], query_dict: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Hashable]:
+        """Build a cache key from the owner and a canonical form of the filter."""
+        return user_id, json.dumps(query_dict or {}, sort_keys=True, default=str)
+
+    def get(self, key: Tuple[Optional[str], Hashable]) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, total = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return total
+
+    def set(self, key: Tuple[Optional[str], Hashable], total: int) -> None:
+        if self.ttl <= 0:
+            return
+        if len(self._entries) >= self.max_entries:
+            self._evict_expired()
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+        self._entries[key] = (time.monotonic() + self.ttl, total)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Drop totals affected by a write of ``user_id`` (everything if unknown).
+
+        Unscoped totals (``user_id`` None, used by the ``/all`` listings) are always
+        dropped as well since they cover every user's rows.
+        """
+        if user_id is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] in (user_id, None)]:
+            self._entries.pop(key, None)
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at < now]:
+            self._entries.pop(key, None)
+
+
+async def estimate_row_count(db: AsyncSession, table: Table, user_id: Optional[str] = None) -> Optional[int]:
+    """Estimate the number of rows in ``table`` (owned by ``user_id``) from statistics.
+
+    Returns None when the dialect is unsupported or the table has not been analyzed
+    yet, in which case callers should fall back to an exact count.
+    """
+    dialect = db.bind.dialect.name
+    try:
+        if dialect == "postgresql":
+            result = await db.execute(
+                text(
+                    "SELECT c.reltuples, s.n_distinct "
+                    "FROM pg_class c "
+                    "LEFT JOIN pg_stats s ON s.schemaname = current_schema() "
+                    "AND s.tablename = c.relname AND s.attname = 'user_id' "
+                    "WHERE c.oid = to_regclass(:table_name)"
+                ),
+                {"table_name": table.name},
+            )
+            row = result.first()
+            if row is None or row[0] is None or row[0] < 0:
+                return None
+            rows, n_distinct = float(row[0]), row[1]
+            if user_id is None:
+                return int(rows)
+            if not n_distinct:
+                return None
+            # Negative n_distinct is a fraction of the row count rather than an absolute value
+            distinct_users = -n_distinct * rows if n_distinct < 0 else n_distinct
+            return int(rows / max(distinct_users, 1.0))
+
+        if dialect == "sqlite":
+            has_stats = await db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"))
+            if has_stats.first() is None:
+                return None
+            result = await db.execute(
+                text(
+                    "SELECT stat, (SELECT name FROM pragma_index_info(sqlite_stat1.idx) WHERE seqno = 0) "
+                    "FROM sqlite_stat1 WHERE tbl = :table_name"
+                ),
+                {"table_name": table.name},
+            )
+            rows_estimate = None
+            for stat, leading_column in result.all():
+                # stat is "<rows> <avg rows per distinct prefix of 1 column> ..."
+                numbers = [int(n) for n in stat.split() if n.isdigit()]
+                if not numbers:
+                    continue
+                if user_id is None:
+                    return numbers[0]
+                if leading_column == "user_id" and len(numbers) > 1:
+                    rows_estimate = numbers[1]
+            return rows_estimate
+    except Exception as e:
+        logger.warning(f"Failed to estimate row count for {table.name}: {e}")
+    return None
+
+
+async def count_on_own_connection(db: AsyncSession, count_query) -> int:
+    """Run ``count_query`` on a separate session bound to the same engine as ``db``."""
+    async with AsyncSession(db.bind) as count_session:
+        result = await count_session.execute(count_query)
+        return result.scalar()
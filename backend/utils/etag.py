@@ -0,0 +1,63 @@
+"""
+Weak ETags for the entity GET endpoints.
+
+Versioned tables carry a ``row_version`` stamp that is replaced on every write with a value
+higher than every stamp given out before it. ``(count, max(id), sum(row_version))`` over
+the rows a read covers then changes with every insert, update and delete (a row entering
+the covered set always outweighs the rows that left it), so it can be compared against
+``If-None-Match`` without fetching the rows themselves.
+"""
+
+import hashlib
+import time
+from typing import Any, Optional
+
+from fastapi import Response
+
+from utils.serialization import dumps
+
+
+# Stamps count milliseconds from here, which keeps sums over millions of rows within 64 bits
+ROW_VERSION_EPOCH_MS = 1767225600000  # 2026-01-01T00:00:00Z
+
+# Last stamp given out by this process
+_last_row_version = 0
+
+
+def new_row_version() -> int:
+    """Return a fresh ``row_version`` stamp for a written row.
+
+    Milliseconds since ``ROW_VERSION_EPOCH_MS``, moved past the previous stamp of this
+    process so stamps keep increasing even if the clock steps back; across processes they
+    are ordered up to the clock skew between them.
+    """
+    global _last_row_version
+    _last_row_version = max(_last_row_version + 1, time.time_ns() // 1_000_000 - ROW_VERSION_EPOCH_MS)
+    return _last_row_version
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from JSON-serializable ``parts``."""
+    digest = hashlib.blake2b(dumps(parts), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Weak comparison of ``etag`` against an ``If-None-Match`` header value."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """An empty ``304 Not Modified`` response carrying ``etag``."""
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,146 @@
+"""
+Filter language for the entity list endpoints.
+
+The JSON ``query`` parameter maps field names either to a value (equality) or to an
+operator object, e.g.::
+
+    {"session_id": "abc", "created_at": {"$gte": "2026-01-01T00:00:00Z"}, "status": {"$in": ["active", "paused"]}}
+
+Supported operators are ``$eq``, ``$ne``, ``$gt``, ``$gte``, ``$lt``, ``$lte``, ``$in`` and
+``$prefix``. Only whitelisted fields may be filtered or sorted on, so every accepted
+query stays on the per-user indexes. Validation and column resolution are cached per
+query shape (fields and operators, not values).
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Boolean, DateTime, Integer, false
+
+from utils.timestamps import parse_timestamp
+
+MAX_IN_VALUES = 1000
+
+_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "$eq": lambda column, value: column == value,
+    "$ne": lambda column, value: column != value,
+    "$gt": lambda column, value: column > value,
+    "$gte": lambda column, value: column >= value,
+    "$lt": lambda column, value: column < value,
+    "$lte": lambda column, value: column <= value,
+    "$in": lambda column, values: column.in_(values) if values else false(),
+    # LIKE 'value%' with wildcards in the value escaped, so it stays an index range scan
+    "$prefix": lambda column, value: column.startswith(value, autoescape=True),
+}
+
+
+def _coercer(column) -> Callable[[Any], Any]:
+    """Return a function validating a JSON value against the column type."""
+    column_type = column.type
+
+    if isinstance(column_type, DateTime):
+        return parse_timestamp
+
+    if isinstance(column_type, Boolean):
+
+        def to_bool(value):
+            if not isinstance(value, bool):
+                raise ValueError(f"Field {column.name} expects a boolean")
+            return value
+
+        return to_bool
+
+    if isinstance(column_type, Integer):
+
+        def to_int(value):
+            if isinstance(value, bool):
+                raise ValueError(f"Field {column.name} expects an integer")
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Field {column.name} expects an integer") from None
+
+        return to_int
+
+    def to_str(value):
+        if isinstance(value, (dict, list)):
+            raise ValueError(f"Field {column.name} expects a scalar value")
+        return str(value)
+
+    return to_str
+
+
+class QueryCompiler:
+    """Compiles ``query``/``sort`` parameters into SQLAlchemy expressions for one model."""
+
+    def __init__(self, model, filterable: Iterable[str], sortable: Iterable[str]):
+        self.model = model
+        self.filterable = frozenset(filterable)
+        self.sortable = frozenset(sortable)
+        self._coercers = {name: _coercer(model.__table__.c[name]) for name in self.filterable}
+        self._plan = lru_cache(maxsize=256)(self._build_plan)
+
+    def _build_plan(self, shape: Tuple[Tuple[str, str], ...]):
+        """Resolve columns, operators and coercers for a query shape."""
+        plan = []
+        for field, op in shape:
+            if field not in self.filterable:
+                raise ValueError(f"Filtering on '{field}' is not allowed")
+            if op not in _OPERATORS:
+                raise ValueError(f"Unsupported operator '{op}' on '{field}'")
+            if op == "$prefix" and not issubclass(self.model.__table__.c[field].type.python_type, str):
+                raise ValueError(f"Operator '$prefix' requires a text field, not '{field}'")
+            plan.append((getattr(self.model, field), op, _OPERATORS[op], self._coercers[field]))
+        return tuple(plan)
+
+    def compile_filters(self, query_dict: Optional[Dict[str, Any]]) -> List[Any]:
+        """Translate a parsed ``query`` object into a list of WHERE clauses.
+
+        Raises:
+            ValueError: On disallowed fields, unknown operators or mistyped values.
+        """
+        if not query_dict:
+            return []
+        if not isinstance(query_dict, dict):
+            raise ValueError("Query must be a JSON object")
+
+        shape, values = [], []
+        for field, condition in query_dict.items():
+            if isinstance(condition, dict):
+                if not condition:
+                    raise ValueError(f"Empty condition for '{field}'")
+                for op, value in condition.items():
+                    shape.append((field, op))
+                    values.append(value)
+            else:
+                shape.append((field, "$eq"))
+                values.append(condition)
+
+        clauses = []
+        for (column, op, build, coerce), value in zip(self._plan(tuple(shape)), values):
+            if op == "$in":
+                if not isinstance(value, list) or len(value) > MAX_IN_VALUES:
+                    raise ValueError(f"Operator '$in' expects a list of at most {MAX_IN_VALUES} values")
+                value = [coerce(item) for item in value]
+            elif value is None:
+                # JSON null only makes sense as IS NULL / IS NOT NULL
+                if op not in ("$eq", "$ne"):
+                    raise ValueError(f"Operator '{op}' does not accept null")
+            else:
+                value = coerce(value)
+            clauses.append(build(column, value))
+        return clauses
+
+    def resolve_sort(self, sort: Optional[str]):
+        """Return ``(sort_spec, column, descending)`` for a ``sort`` parameter (default ``-id``).
+
+        Raises:
+            ValueError: If the field is not sortable.
+        """
+        if not sort:
+            return "-id", self.model.id, True
+        descending = sort.startswith("-")
+        field = sort[1:] if descending else sort
+        if field not in self.sortable:
+            raise ValueError(f"Sorting by '{field}' is not allowed")
+        return sort, getattr(self.model, field), descending
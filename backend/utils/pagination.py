@@ -0,0 +1,46 @@
+"""
+Keyset (cursor) pagination helpers shared by the entity services.
+
+A cursor is an opaque, URL-safe token that records the sort spec of the page it was
+issued for and the ``(sort_key, id)`` position of that page's last row. The next page
+is then fetched with a seek predicate instead of an ``OFFSET``, so deep pages cost the
+same as the first one.
+"""
+
+import base64
+import json
+from typing import Any, Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(sort: str, key: Any, last_id: int) -> str:
+    """Encode the position of the last row of a page into an opaque cursor."""
+    payload = json.dumps({"s": sort, "k": key, "i": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Decode a cursor into its ``(sort_key, id)`` position.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for a different sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort, key, last_id = payload["s"], payload["k"], int(payload["i"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'")
+    return key, last_id
+
+
+def keyset_condition(sort_column, id_column, key: Any, last_id: int, descending: bool):
+    """Build the seek predicate selecting rows strictly after ``(key, last_id)``."""
+    if sort_column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+    position = tuple_(sort_column, id_column)
+    return position < tuple_(key, last_id) if descending else position > tuple_(key, last_id)
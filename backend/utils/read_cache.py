@@ -0,0 +1,153 @@
+"""
+Per-user read cache for entities that are read far more often than they change.
+
+Results are cached per ``(user, read)`` with a TTL in an LRU. Every key embeds a
+generation token of its scope (the user, or ``*`` for unscoped reads) and a global one,
+so a write invalidates exactly the affected entries by replacing a token: no entries
+have to be enumerated, which keeps invalidation O(1) and lets the same scheme run on a
+shared cache. Superseded entries are never read again and age out of the LRU.
+
+``LocalCacheBackend`` is the in-process stand-in used by default; a shared cache can be
+plugged in by implementing ``CacheBackend`` and passing it to ``ReadCache``.
+"""
+
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Every ReadCache by namespace, for the metrics endpoint
+_caches: Dict[str, "ReadCache"] = {}
+
+
+class CacheBackend(ABC):
+    """Key/value storage used by ``ReadCache``."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Return the value stored under ``key`` or None."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, expiring after ``ttl`` seconds (never if None)."""
+
+    def size(self) -> Optional[int]:
+        """Number of stored keys, if cheaply known."""
+        return None
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+
+def _new_token() -> str:
+    return os.urandom(6).hex()
+
+
+class ReadCache:
+    """Read-through cache of one entity's reads, invalidated per user on writes."""
+
+    def __init__(self, namespace: str, ttl: float, backend: Optional[CacheBackend] = None, max_entries: int = 10000):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend or LocalCacheBackend(max_entries=max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        _caches[namespace] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def _generation(self, scope: str) -> str:
+        key = f"{self.namespace}:gen:{scope}"
+        token = await self.backend.get(key)
+        if token is None:
+            # A missing (e.g. evicted) token starts a fresh generation, which can only cause misses
+            token = _new_token()
+            await self.backend.set(key, token)
+        return token
+
+    async def _key(self, user_id: Optional[str], read_key: Hashable) -> str:
+        scope = user_id if user_id is not None else "*"
+        epoch = await self._generation("")
+        generation = await self._generation(f"u:{scope}")
+        return f"{self.namespace}:{epoch}:{scope}:{generation}:{json.dumps(read_key, default=str)}"
+
+    async def get_or_load(
+        self, user_id: Optional[str], read_key: Hashable, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached result of ``read_key`` for ``user_id`` or ``await load()`` and cache it.
+
+        Cached results are shared between callers and must not be mutated.
+        """
+        if not self.enabled:
+            return await load()
+        # The key is taken before loading: if a write lands meanwhile, the result is stored
+        # under a superseded generation and never served
+        key = await self._key(user_id, read_key)
+        entry = await self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        value = await load()
+        await self.backend.set(key, (value,), self.ttl)
+        return value
+
+    async def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Drop the cached reads affected by a write of ``user_id`` (everything if unknown).
+
+        Unscoped reads (``user_id`` None) are always dropped as well since they cover every
+        user's rows.
+        """
+        self.invalidations += 1
+        if user_id is None:
+            await self.backend.set(f"{self.namespace}:gen:", _new_token())
+            return
+        await self.backend.set(f"{self.namespace}:gen:u:{user_id}", _new_token())
+        await self.backend.set(f"{self.namespace}:gen:u:*", _new_token())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "entries": self.backend.size(),
+            "ttl": self.ttl,
+        }
+
+
+def read_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of every read cache by namespace."""
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
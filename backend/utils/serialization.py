@@ -0,0 +1,42 @@
+"""
+JSON encoding for API responses and events, backed by orjson.
+
+``FastJSONResponse`` is the application's default response class; ``dumps`` is used
+wherever a payload is encoded by hand (SSE events, pre-serialized entity records).
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+
+
+def _default(value: Any) -> Any:
+    """Encode the few types orjson does not handle natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to compact UTF-8 JSON.
+
+    Naive datetimes are rendered as UTC with an explicit offset, like ``utils.timestamps.format_timestamp``.
+    """
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
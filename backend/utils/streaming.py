@@ -0,0 +1,32 @@
+"""
+Newline-delimited JSON (NDJSON) responses for streamed entity listings.
+
+A client opts in with ``Accept: application/x-ndjson``; each line of the body is then
+one JSON object, written as soon as its batch of rows has been read from the database.
+"""
+
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from utils.serialization import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def accepts_ndjson(request: Request) -> bool:
+    """Whether the request's Accept header asks for NDJSON."""
+    accept = request.headers.get("accept", "")
+    return any(part.split(";", 1)[0].strip() == NDJSON_MEDIA_TYPE for part in accept.split(","))
+
+
+async def _encode(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        if rows:
+            yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def ndjson_response(batches: AsyncIterator[List[Dict[str, Any]]]) -> StreamingResponse:
+    """Stream batches of JSON-serializable rows as an NDJSON response."""
+    return StreamingResponse(_encode(batches), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,60 @@
+"""
+Conversion between the ISO-8601 strings used by the entity API and the native
+``DateTime(timezone=True)`` columns of the entity models.
+"""
+
+from datetime import date, datetime, time, timezone
+from typing import Annotated, Any, Dict, Iterable, Optional
+
+from pydantic import BeforeValidator
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse an ISO-8601 string (or date/datetime) into an aware UTC datetime.
+
+    Naive values are taken to be UTC.
+
+    Raises:
+        ValueError: If the value is not a recognizable timestamp.
+    """
+    if value is None or isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime.combine(value, time())
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.endswith(("Z", "z")):
+            text = text[:-1] + "+00:00"
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"Invalid timestamp: {value!r}") from None
+    else:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def format_timestamp(value: Any) -> Any:
+    """Render a datetime as an ISO-8601 string; other values are returned unchanged."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    return value
+
+
+def coerce_timestamps(data: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Parse the timestamp ``fields`` present in ``data`` in place and return it."""
+    for field in fields:
+        if field in data:
+            data[field] = parse_timestamp(data[field])
+    return data
+
+
+# Response field type: native datetimes are serialized back to ISO-8601 strings
+IsoTimestamp = Annotated[str, BeforeValidator(format_timestamp)]